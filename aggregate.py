@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# streaming deduplication of the error records that packets keep retransmitting
+
+import sys
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+class ErrorAggregator(object):
+	"""
+	Collects the unique errors out of parse_errors records. An error's timestamp is only
+	known to within ERROR_TIME_BUCKET_SIZE (it's sent as a count of buckets before the
+	packet's timestamp), so a record is a repeat of an earlier one with the same error
+	code, priority bit and location whose timestamp is less than a bucket away. Memory
+	grows with the number of unique errors, not with the number of packets.
+	"""
+	def __init__(self, keep_empty=False, tolerance=pp.ERROR_TIME_BUCKET_SIZE):
+		# the all-zero (ECODE_OK at ELOC_NO_ERROR) slots of packets with few errors are skipped
+		self.keep_empty = keep_empty
+		self.tolerance = tolerance
+		# (error_code, priority_bit, error_location, timestamp // tolerance) -> [unique records]
+		self._index = {}
+		# (error_code, error_location) -> summary
+		self._summary = {}
+		self.num_unique = 0
+		self.num_repeats = 0
+
+	def _find(self, key, timestamp):
+		bucket = timestamp // self.tolerance
+		for b in (bucket, bucket - 1, bucket + 1):
+			for record in self._index.get(key + (b,), ()):
+				if abs(record['timestamp'] - timestamp) < self.tolerance:
+					return record
+		return None
+
+	def add(self, error):
+		""" Adds one record from parse_errors; returns True if it's a new error """
+		if not self.keep_empty and error['error_code'] == 0 and error['error_location'] == 0:
+			return False
+		key = (error['error_code'], error['priority_bit'], error['error_location'])
+		timestamp = error['timestamp']
+		summary_key = (error['error_code'], error['error_location'])
+		summary = self._summary.get(summary_key)
+		if summary is None:
+			summary = self._summary[summary_key] = {
+				'error_code_name': error['error_code_name'],
+				'error_location_name': error['error_location_name'],
+				'count': 0,
+				'reports': 0,
+				'first_seen': timestamp,
+				'last_seen': timestamp,
+			}
+		summary['reports'] += 1
+
+		if self._find(key, timestamp) is not None:
+			self.num_repeats += 1
+			return False
+		self._index.setdefault(key + (timestamp // self.tolerance,), []).append(error)
+		self.num_unique += 1
+		summary['count'] += 1
+		summary['first_seen'] = min(summary['first_seen'], timestamp)
+		summary['last_seen'] = max(summary['last_seen'], timestamp)
+		return True
+
+	def add_errors(self, errors):
+		""" Adds the records of parse_errors(); returns the ones that are new """
+		return [error for error in errors if self.add(error)]
+
+	def add_packet(self, packet):
+		""" Adds the errors of a parse_packet() result (or Packet); returns the new ones """
+		errors = packet['errors']
+		if not errors:
+			return []
+		return self.add_errors(errors)
+
+	def errors(self):
+		""" The unique error records (the first report of each), by timestamp """
+		return sorted((r for records in self._index.values() for r in records), key=lambda r: r['timestamp'])
+
+	def summary(self):
+		"""
+		Returns {(error_code, error_location): {error_code_name, error_location_name, count,
+		reports, first_seen, last_seen}}: count is of unique errors and reports of all the
+		records added, and first/last_seen are the earliest and latest unique error timestamps
+		"""
+		return dict((key, dict(val)) for key, val in self._summary.items())
+
+	def __len__(self):
+		return self.num_unique
@@ -0,0 +1,276 @@
+#!/usr/bin/python
+# vectorized (numpy) decoding of many packets at once; returns columns instead of dicts
+
+from binascii import unhexlify
+import sys
+
+import numpy as np
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+PACKET_SIZE = 255
+PACKET_SIZE_NO_PARITY = 223
+
+# the two ascii hex digits of each byte value, packed little-endian so that viewing the
+# result of a lookup as bytes gives the digits in order
+HEX_DIGITS = np.frombuffer(b''.join(('%02x' % i).encode('ascii') for i in range(256)), dtype='<u2').astype('<u8')
+
+SAT_STATE_NAMES = np.array([pp.get_sat_state(i) for i in range(8)])
+ECODE_NAMES = np.array([pp.get_ECODE_name(i) for i in range(128)])
+ELOC_NAMES = np.array([pp.get_ELOC_name(i) for i in range(256)])
+
+_tables = {}
+
+def _field_table(field):
+	# every converted field is at most 2 bytes wide, so the scalar conversion is simply
+	# evaluated for every possible raw value once and the columns are table lookups
+	key = (field.get('width', 1), field.get('signal'), field.get('conversion'), field.get('flip', False))
+	try:
+		return _tables[key]
+	except KeyError:
+		pass
+	convert = pp.field_converter(field)
+	values = [convert(v) for v in range(256**key[0])]
+	if all(type(v) == bool for v in values):
+		dtype = np.bool_
+	elif all(type(v) == int for v in values):
+		dtype = np.int64
+	else:
+		dtype = np.float64
+	table = _tables[key] = np.array(values, dtype=dtype)
+	return table
+
+def _read(arr, offsets, width, signed):
+	# arr is (N, PACKET_SIZE); returns an (N,) + offsets.shape array of little-endian ints
+	val = arr[:, offsets].astype(np.int64)
+	for i in range(1, width):
+		val |= arr[:, offsets + i].astype(np.int64) << (8*i)
+	if signed:
+		sign = 1 << (8*width - 1)
+		val = (val ^ sign) - sign
+	return val
+
+def _to_strings(words):
+	# (..., k) little-endian uint64 of packed ascii -> (...) array of bytes; numpy drops trailing NULs
+	words = np.ascontiguousarray(words, dtype='<u8')
+	return words.view('S%d' % (8*words.shape[-1])).reshape(words.shape[:-1])
+
+def _hex_strings(arr, start, count, size):
+	# hex of the consecutive records arr[:, start + i*size:start + (i+1)*size] for i < count
+	nbytes = count*size
+	padded = (nbytes + 3) // 4 * 4
+	region = np.zeros((len(arr), padded), dtype=np.uint8)
+	region[:, :nbytes] = arr[:, start:start + nbytes]
+	digits = HEX_DIGITS[region.reshape(len(arr), -1, 4)]
+	# four bytes of hex fill one uint64
+	words = digits[..., 0] | digits[..., 1] << 16 | digits[..., 2] << 32 | digits[..., 3] << 48
+	chars = np.ascontiguousarray(words).view(np.uint8)[:, :2*nbytes].reshape(len(arr), count, 2*size)
+	pad = (-2*size) % 8
+	chars = np.concatenate([chars, np.zeros(chars.shape[:-1] + (pad,), dtype=np.uint8)], -1)
+	return _to_strings(np.ascontiguousarray(chars).view('<u8'))
+
+def _int_to_hex_words(val):
+	# vectorized int_to_hex (not zero padded, with its "x" for negatives) as 9 packed ascii
+	# characters: a uint64 of the first 8 and a uint64 holding the 9th
+	mag = np.abs(val)
+	digits = np.zeros(val.shape, dtype='<u8')
+	for i in range(4):
+		# most significant byte first
+		digits |= HEX_DIGITS[(mag >> (24 - 8*i)) & 0xFF] << np.uint64(16*i)
+	nibbles = np.ones(val.shape, dtype=np.uint64)
+	for i in range(1, 8):
+		nibbles += ((mag >> (4*i)) > 0).astype(np.uint64)
+	# drop the leading zeros
+	digits >>= np.uint64(8)*(np.uint64(8) - nibbles)
+	neg = val < 0
+	low = np.where(neg, (digits << np.uint64(8)) | np.uint64(ord('x')), digits)
+	high = np.where(neg, digits >> np.uint64(56), np.uint64(0))
+	return low, high
+
+def _decode_fields(arr, fields, offsets, columns, keep=None):
+	for field in fields:
+		if 'groups' in field:
+			sub = pp.kept_within(keep, field['name'])
+			if sub is not None and not sub:
+				continue
+			count = pp.layout_count(field['count'])
+			burst = {}
+			for group in field['groups']:
+				# one column per burst entry, in the last axis
+				group_offsets = offsets[..., None] + group['offset'] + group['size']*np.arange(count)
+				_decode_fields(arr, group['fields'], group_offsets, burst, sub)
+			columns[field['name']] = burst
+			continue
+		if not pp.field_kept(field, keep):
+			continue
+		width = field.get('width', 1)
+		raw = _read(arr, offsets + field['offset'], width, field.get('signed', False))
+		if 'bitfield' in field:
+			for bit in pp.layout['bitfields'][field['bitfield']]:
+				if keep is not None and bit['name'] not in keep:
+					continue
+				if 'mask' in bit:
+					columns[bit['name']] = (raw >> bit['shift']) & bit['mask']
+				else:
+					val = (raw >> bit['bit']) & 1 == 1
+					columns[bit['name']] = ~val if bit.get('invert') else val
+		elif 'signal' in field or 'conversion' in field or field.get('flip'):
+			columns[field['name']] = _field_table(field)[raw]
+		else:
+			columns[field['name']] = raw
+
+def _decode_section(arr, section, start, batches=None, keep=None):
+	if batches is None:
+		offsets = np.array(start)
+	else:
+		offsets = start + section['size']*np.arange(batches)
+	columns = {}
+	if 'data_hash' in section and (keep is None or 'data_hash' in keep):
+		columns['data_hash'] = _hex_strings(arr, start, batches or 1, section['size'])
+		if batches is None:
+			columns['data_hash'] = columns['data_hash'][:, 0]
+	_decode_fields(arr, section['fields'], offsets, columns, keep)
+	return columns
+
+def _decode_callsigns(arr):
+	# only a handful of distinct callsigns show up, so decode each of those once
+	raw = np.ascontiguousarray(arr[:, 0:6]).view('V6').reshape(-1)
+	unique, inverse = np.unique(raw, return_inverse=True)
+	names = np.array([bytes(u).decode("ascii", errors="replace") for u in unique], dtype=object)
+	return names[inverse.reshape(-1)]
+
+def _decode_preamble(arr):
+	msg_op_states = arr[:, 10]
+	return {
+		'callsign': _decode_callsigns(arr),
+		'timestamp': _read(arr, np.array(6), 4, True),
+		'message_type': msg_op_states & 0x07,
+		'satellite_state': SAT_STATE_NAMES[(msg_op_states >> 3) & 0x07],
+		'FLASH_KILLED': (msg_op_states >> 6) & 1 == 1,
+		'MRAM_CPY': (msg_op_states >> 7) & 1 == 1,
+		'bytes_of_data': arr[:, 11].astype(np.int64),
+		'num_errors': arr[:, 12].astype(np.int64),
+	}
+
+def _decode_errors(arr, errors, packet_timestamp):
+	offsets = errors['start'] + 3*np.arange(errors['count'])
+	code = arr[:, offsets].astype(np.int64)
+	location = arr[:, offsets + 1].astype(np.int64)
+	timestamp = packet_timestamp[:, None] - pp.ERROR_TIME_BUCKET_SIZE*arr[:, offsets + 2].astype(np.int64)
+	# the two raw bytes as hex, followed by int_to_hex of the full timestamp
+	raw = HEX_DIGITS[code] | HEX_DIGITS[location] << np.uint64(16)
+	low, high = _int_to_hex_words(timestamp)
+	return {
+		'error_code': code & 0x7F,
+		'priority_bit': (code >> 7) & 1 == 1,
+		'error_location': location,
+		'timestamp': timestamp,
+		'error_code_name': ECODE_NAMES[code & 0x7F],
+		'error_location_name': ELOC_NAMES[location],
+		'data_hash': _to_strings(np.stack([raw | low << np.uint64(32), low >> np.uint64(32) | high << np.uint64(32)], -1)),
+	}
+
+def packets_to_array(packets):
+	"""
+	Returns an (N, 255) uint8 array of the packets, and {index: parse error} for those left
+	out, as parse_packet would reject them: hex strings of the wrong size or that aren't hex,
+	raw bytes of the wrong size, and anything that's neither
+	"""
+	if isinstance(packets, np.ndarray):
+		return packets.reshape(-1, PACKET_SIZE).astype(np.uint8, copy=False), {}
+	rows = []
+	rejected = {}
+	for i, ps in enumerate(packets):
+		if not isinstance(ps, pp._TEXT_TYPES):
+			rejected[i] = pp.PARSE_ERROR.INVALID_INPUT
+			continue
+		if len(ps) in (2*PACKET_SIZE, 2*PACKET_SIZE_NO_PARITY):
+			try:
+				ps = unhexlify(ps)
+			except (ValueError, TypeError):
+				rejected[i] = pp.PARSE_ERROR.NOT_HEX
+				continue
+		elif isinstance(ps, type(u'')) or len(ps) not in (PACKET_SIZE, PACKET_SIZE_NO_PARITY):
+			# only bytes can be raw packets
+			rejected[i] = pp.PARSE_ERROR.WRONG_SIZE
+			continue
+		rows.append(bytes(ps).ljust(PACKET_SIZE, b'\0'))
+	arr = np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(-1, PACKET_SIZE)
+	return arr, rejected
+
+def parse_packets_batch(packets, fields=None):
+	"""
+	Parses many packets (hex strings, raw bytes or an (N, 255) uint8 array) at once.
+	Returns a dict of message type -> columns, and a dict of packet index -> parse errors
+	for the packets that had any. Each message type's columns mirror the shape of
+	parse_packet's output, with an extra leading axis over packets (and one over batches
+	in 'data'); 'index' gives the position of each row in the input. The data_hash
+	columns hold bytes rather than str. fields is a projection as for parse_packet: only
+	those sections and fields get columns (and only their parse errors are reported).
+	"""
+	keep = pp.projection_sections(fields) if fields is not None else dict.fromkeys(('preamble', 'current_info', 'data', 'errors'))
+	arr, rejected = packets_to_array(packets)
+	# indices into the input of each row of arr
+	index = np.delete(np.arange(len(arr) + len(rejected)), sorted(rejected))
+	errs = dict((i, [err]) for i, err in rejected.items())
+
+	preamble = _decode_preamble(arr)
+	if 'current_info' in keep:
+		current_info = _decode_section(arr, pp.layout['current_info'], pp.layout['current_info']['start'], keep=keep['current_info'])
+	type_ids = preamble['message_type']
+
+	def project(columns, section, mask):
+		if keep[section] is None:
+			return dict((k, v[mask]) for k, v in columns.items())
+		return dict((k, v[mask]) for k, v in columns.items() if k in keep[section])
+
+	def add_errs(rows, err):
+		for i in rows:
+			errs.setdefault(int(i), []).append(err)
+
+	result = {}
+	known = np.zeros(len(arr), dtype=np.bool_)
+	for name, section in pp.layout['message_types'].items():
+		mask = type_ids == section['id']
+		known |= mask
+		if not mask.any():
+			continue
+		group = arr[mask]
+		batches = pp.layout_count(section['batches']) if 'batches' in section else None
+		result[name] = {'index': index[mask]}
+		if 'preamble' in keep:
+			result[name]['preamble'] = project(preamble, 'preamble', mask)
+			if 'message_type' in result[name]['preamble']:
+				result[name]['preamble']['message_type'] = np.full(len(group), name)
+		if 'current_info' in keep:
+			result[name]['current_info'] = project(current_info, 'current_info', mask)
+		if 'data' in keep:
+			result[name]['data'] = _decode_section(group, section, pp.DATA_START, batches, keep['data'])
+		if 'errors' in keep:
+			result[name]['errors'] = _decode_errors(group, section['errors'], preamble['timestamp'][mask])
+
+	# same ordering of errors as parse_packet
+	invalid_state = preamble['satellite_state'] == pp.INVALID_STR
+	add_errs(index[~known], pp.PARSE_ERROR.INVALID_MSG_TYPE)
+	add_errs(index[invalid_state], pp.PARSE_ERROR.INVALID_SAT_STATE)
+	for group in result.values():
+		if 'errors' not in group:
+			continue
+		group_errs = group['errors']
+		add_errs(group['index'][(group_errs['error_location_name'] == pp.INVALID_STR).any(axis=1)], pp.PARSE_ERROR.INVALID_ELOC)
+		add_errs(group['index'][(group_errs['error_code_name'] == pp.INVALID_STR).any(axis=1)], pp.PARSE_ERROR.INVALID_ECODE)
+		if keep['errors'] is not None:
+			group['errors'] = dict((k, v) for k, v in group_errs.items() if k in keep['errors'])
+
+	if (~known).any():
+		invalid = result[pp.INVALID_STR] = {'index': index[~known]}
+		if 'preamble' in keep:
+			invalid['preamble'] = project(preamble, 'preamble', ~known)
+			if 'message_type' in invalid['preamble']:
+				invalid['preamble']['message_type'] = np.full((~known).sum(), pp.INVALID_STR)
+		if 'current_info' in keep:
+			invalid['current_info'] = project(current_info, 'current_info', ~known)
+	return result, errs
@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# parser benchmarks: throughput and allocations of parse_packet and each of its stages, per
+# message type, over corpora built from the sample packets
+#
+#   python bench.py -o results.json                   # run and save the results
+#   python bench.py --compare baseline.json           # run and flag regressions against a saved run
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from binascii import unhexlify
+from collections import OrderedDict
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+
+def build_corpora():
+	""" Returns {corpus name: [hex packets]}: the sample packets by message type, and all of them """
+	corpora = OrderedDict()
+	for ps in pp.SAMPLE_PACKETS.values():
+		message_type = pp.parse_preamble(ps)[0]['message_type']
+		corpora.setdefault(message_type, []).append(ps)
+	corpora['ALL'] = list(pp.SAMPLE_PACKETS.values())
+	return corpora
+
+def stage_calls(corpus):
+	"""
+	Returns {stage: [zero argument callables]} with one call per packet of the corpus for
+	parse_packet and for each of its stages (with their inputs prepared ahead of time)
+	"""
+	stages = OrderedDict([('parse_packet', []), ('parse_preamble', []), ('parse_current_info', [])])
+	errors = []
+	for ps in corpus:
+		buf = unhexlify(ps)
+		preamble = pp.parse_preamble(ps, buf)[0]
+		message_type = preamble['message_type']
+		stages['parse_packet'].append(lambda ps=ps: pp.parse_packet(ps))
+		stages['parse_preamble'].append(lambda ps=ps, buf=buf: pp.parse_preamble(ps, buf))
+		stages['parse_current_info'].append(lambda ps=ps, buf=buf: pp.parse_current_info(ps, buf))
+		if message_type == pp.INVALID_STR:
+			continue
+		data_parser = pp.DATA_PARSERS[message_type]
+		stages.setdefault(data_parser.__name__, []).append(lambda ps=ps, buf=buf, f=data_parser: f(ps, buf))
+		errors.append(lambda ps=ps, buf=buf, t=message_type, ts=preamble['timestamp']: pp.parse_errors(ps, t, ts, buf))
+	stages['parse_errors'] = errors
+	return stages
+
+def measure_rate(calls, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+	""" Returns the best calls/sec over repeat runs of at least min_time seconds each """
+	best = 0.0
+	for _ in range(repeat):
+		n = 0
+		start = time.perf_counter()
+		elapsed = 0.0
+		while elapsed < min_time:
+			for call in calls:
+				call()
+			n += len(calls)
+			elapsed = time.perf_counter() - start
+		best = max(best, n / elapsed)
+	return best
+
+def measure_allocs(calls):
+	"""
+	Returns (peak, retained) bytes per call: the mean of the traced memory peak above the
+	starting point during each call, and of the memory still held by its result
+	"""
+	peak = 0
+	retained = 0
+	tracemalloc.start()
+	try:
+		for call in calls:
+			before = tracemalloc.get_traced_memory()[0]
+			tracemalloc.reset_peak()
+			result = call()
+			current, call_peak = tracemalloc.get_traced_memory()
+			peak += call_peak - before
+			retained += current - before
+			del result
+	finally:
+		tracemalloc.stop()
+	return peak / len(calls), retained / len(calls)
+
+def run(min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT, corpora=None):
+	""" Returns the benchmark results as a JSON-serializable dict """
+	results = OrderedDict()
+	for corpus_name, corpus in (corpora or build_corpora()).items():
+		results[corpus_name] = OrderedDict()
+		for stage, calls in stage_calls(corpus).items():
+			if not calls:
+				continue
+			peak, retained = measure_allocs(calls)
+			results[corpus_name][stage] = OrderedDict([
+				('packets_per_sec', measure_rate(calls, min_time, repeat)),
+				('alloc_peak_bytes', peak),
+				('alloc_retained_bytes', retained),
+			])
+	return OrderedDict([
+		('python', platform.python_version()),
+		('implementation', platform.python_implementation()),
+		('machine', platform.machine()),
+		('time', time.time()),
+		('results', results),
+	])
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+	"""
+	Returns a list of (corpus, stage, metric, baseline value, current value) for every
+	metric that got worse by more than threshold (a fraction): a lower packets/sec, or more
+	bytes allocated
+	"""
+	regressions = []
+	for corpus_name, stages in current['results'].items():
+		for stage, metrics in stages.items():
+			base = baseline['results'].get(corpus_name, {}).get(stage)
+			if base is None:
+				continue
+			for metric, val in metrics.items():
+				if metric not in base:
+					continue
+				old = base[metric]
+				if metric == 'packets_per_sec':
+					worse = val < old*(1 - threshold)
+				else:
+					worse = val > old*(1 + threshold)
+				if worse:
+					regressions.append((corpus_name, stage, metric, old, val))
+	return regressions
+
+def format_results(results):
+	lines = ['%-12s %-24s %14s %12s %14s' % ('corpus', 'stage', 'packets/sec', 'peak bytes', 'retained bytes')]
+	for corpus_name, stages in results['results'].items():
+		for stage, metrics in stages.items():
+			lines.append('%-12s %-24s %14.0f %12.0f %14.0f' % (corpus_name, stage, metrics['packets_per_sec'], metrics['alloc_peak_bytes'], metrics['alloc_retained_bytes']))
+	return '\n'.join(lines)
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmarks parse_packet and its stages per message type")
+	parser.add_argument("-o", "--output", help="file to write the results to as JSON")
+	parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against; exits with 1 on regressions")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="fraction a metric may get worse by before it counts as a regression")
+	parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds per timing run")
+	parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timing runs per stage (the best is kept)")
+	args = parser.parse_args()
+
+	results = run(args.min_time, args.repeat)
+	print(format_results(results))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2)
+
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		regressions = compare(baseline, results, args.threshold)
+		for corpus_name, stage, metric, old, val in regressions:
+			print("REGRESSION %s %s %s: %.1f -> %.1f" % (corpus_name, stage, metric, old, val))
+		if regressions:
+			sys.exit(1)
+		print("no regressions past %d%%" % (args.threshold*100))
+
+if __name__ == "__main__":
+	main()
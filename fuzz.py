@@ -0,0 +1,270 @@
+#!/usr/bin/python
+# fuzzing of parse_packet and parse_packet_bytes: every input, however broken, has to come
+# back as (packet, parse errors) with only PARSE_ERROR reasons, and garbage shouldn't parse
+# much slower than real packets (under noisy RF conditions most of what's received is garbage)
+#
+#   python fuzz.py -n 1000000 -j 4 -o fuzz.json
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import traceback
+from binascii import hexlify, unhexlify
+from collections import OrderedDict
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+DEFAULT_COUNT = 1000000
+DEFAULT_CHUNK = 10000
+DEFAULT_VALID_COUNT = 20000
+CACHE_SIZE = 1024
+MAX_FAILURES = 20
+
+PARSE_ERRORS = set(v for k, v in vars(pp.PARSE_ERROR).items() if not k.startswith('_'))
+
+# the ways the parser is called; each input is parsed in every mode ('cache' goes through
+# a ParseCache's methods instead)
+MODES = OrderedDict([
+	('plain', {}),
+	('lazy', {'lazy': True}),
+	('correct', {'correct': True}),
+	('validate', {'validate': True}),
+	('projected', {'fields': ['preamble', 'data']}),
+	('compact', {'compact': True}),
+	('cached', {'cache': True}),
+])
+
+_SAMPLES = [unhexlify(ps) for ps in pp.SAMPLE_PACKETS.values()]
+
+def _sample(rng):
+	return bytearray(rng.choice(_SAMPLES))
+
+def _random_hex(rng):
+	return pp.gen_random_buf().decode('ascii')
+
+def _flip_bits(rng):
+	buf = _sample(rng)
+	for _ in range(rng.randint(1, 16)):
+		buf[rng.randrange(len(buf))] ^= 1 << rng.randrange(8)
+	return hexlify(buf).decode('ascii')
+
+def _garble_preamble(rng):
+	# a real body behind a random callsign, timestamp, message type and state
+	buf = _sample(rng)
+	buf[:13] = bytearray(rng.getrandbits(8) for _ in range(13))
+	return hexlify(buf).decode('ascii')
+
+def _replace_chars(rng, chars):
+	ps = list(hexlify(_sample(rng)).decode('ascii'))
+	for _ in range(rng.randint(1, 8)):
+		ps[rng.randrange(len(ps))] = rng.choice(chars)
+	return ''.join(ps)
+
+def _non_hex(rng):
+	return _replace_chars(rng, 'ghijklmnopqrstuvwxyzGXZ \t\n\r-_.:;!?#%+=/\\\'"\x00\x7f')
+
+def _non_ascii(rng):
+	# including lone surrogates, which can't be encoded
+	return _replace_chars(rng, [chr(rng.randrange(0x80, 0x3000)) for _ in range(6)] + [chr(rng.randrange(0xd800, 0xe000)) for _ in range(2)])
+
+def _resize(rng):
+	ps = hexlify(_sample(rng)).decode('ascii')
+	size = rng.choice([0, 1, 2, 22, 444, 445, 447, 448, 508, 509, 511, 512, rng.randrange(1024)])
+	return (ps * 3)[:size]
+
+def _random_bytes(rng):
+	# the size of a hex packet, but not hex (or even ascii)
+	return bytes(bytearray(rng.getrandbits(8) for _ in range(rng.choice([510, 446]))))
+
+def _other_types(rng):
+	ps = rng.choice([_flip_bits, _non_hex, _random_hex])(rng)
+	kind = rng.randrange(5)
+	if kind == 0:
+		return bytearray(ps.encode('utf-8'))
+	if kind == 1:
+		return memoryview(ps.encode('utf-8'))
+	if kind == 2:
+		return ps.encode('utf-8')
+	return rng.choice([None, 0, 510, 3.5, [0]*510, {'ps': ps}, (ps,), object()])
+
+def _raw_bytes(rng):
+	buf = _sample(rng)
+	for _ in range(rng.randint(0, 16)):
+		buf[rng.randrange(len(buf))] = rng.getrandbits(8)
+	kind = rng.randrange(6)
+	if kind == 0:
+		buf = buf[:rng.choice([0, 222, 224, 254, 256 % len(buf)])]
+	elif kind == 1:
+		return memoryview(bytes(buf))
+	elif kind == 2:
+		return bytes(buf)
+	elif kind == 3:
+		return rng.choice([None, 255, list(buf), hexlify(buf).decode('ascii')])
+	return buf
+
+# name -> (parse function, input generator)
+MUTATORS = OrderedDict([
+	('random_hex', (pp.parse_packet, _random_hex)),
+	('flip_bits', (pp.parse_packet, _flip_bits)),
+	('garble_preamble', (pp.parse_packet, _garble_preamble)),
+	('non_hex', (pp.parse_packet, _non_hex)),
+	('non_ascii', (pp.parse_packet, _non_ascii)),
+	('resize', (pp.parse_packet, _resize)),
+	('random_bytes', (pp.parse_packet, _random_bytes)),
+	('other_types', (pp.parse_packet, _other_types)),
+	('raw_bytes', (pp.parse_packet_bytes, _raw_bytes)),
+])
+
+def check_result(result):
+	""" Returns what's wrong with a parse result, or None """
+	if type(result) != tuple or len(result) != 2:
+		return "not a (packet, parse errors) pair"
+	packet, parse_errs = result
+	if not isinstance(packet, (dict, pp.Packet)):
+		return "packet is a %s" % type(packet).__name__
+	if type(parse_errs) != list:
+		return "parse errors are a %s" % type(parse_errs).__name__
+	unknown = [err for err in parse_errs if err not in PARSE_ERRORS]
+	if unknown:
+		return "unknown parse errors %r" % unknown
+	return None
+
+def _finish(result):
+	# decode everything a lazy packet put off
+	packet = result[0]
+	if isinstance(packet, pp.Packet):
+		packet.to_dict()
+		return (packet, packet.parse_errors)
+	return result
+
+def run_inputs(calls, options):
+	"""
+	Parses each (parse function, input) with the given keyword options. Returns (results,
+	seconds, [(index, formatted exception)]); results has None for the calls that raised.
+	"""
+	results = []
+	failures = []
+	options = dict(options)
+	cache = pp.ParseCache(CACHE_SIZE) if options.pop('cache', False) else None
+	start = pp._clock()
+	for i, (parse, data) in enumerate(calls):
+		if cache is not None:
+			parse = cache.parse_packet_bytes if parse is pp.parse_packet_bytes else cache.parse_packet
+		try:
+			results.append(_finish(parse(data, **options)))
+		except Exception:
+			results.append(None)
+			failures.append((i, traceback.format_exc()))
+	return results, pp._clock() - start, failures
+
+def fuzz(count=DEFAULT_COUNT, seed=0, chunk=DEFAULT_CHUNK):
+	"""
+	Parses count generated inputs in every mode. Returns {mode: {'inputs', 'seconds',
+	'parse_errors': {reason: count}}} and a list of failures (inputs that raised or gave a
+	malformed result)
+	"""
+	rng = random.Random(seed)
+	# gen_random_buf uses the random module's own generator
+	random.seed(seed)
+	names = list(MUTATORS)
+	stats = OrderedDict((mode, {'inputs': 0, 'seconds': 0.0, 'parse_errors': {}}) for mode in MODES)
+	failures = []
+	done = 0
+	while done < count:
+		n = min(chunk, count - done)
+		sources = [rng.choice(names) for _ in range(n)]
+		calls = [(MUTATORS[name][0], MUTATORS[name][1](rng)) for name in sources]
+		for mode, options in MODES.items():
+			results, seconds, raised = run_inputs(calls, options)
+			mode_stats = stats[mode]
+			mode_stats['inputs'] += n
+			mode_stats['seconds'] += seconds
+			for i, tb in raised:
+				failures.append({'mode': mode, 'mutator': sources[i], 'input': repr(calls[i][1])[:200], 'error': tb.strip().splitlines()[-1], 'traceback': tb})
+			for i, result in enumerate(results):
+				if result is None:
+					continue
+				problem = check_result(result)
+				if problem is not None:
+					failures.append({'mode': mode, 'mutator': sources[i], 'input': repr(calls[i][1])[:200], 'error': problem})
+					continue
+				counts = mode_stats['parse_errors']
+				for err in result[1]:
+					counts[err] = counts.get(err, 0) + 1
+		done += n
+	return stats, failures
+
+def _fuzz_worker(task):
+	return fuzz(*task)
+
+def valid_rates(count=DEFAULT_VALID_COUNT):
+	""" {mode: packets/sec} for parsing the (real) sample packets """
+	samples = list(pp.SAMPLE_PACKETS.values())
+	calls = [(pp.parse_packet, samples[i % len(samples)]) for i in range(count)]
+	rates = OrderedDict()
+	for mode, options in MODES.items():
+		results, seconds, raised = run_inputs(calls, options)
+		rates[mode] = count / seconds if seconds else 0.0
+	return rates
+
+def report(stats, failures, valid):
+	result = OrderedDict()
+	for mode, mode_stats in stats.items():
+		garbage = mode_stats['inputs'] / mode_stats['seconds'] if mode_stats['seconds'] else 0.0
+		result[mode] = OrderedDict([
+			('inputs', mode_stats['inputs']),
+			('garbage_per_sec', garbage),
+			('valid_per_sec', valid[mode]),
+			('garbage_vs_valid', garbage / valid[mode] if valid[mode] else 0.0),
+			('parse_errors', mode_stats['parse_errors']),
+		])
+	return OrderedDict([('modes', result), ('failures', len(failures))])
+
+def main():
+	parser = argparse.ArgumentParser(description="Fuzzes parse_packet and parse_packet_bytes with garbage and mangled packets")
+	parser.add_argument("-n", "--count", type=int, default=DEFAULT_COUNT, help="inputs to generate (each is parsed in every mode)")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="inputs generated at a time")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="fuzzing processes (garbage rates are per process)")
+	parser.add_argument("-o", "--output", help="file to write the report and failing inputs to as JSON")
+	args = parser.parse_args()
+
+	valid = valid_rates()
+	if args.jobs > 1:
+		share = -(-args.count // args.jobs)
+		tasks = [(min(share, args.count - i*share), args.seed + i, args.chunk) for i in range(args.jobs)]
+		pool = multiprocessing.Pool(args.jobs)
+		try:
+			results = pool.map(_fuzz_worker, [task for task in tasks if task[0] > 0])
+		finally:
+			pool.close()
+			pool.join()
+		stats, failures = results[0]
+		for more_stats, more_failures in results[1:]:
+			failures += more_failures
+			for mode, mode_stats in more_stats.items():
+				total = stats[mode]
+				total['inputs'] += mode_stats['inputs']
+				total['seconds'] += mode_stats['seconds']
+				for err, n in mode_stats['parse_errors'].items():
+					total['parse_errors'][err] = total['parse_errors'].get(err, 0) + n
+	else:
+		stats, failures = fuzz(args.count, args.seed, args.chunk)
+
+	result = report(stats, failures, valid)
+	print(json.dumps(result, indent=2))
+	for failure in failures[:MAX_FAILURES]:
+		sys.stderr.write("%(mode)s/%(mutator)s: %(error)s\n  input: %(input)s\n" % failure)
+	if args.output:
+		result['failing_inputs'] = failures
+		with open(args.output, 'w') as f:
+			json.dump(result, f, indent=2)
+	sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+	main()
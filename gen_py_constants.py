@@ -2,6 +2,32 @@
 # generates (importable) python files out of JSON constant files
 # this is actually cleaner when you need to import packetparse.py
 
-with open("constants.json", "r") as c_in:
-    with open("constants.py", "w") as c_out:
-        c_out.write("constants = " + c_in.read())
+import json
+from collections import OrderedDict
+
+def to_python(value, indent="", in_list=False):
+    # python source for a parsed JSON value, laid out like the JSON files (list items
+    # holding only plain values on one line) and keeping their key order
+    if value is True or value is False or value is None:
+        return repr(value)
+    if isinstance(value, dict):
+        items = [json.dumps(key) + ": " + to_python(val, indent + "\t") for key, val in value.items()]
+        brackets = "{}"
+    elif isinstance(value, list):
+        items = [to_python(val, indent + "\t", True) for val in value]
+        brackets = "[]"
+    else:
+        # strings and numbers are written the same in both
+        return json.dumps(value)
+    if not items:
+        return brackets
+    if in_list and not any(isinstance(val, (dict, list)) for val in (value.values() if isinstance(value, dict) else value)):
+        return brackets[0] + ", ".join(items) + brackets[1]
+    inner = indent + "\t"
+    return brackets[0] + "\n" + ",\n".join(inner + item for item in items) + "\n" + indent + brackets[1]
+
+for name in ["constants", "layout"]:
+    with open(name + ".json", "r") as c_in:
+        value = json.load(c_in, object_pairs_hook=OrderedDict)
+    with open(name + ".py", "w") as c_out:
+        c_out.write(name + " = " + to_python(value) + "\n")
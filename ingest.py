@@ -0,0 +1,359 @@
+#!/usr/bin/python
+# asyncio ingest server: accepts frames (hex text or raw bytes) over TCP, UDP and Unix
+# sockets, finds the packets in them, parses them and hands the results to async sinks
+#
+#   python ingest.py serve --tcp 127.0.0.1:9000 --udp 127.0.0.1:9000 > packets.jsonl
+#   python ingest.py replay --tcp 127.0.0.1:9000 --count 10000 dump.txt
+#   python ingest.py bench --count 10000        # server and replay client in one process
+#
+# Requires python 3.7+.
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from binascii import unhexlify
+from collections import OrderedDict
+
+if not __package__:
+	import packetparse as pp
+	from serialize import dumps_record
+else:
+	from . import packetparse as pp
+	from .serialize import dumps_record
+
+PACKET_SIZE = 255
+READ_SIZE = 1 << 16
+DEFAULT_CONCURRENCY = 4
+DEFAULT_QUEUE_SIZE = 1024
+
+class FrameScanner(object):
+	"""
+	Incremental sync word search over a stream of hex text (line breaks are ignored, as by
+	iter_packets) or of raw bytes. feed() returns the complete packets found so far.
+	"""
+	def __init__(self, raw=False):
+		self.raw = raw
+		self.sync = unhexlify(pp.SYNC_WORD) if raw else pp.SYNC_WORD
+		self.size = PACKET_SIZE if raw else pp.PACKET_HEX_LEN
+		self.buf = b""
+
+	def feed(self, data):
+		if not self.raw:
+			data = data.translate(None, b"\r\n")
+		buf = self.buf + data
+		frames = []
+		search = 0
+		while True:
+			i = buf.find(self.sync, search)
+			if i < 0:
+				# a sync word may still straddle the end of the data
+				keep = max(search, len(buf) - len(self.sync) + 1)
+				break
+			if len(buf) - i < self.size:
+				keep = i
+				break
+			frames.append(buf[i:i + self.size])
+			search = i + self.size
+		self.buf = buf[keep:]
+		return frames
+
+def parse_frame(frame, correct=False, validate=True):
+	""" Parses a frame found by a FrameScanner """
+	if len(frame) == pp.PACKET_HEX_LEN:
+		return pp.parse_packet(frame, correct=correct, validate=validate)
+	return pp.parse_packet_bytes(frame, correct=correct, validate=validate)
+
+def _source_name(addr, default):
+	if isinstance(addr, tuple):
+		return "%s:%d" % addr[:2]
+	return addr or default
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+	def __init__(self, server, raw):
+		self.server = server
+		self.raw = raw
+
+	def datagram_received(self, data, addr):
+		# each datagram stands alone
+		for frame in FrameScanner(self.raw).feed(data):
+			self.server._offer(_source_name(addr, "udp"), frame)
+
+class IngestServer(object):
+	"""
+	Parses the frames received by its listeners and awaits each sink with
+	{"source", "received", "packet", "parse_errors"} for every packet, in the order the
+	packets were parsed. At most concurrency packets are parsed (and sunk) at a time, in
+	executor if one is given. Up to queue_size received frames wait for a worker: when
+	the queue is full, stream connections stop being read (so senders are slowed down by
+	flow control) and datagrams are dropped (and counted). Unless validate is False, frames
+	that fail packetparse's validation are only counted (as invalid). Exceptions raised by
+	the parser or a sink are counted (as errors) and the worker goes on to the next frame.
+	"""
+	def __init__(self, sinks, concurrency=DEFAULT_CONCURRENCY, queue_size=DEFAULT_QUEUE_SIZE, correct=False, executor=None, validate=True):
+		self.sinks = list(sinks)
+		self.concurrency = concurrency
+		self.queue_size = queue_size
+		self.correct = correct
+		self.validate = validate
+		self.executor = executor
+		self._queue = None
+		self._workers = []
+		self._servers = []
+		self._transports = []
+		self._connections = set()
+		self.counts = dict.fromkeys(('received', 'parsed', 'with_errors', 'invalid', 'dropped', 'errors'), 0)
+		self.latency_total = 0.0
+		self.latency_max = 0.0
+
+	async def start(self):
+		self._queue = asyncio.Queue(self.queue_size)
+		self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+	async def listen_tcp(self, host, port, raw=False):
+		server = await asyncio.start_server(lambda r, w: self._handle_stream(r, w, raw), host, port)
+		self._servers.append(server)
+		return server
+
+	async def listen_unix(self, path, raw=False):
+		server = await asyncio.start_unix_server(lambda r, w: self._handle_stream(r, w, raw), path)
+		self._servers.append(server)
+		return server
+
+	async def listen_udp(self, host, port, raw=False):
+		loop = asyncio.get_event_loop()
+		transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self, raw), local_addr=(host, port))
+		self._transports.append(transport)
+		return transport
+
+	async def _handle_stream(self, reader, writer, raw):
+		source = _source_name(writer.get_extra_info('peername'), "unix")
+		scanner = FrameScanner(raw)
+		task = asyncio.current_task()
+		self._connections.add(task)
+		try:
+			while True:
+				data = await reader.read(READ_SIZE)
+				if not data:
+					break
+				for frame in scanner.feed(data):
+					self.counts['received'] += 1
+					# waits while the queue is full, which is what holds the sender back
+					await self._queue.put((source, frame, time.time()))
+		except asyncio.CancelledError:
+			# close() dropping the connection
+			pass
+		finally:
+			self._connections.discard(task)
+			writer.close()
+
+	def _offer(self, source, frame):
+		self.counts['received'] += 1
+		try:
+			self._queue.put_nowait((source, frame, time.time()))
+		except asyncio.QueueFull:
+			self.counts['dropped'] += 1
+
+	async def _worker(self):
+		loop = asyncio.get_event_loop()
+		while True:
+			source, frame, received = await self._queue.get()
+			try:
+				try:
+					if self.executor is None:
+						packet, parse_errs = parse_frame(frame, self.correct, self.validate)
+					else:
+						packet, parse_errs = await loop.run_in_executor(self.executor, parse_frame, frame, self.correct, self.validate)
+				except asyncio.CancelledError:
+					raise
+				except Exception:
+					self.counts['errors'] += 1
+					continue
+				if not packet:
+					self.counts['invalid'] += 1
+					continue
+				record = {"source": source, "received": received, "packet": packet, "parse_errors": parse_errs}
+				for sink in self.sinks:
+					# one failing sink doesn't keep the record from the others
+					try:
+						await sink(record)
+					except asyncio.CancelledError:
+						raise
+					except Exception:
+						self.counts['errors'] += 1
+				self.counts['parsed'] += 1
+				self.counts['with_errors'] += bool(parse_errs)
+				latency = time.time() - received
+				self.latency_total += latency
+				self.latency_max = max(self.latency_max, latency)
+			finally:
+				self._queue.task_done()
+
+	async def drain(self):
+		""" Waits until every frame received so far has been parsed and sunk """
+		await self._queue.join()
+
+	async def close(self):
+		""" Stops listening, drops open connections, finishes the queued frames and stops the workers """
+		for server in self._servers:
+			server.close()
+			await server.wait_closed()
+		for transport in self._transports:
+			transport.close()
+		for task in list(self._connections):
+			task.cancel()
+		await asyncio.gather(*self._connections, return_exceptions=True)
+		await self.drain()
+		for worker in self._workers:
+			worker.cancel()
+		await asyncio.gather(*self._workers, return_exceptions=True)
+
+	def stats(self):
+		""" Frame counts and the mean and max seconds from receiving a frame to it being sunk """
+		stats = dict(self.counts)
+		stats['queued'] = self._queue.qsize() if self._queue else 0
+		stats['latency_mean'] = self.latency_total / self.counts['parsed'] if self.counts['parsed'] else 0.0
+		stats['latency_max'] = self.latency_max
+		return stats
+
+def json_lines_sink(out=None):
+	""" Returns a sink that writes each packet as a line like the packetparse CLI does """
+	async def sink(record):
+		line = OrderedDict([("source", record["source"]), ("packet", record["packet"]), ("parse_errors", record["parse_errors"])])
+		(out or sys.stdout).write(dumps_record(line) + "\n")
+	return sink
+
+def _frames(packets, raw):
+	for ps in packets:
+		if type(ps) != bytes:
+			ps = ps.encode('ascii')
+		yield unhexlify(ps) if raw else ps + b"\n"
+
+async def replay(packets, tcp=None, udp=None, unix=None, raw=False, rate=None):
+	"""
+	Sends hex packets to an ingest server at one of tcp/udp ((host, port)) or unix (a
+	path), as raw bytes if raw, at up to rate packets/sec. Returns (packets sent, seconds).
+	"""
+	loop = asyncio.get_event_loop()
+	start = time.time()
+	sent = 0
+	writer = transport = None
+	if udp is not None:
+		transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=udp)
+	elif unix is not None:
+		_, writer = await asyncio.open_unix_connection(unix)
+	else:
+		_, writer = await asyncio.open_connection(*tcp)
+	try:
+		for frame in _frames(packets, raw):
+			if transport is not None:
+				transport.sendto(frame)
+			else:
+				writer.write(frame)
+				await writer.drain()
+			sent += 1
+			if rate:
+				delay = start + sent / rate - time.time()
+				if delay > 0:
+					await asyncio.sleep(delay)
+			elif transport is not None and sent % 64 == 0:
+				# let the server's end of the loopback keep up
+				await asyncio.sleep(0)
+	finally:
+		if transport is not None:
+			transport.close()
+		else:
+			writer.close()
+	return sent, time.time() - start
+
+def _address(val):
+	host, port = val.rsplit(':', 1)
+	return host, int(port)
+
+def _replay_packets(files, count):
+	if files:
+		packets = [ps for path in files for offset, ps in pp.iter_packets(path)]
+	else:
+		packets = list(pp.SAMPLE_PACKETS.values())
+	return list(itertools.islice(itertools.cycle(packets), count or len(packets)))
+
+async def _serve(args):
+	server = IngestServer([json_lines_sink()], args.concurrency, args.queue_size, args.correct)
+	await server.start()
+	if args.tcp:
+		await server.listen_tcp(*_address(args.tcp), raw=args.raw)
+	if args.udp:
+		await server.listen_udp(*_address(args.udp), raw=args.raw)
+	if args.unix:
+		await server.listen_unix(args.unix, raw=args.raw)
+	try:
+		while True:
+			await asyncio.sleep(3600)
+	finally:
+		await server.close()
+		sys.stderr.write(json.dumps(server.stats()) + "\n")
+
+async def _replay(args):
+	target = {}
+	if args.udp:
+		target['udp'] = _address(args.udp)
+	elif args.unix:
+		target['unix'] = args.unix
+	else:
+		target['tcp'] = _address(args.tcp)
+	sent, seconds = await replay(_replay_packets(args.files, args.count), raw=args.raw, rate=args.rate, **target)
+	print("sent %d packets in %.3fs (%.0f/s)" % (sent, seconds, sent / seconds))
+
+async def _bench(args):
+	# a server and replay client over loopback TCP, with a sink that only counts
+	async def discard(record):
+		pass
+	server = IngestServer([discard], args.concurrency, args.queue_size, args.correct)
+	await server.start()
+	listener = await server.listen_tcp('127.0.0.1', 0, raw=args.raw)
+	port = listener.sockets[0].getsockname()[1]
+	start = time.time()
+	sent, _ = await replay(_replay_packets(args.files, args.count), tcp=('127.0.0.1', port), raw=args.raw, rate=args.rate)
+	while server.counts['received'] < sent:
+		await asyncio.sleep(0.001)
+	await server.drain()
+	seconds = time.time() - start
+	await server.close()
+	stats = server.stats()
+	print("%d packets in %.3fs (%.0f/s), latency mean %.2fms max %.2fms" % (stats['parsed'], seconds, stats['parsed'] / seconds, stats['latency_mean']*1e3, stats['latency_max']*1e3))
+
+def main():
+	parser = argparse.ArgumentParser(description="asyncio ingest server for EQUiSat packets")
+	sub = parser.add_subparsers(dest="command")
+	serve = sub.add_parser("serve", help="parse packets from sockets and print them as JSON Lines")
+	replayer = sub.add_parser("replay", help="send packets from dump files (or the samples) to a server")
+	bench = sub.add_parser("bench", help="measure throughput and latency against a local server")
+	for p in (serve, replayer):
+		p.add_argument("--tcp", metavar="HOST:PORT")
+		p.add_argument("--udp", metavar="HOST:PORT")
+		p.add_argument("--unix", metavar="PATH")
+	for p in (serve, replayer, bench):
+		p.add_argument("--raw", action="store_true", help="frames are raw bytes rather than hex text")
+	for p in (serve, bench):
+		p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+		p.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+		p.add_argument("--correct", action="store_true", help="apply Reed-Solomon correction before parsing")
+	for p in (replayer, bench):
+		p.add_argument("files", nargs="*", help="hex dump files to take the packets from")
+		p.add_argument("--count", type=int, help="number of packets to send (cycling through them)")
+		p.add_argument("--rate", type=float, help="packets/sec to send at (default: as fast as possible)")
+	args = parser.parse_args()
+
+	commands = {"serve": _serve, "replay": _replay, "bench": _bench}
+	if args.command not in commands:
+		parser.print_help()
+		return
+	try:
+		asyncio.run(commands[args.command](args))
+	except KeyboardInterrupt:
+		pass
+
+if __name__ == "__main__":
+	main()
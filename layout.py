@@ -0,0 +1,277 @@
+layout = {
+	"bitfields": {
+		"event_history": [
+			{"name": "ANTENNA_DEPLOYED", "bit": 1},
+			{"name": "LION_1_CHARGED", "bit": 2},
+			{"name": "LION_2_CHARGED", "bit": 3},
+			{"name": "LIFEPO4_B1_CHARGED", "bit": 4},
+			{"name": "LIFEPO4_B2_CHARGED", "bit": 5},
+			{"name": "FIRST_FLASH", "bit": 6},
+			{"name": "PROG_MEM_REWRITTEN", "bit": 7}
+		],
+		"bat_digsigs_1": [
+			{"name": "L1_RUN_CHG", "bit": 0},
+			{"name": "L2_RUN_CHG", "bit": 1},
+			{"name": "LF_B1_RUN_CHG", "bit": 2},
+			{"name": "LF_B2_RUN_CHG", "bit": 3},
+			{"name": "LF_B2_CHGN", "bit": 4, "invert": True},
+			{"name": "LF_B2_FAULTN", "bit": 5, "invert": True},
+			{"name": "LF_B1_FAULTN", "bit": 6, "invert": True},
+			{"name": "LF_B1_CHGN", "bit": 7, "invert": True}
+		],
+		"bat_digsigs_2": [
+			{"name": "L2_ST", "bit": 0},
+			{"name": "L1_ST", "bit": 1},
+			{"name": "L1_DISG", "bit": 2, "invert": True},
+			{"name": "L2_DISG", "bit": 3, "invert": True},
+			{"name": "L1_CHGN", "bit": 4, "invert": True},
+			{"name": "L1_FAULTN", "bit": 5, "invert": True},
+			{"name": "L2_CHGN", "bit": 6, "invert": True},
+			{"name": "L2_FAULTN", "bit": 7, "invert": True}
+		],
+		"pd_1": [
+			{"name": "PD_FLASH", "shift": 6, "mask": 3},
+			{"name": "PD_SIDE1", "shift": 4, "mask": 3},
+			{"name": "PD_SIDE2", "shift": 2, "mask": 3},
+			{"name": "PD_ACCESS", "shift": 0, "mask": 3}
+		],
+		"pd_2": [
+			{"name": "PD_TOP1", "shift": 6, "mask": 3},
+			{"name": "PD_TOP2", "shift": 4, "mask": 3}
+		]
+	},
+	"current_info": {
+		"start": 13,
+		"size": 16,
+		"fields": [
+			{"name": "time_to_flash", "offset": 0},
+			{"name": "boot_count", "offset": 1},
+			{"name": "L1_REF", "offset": 2, "signal": "S_LREF"},
+			{"name": "L2_REF", "offset": 3, "signal": "S_LREF"},
+			{"name": "L1_SNS", "offset": 4, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+			{"name": "L2_SNS", "offset": 5, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+			{"name": "L1_TEMP", "offset": 6, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+			{"name": "L2_TEMP", "offset": 7, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+			{"name": "PANELREF", "offset": 8, "signal": "S_PANELREF", "conversion": "panelref_mV_to_mV"},
+			{"name": "L_REF", "offset": 9, "signal": "S_LREF", "conversion": "l_ref_mV_to_mV"},
+			{"offset": 10, "bitfield": "bat_digsigs_1"},
+			{"offset": 11, "bitfield": "bat_digsigs_2"},
+			{"name": "LF1REF", "offset": 12, "signal": "S_LF_VOLT"},
+			{"name": "LF2REF", "offset": 13, "signal": "S_LF_VOLT"},
+			{"name": "LF3REF", "offset": 14, "signal": "S_LF_VOLT"},
+			{"name": "LF4REF", "offset": 15, "signal": "S_LF_VOLT"}
+		]
+	},
+	"message_types": {
+		"IDLE": {
+			"id": 0,
+			"batches": "IDLE_BATCHES_PER_PACKET",
+			"size": 23,
+			"data_hash": "last",
+			"errors": {
+				"start": 190,
+				"count": 11
+			},
+			"fields": [
+				{"offset": 0, "bitfield": "event_history"},
+				{"name": "L1_REF", "offset": 1, "signal": "S_LREF"},
+				{"name": "L2_REF", "offset": 2, "signal": "S_LREF"},
+				{"name": "L1_SNS", "offset": 3, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+				{"name": "L2_SNS", "offset": 4, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+				{"name": "L1_TEMP", "offset": 5, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "L2_TEMP", "offset": 6, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "PANELREF", "offset": 7, "signal": "S_PANELREF", "conversion": "panelref_mV_to_mV"},
+				{"name": "L_REF", "offset": 8, "signal": "S_LREF", "conversion": "l_ref_mV_to_mV"},
+				{"offset": 9, "bitfield": "bat_digsigs_1"},
+				{"offset": 10, "bitfield": "bat_digsigs_2"},
+				{"name": "RAD_TEMP", "offset": 11, "signal": "S_RAD_TEMP", "conversion": "rad_temp_raw_to_C"},
+				{"name": "IMU_TEMP", "offset": 12, "signal": "S_IMU_TEMP", "conversion": "imu_temp_raw_to_C"},
+				{"name": "IR_FLASH_AMB", "offset": 13, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE1_AMB", "offset": 14, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE2_AMB", "offset": 15, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "IR_RBF_AMB", "offset": 16, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "IR_ACCESS_AMB", "offset": 17, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "IR_TOP1_AMB", "offset": 18, "signal": "S_IR_AMB", "conversion": "ir_raw_to_C"},
+				{"name": "timestamp", "offset": 19, "width": 4, "signed": True}
+			]
+		},
+		"ATTITUDE": {
+			"id": 1,
+			"batches": "ATTITUDE_BATCHES_PER_PACKET",
+			"size": 33,
+			"data_hash": "last",
+			"errors": {
+				"start": 194,
+				"count": 9
+			},
+			"fields": [
+				{"name": "IR_FLASH_OBJ", "offset": 0, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE1_OBJ", "offset": 2, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE2_OBJ", "offset": 4, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_RBF_OBJ", "offset": 6, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_ACCESS_OBJ", "offset": 8, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_TOP1_OBJ", "offset": 10, "width": 2, "conversion": "ir_raw_to_C"},
+				{"offset": 12, "bitfield": "pd_1"},
+				{"offset": 13, "bitfield": "pd_2"},
+				{"name": "accelerometer1X", "offset": 14, "signal": "S_ACCEL", "conversion": "acc_raw_to_g", "flip": True},
+				{"name": "accelerometer1Z", "offset": 15, "signal": "S_ACCEL", "conversion": "acc_raw_to_g", "flip": True},
+				{"name": "accelerometer1Y", "offset": 16, "signal": "S_ACCEL", "conversion": "acc_raw_to_g"},
+				{"name": "accelerometer2X", "offset": 17, "signal": "S_ACCEL", "conversion": "acc_raw_to_g", "flip": True},
+				{"name": "accelerometer2Z", "offset": 18, "signal": "S_ACCEL", "conversion": "acc_raw_to_g", "flip": True},
+				{"name": "accelerometer2Y", "offset": 19, "signal": "S_ACCEL", "conversion": "acc_raw_to_g"},
+				{"name": "gyroscopeX", "offset": 20, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+				{"name": "gyroscopeZ", "offset": 21, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+				{"name": "gyroscopeY", "offset": 22, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps"},
+				{"name": "magnetometer1Z", "offset": 23, "signal": "S_MAG", "conversion": "mag_raw_to_mG"},
+				{"name": "magnetometer1X", "offset": 24, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "magnetometer1Y", "offset": 25, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "magnetometer2Z", "offset": 26, "signal": "S_MAG", "conversion": "mag_raw_to_mG"},
+				{"name": "magnetometer2X", "offset": 27, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "magnetometer2Y", "offset": 28, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "timestamp", "offset": 29, "width": 4, "signed": True}
+			]
+		},
+		"FLASH BURST": {
+			"id": 2,
+			"size": 151,
+			"data_hash": "first",
+			"errors": {
+				"start": 180,
+				"count": 14
+			},
+			"fields": [
+				{
+					"name": "burst",
+					"count": "FLASHBURST_BATCHES_PER_PACKET",
+					"groups": [
+						{
+							"offset": 0,
+							"size": 4,
+							"fields": [
+								{"name": "LED1TEMP", "offset": 0, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+								{"name": "LED2TEMP", "offset": 1, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+								{"name": "LED3TEMP", "offset": 2, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+								{"name": "LED4TEMP", "offset": 3, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"}
+							]
+						},
+						{
+							"offset": 28,
+							"size": 2,
+							"fields": [
+								{"name": "LF1_TEMP", "offset": 0, "signal": "S_LF_TEMP", "conversion": "ad590_mV_to_C"},
+								{"name": "LF3_TEMP", "offset": 1, "signal": "S_LF_TEMP", "conversion": "ad590_mV_to_C"}
+							]
+						},
+						{
+							"offset": 42,
+							"size": 4,
+							"fields": [
+								{"name": "LFB1SNS", "offset": 0, "signal": "S_LF_SNS_FLASH", "conversion": "lfbsns_mV_to_mA"},
+								{"name": "LFB1OSNS", "offset": 1, "signal": "S_LF_OSNS_FLASH", "conversion": "lfbosns_mV_to_mA"},
+								{"name": "LFB2SNS", "offset": 2, "signal": "S_LF_SNS_FLASH", "conversion": "lfbsns_mV_to_mA"},
+								{"name": "LFB2OSNS", "offset": 3, "signal": "S_LF_OSNS_FLASH", "conversion": "lfbosns_mV_to_mA"}
+							]
+						},
+						{
+							"offset": 70,
+							"size": 4,
+							"fields": [
+								{"name": "LF1REF", "offset": 0, "signal": "S_LF_VOLT"},
+								{"name": "LF2REF", "offset": 1, "signal": "S_LF_VOLT"},
+								{"name": "LF3REF", "offset": 2, "signal": "S_LF_VOLT"},
+								{"name": "LF4REF", "offset": 3, "signal": "S_LF_VOLT"}
+							]
+						},
+						{
+							"offset": 98,
+							"size": 4,
+							"fields": [
+								{"name": "LED1SNS", "offset": 0, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+								{"name": "LED2SNS", "offset": 1, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+								{"name": "LED3SNS", "offset": 2, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+								{"name": "LED4SNS", "offset": 3, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"}
+							]
+						},
+						{
+							"offset": 126,
+							"size": 3,
+							"fields": [
+								{"name": "gyroscopeX", "offset": 0, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+								{"name": "gyroscopeZ", "offset": 1, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+								{"name": "gyroscopeY", "offset": 2, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps"}
+							]
+						}
+					]
+				},
+				{"name": "timestamp", "offset": 147, "width": 4, "signed": True}
+			]
+		},
+		"FLASH CMP": {
+			"id": 3,
+			"batches": "FLASHCMP_BATCHES_PER_PACKET",
+			"size": 25,
+			"data_hash": "last",
+			"errors": {
+				"start": 179,
+				"count": 14
+			},
+			"fields": [
+				{"name": "LED1TEMP", "offset": 0, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+				{"name": "LED2TEMP", "offset": 1, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+				{"name": "LED3TEMP", "offset": 2, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+				{"name": "LED4TEMP", "offset": 3, "signal": "S_LED_TEMP_FLASH", "conversion": "ad590_mV_to_C"},
+				{"name": "LF1_TEMP", "offset": 4, "signal": "S_LF_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "LF3_TEMP", "offset": 5, "signal": "S_LF_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "LFB1SNS", "offset": 6, "signal": "S_LF_SNS_FLASH", "conversion": "lfbsns_mV_to_mA"},
+				{"name": "LFB1OSNS", "offset": 7, "signal": "S_LF_OSNS_FLASH", "conversion": "lfbosns_mV_to_mA"},
+				{"name": "LFB2SNS", "offset": 8, "signal": "S_LF_SNS_FLASH", "conversion": "lfbsns_mV_to_mA"},
+				{"name": "LFB2OSNS", "offset": 9, "signal": "S_LF_OSNS_FLASH", "conversion": "lfbosns_mV_to_mA"},
+				{"name": "LF1REF", "offset": 10, "signal": "S_LF_VOLT"},
+				{"name": "LF2REF", "offset": 11, "signal": "S_LF_VOLT"},
+				{"name": "LF3REF", "offset": 12, "signal": "S_LF_VOLT"},
+				{"name": "LF4REF", "offset": 13, "signal": "S_LF_VOLT"},
+				{"name": "LED1SNS", "offset": 14, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+				{"name": "LED2SNS", "offset": 15, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+				{"name": "LED3SNS", "offset": 16, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+				{"name": "LED4SNS", "offset": 17, "signal": "S_LED_SNS", "conversion": "led_sns_mV_to_mA"},
+				{"name": "magnetometer1Z", "offset": 18, "signal": "S_MAG", "conversion": "mag_raw_to_mG"},
+				{"name": "magnetometer1X", "offset": 19, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "magnetometer1Y", "offset": 20, "signal": "S_MAG", "conversion": "mag_raw_to_mG", "flip": True},
+				{"name": "timestamp", "offset": 21, "width": 4, "signed": True}
+			]
+		},
+		"LOW POWER": {
+			"id": 4,
+			"batches": "LOWPOWER_BATCHES_PER_PACKET",
+			"size": 30,
+			"data_hash": "last",
+			"errors": {
+				"start": 179,
+				"count": 14
+			},
+			"fields": [
+				{"offset": 0, "bitfield": "event_history"},
+				{"name": "L1_REF", "offset": 1, "signal": "S_LREF"},
+				{"name": "L2_REF", "offset": 2, "signal": "S_LREF"},
+				{"name": "L1_SNS", "offset": 3, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+				{"name": "L2_SNS", "offset": 4, "signal": "S_L_SNS", "conversion": "l_sns_mV_to_mA"},
+				{"name": "L1_TEMP", "offset": 5, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "L2_TEMP", "offset": 6, "signal": "S_L_TEMP", "conversion": "ad590_mV_to_C"},
+				{"name": "PANELREF", "offset": 7, "signal": "S_PANELREF", "conversion": "panelref_mV_to_mV"},
+				{"name": "L_REF", "offset": 8, "signal": "S_LREF", "conversion": "l_ref_mV_to_mV"},
+				{"offset": 9, "bitfield": "bat_digsigs_1"},
+				{"offset": 10, "bitfield": "bat_digsigs_2"},
+				{"name": "IR_FLASH_OBJ", "offset": 11, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE1_OBJ", "offset": 13, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_SIDE2_OBJ", "offset": 15, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_RBF_OBJ", "offset": 17, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_ACCESS_OBJ", "offset": 19, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "IR_TOP1_OBJ", "offset": 21, "width": 2, "conversion": "ir_raw_to_C"},
+				{"name": "gyroscopeX", "offset": 23, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+				{"name": "gyroscopeZ", "offset": 24, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps", "flip": True},
+				{"name": "gyroscopeY", "offset": 25, "signal": "S_GYRO", "conversion": "gyro_raw_to_dps"},
+				{"name": "timestamp", "offset": 26, "width": 4, "signed": True}
+			]
+		}
+	}
+}
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# load generator for the parser: replays recorded dumps or a synthetic mix of valid packets
+# (with some corrupted) at a fixed rate or flat out, and reports throughput and latency
+#
+#   python loadgen.py --count 50000 --mix "IDLE=4,ATTITUDE=2,LOW POWER=1" --corrupt 0.05
+#   python loadgen.py --rate 2000 --duration 30 --correct dump1.txt dump2.txt
+#
+# At a fixed rate each packet's latency is measured from when it was due, so time spent
+# waiting behind slow packets counts (the parser is never given a break it wouldn't get).
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from array import array
+from binascii import hexlify, unhexlify
+from collections import OrderedDict
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+	from reedsolomon import rs_encode
+else:
+	from . import packetparse as pp
+	from .reedsolomon import rs_encode
+
+DEFAULT_COUNT = 10000
+DEFAULT_CORRUPT_BYTES = 4
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+def _templates():
+	# message type -> raw sample packets of that type with valid parity
+	templates = OrderedDict()
+	for ps in pp.SAMPLE_PACKETS.values():
+		buf = unhexlify(ps)
+		if pp.validate_packet_bytes(buf) is None and bytes(rs_encode(buf)) == buf:
+			templates.setdefault(pp.parse_preamble(ps)[0]['message_type'], []).append(buf)
+	return templates
+
+def synth_packet(message_type, rng, templates):
+	"""
+	A valid packet of message_type as a hex string: a sample packet of that type with a
+	random timestamp and data section, and parity to match
+	"""
+	buf = bytearray(rng.choice(templates[message_type]))
+	buf[6:10] = bytearray(rng.getrandbits(8) for _ in range(3)) + bytearray([0])
+	section = pp.layout['message_types'][message_type]
+	start = pp.DATA_START
+	end = section['errors']['start']
+	buf[start:end] = bytearray(rng.getrandbits(8) for _ in range(end - start))
+	return hexlify(rs_encode(buf)).decode('ascii')
+
+def corrupt(ps, rng, num_bytes=DEFAULT_CORRUPT_BYTES):
+	""" ps with num_bytes random bytes (anywhere in the packet) replaced """
+	buf = bytearray(unhexlify(ps))
+	for i in rng.sample(range(len(buf)), num_bytes):
+		buf[i] = rng.getrandbits(8)
+	return hexlify(buf).decode('ascii')
+
+def parse_mix(text):
+	""" "IDLE=3,ATTITUDE=1" -> {"IDLE": 3.0, "ATTITUDE": 1.0} """
+	mix = OrderedDict()
+	for part in text.split(','):
+		name, _, weight = part.partition('=')
+		name = name.strip().upper()
+		if name not in pp.layout['message_types']:
+			raise ValueError("unknown message type in mix: " + name)
+		mix[name] = float(weight or 1)
+	return mix
+
+def synthetic_packets(count, mix=None, corrupt_rate=0.0, corrupt_bytes=DEFAULT_CORRUPT_BYTES, seed=0):
+	""" count synthetic hex packets drawn from mix ({message type: weight}; default all types equally) """
+	rng = random.Random(seed)
+	templates = _templates()
+	mix = mix or OrderedDict((name, 1.0) for name in templates)
+	missing = [name for name in mix if name not in templates]
+	if missing:
+		raise ValueError("no sample packet to build from for: " + ", ".join(missing))
+	names = list(mix)
+	weights = [mix[name] for name in names]
+	packets = []
+	for name in rng.choices(names, weights, k=count):
+		ps = synth_packet(name, rng, templates)
+		if corrupt_rate and rng.random() < corrupt_rate:
+			ps = corrupt(ps, rng, corrupt_bytes)
+		packets.append(ps)
+	return packets
+
+def recorded_packets(files, count=None, corrupt_rate=0.0, corrupt_bytes=DEFAULT_CORRUPT_BYTES, seed=0):
+	""" The packets of dump files (cycled through up to count, if given), some corrupted """
+	rng = random.Random(seed)
+	packets = [ps for path in files for offset, ps in pp.iter_packets(path)]
+	if not packets:
+		raise ValueError("no packets found in " + ", ".join(files))
+	if count is not None:
+		packets = [packets[i % len(packets)] for i in range(count)]
+	if corrupt_rate:
+		packets = [corrupt(ps, rng, corrupt_bytes) if rng.random() < corrupt_rate else ps for ps in packets]
+	return packets
+
+def run_load(packets, rate=None, duration=None, parse_args=None):
+	"""
+	Parses packets (cycling through them for duration seconds if given, otherwise once
+	through), flat out or at rate packets/sec. Returns (latencies in seconds as an array,
+	elapsed seconds, {parse error: count})
+	"""
+	parse_args = parse_args or {}
+	latencies = array('d')
+	errors = {}
+	n = len(packets)
+	start = _clock()
+	i = 0
+	while True:
+		if duration is None:
+			if i >= n:
+				break
+		elif _clock() - start >= duration:
+			break
+		ps = packets[i % n]
+		if rate:
+			due = start + i / rate
+			now = _clock()
+			if due > now:
+				time.sleep(due - now)
+		else:
+			due = _clock()
+		packet, parse_errs = pp.parse_packet(ps, **parse_args)
+		latencies.append(_clock() - due)
+		for err in parse_errs:
+			errors[err] = errors.get(err, 0) + 1
+		i += 1
+	return latencies, _clock() - start, errors
+
+def _run_worker(task):
+	packets, rate, duration, parse_args = task
+	latencies, elapsed, errors = run_load(packets, rate, duration, parse_args)
+	return latencies.tobytes(), elapsed, errors
+
+def percentile(sorted_vals, q):
+	if not sorted_vals:
+		return 0.0
+	return sorted_vals[min(int(q*len(sorted_vals)), len(sorted_vals) - 1)]
+
+def report(latencies, elapsed, errors, jobs=1):
+	lat = sorted(latencies)
+	result = OrderedDict([
+		('packets', len(lat)),
+		('seconds', elapsed),
+		('packets_per_sec', len(lat) / elapsed if elapsed else 0.0),
+		('jobs', jobs),
+	])
+	for q in PERCENTILES:
+		result['p%s_ms' % ('%g' % (q*100))] = percentile(lat, q)*1e3
+	result['max_ms'] = lat[-1]*1e3 if lat else 0.0
+	result['parse_errors'] = errors
+	return result
+
+def main():
+	parser = argparse.ArgumentParser(description="Load tests parse_packet with recorded or synthetic packets")
+	parser.add_argument("files", nargs="*", help="hex dump files to replay (default: synthetic packets)")
+	parser.add_argument("--count", type=int, help="packets to generate (or replay, cycling); default %d synthetic" % DEFAULT_COUNT)
+	parser.add_argument("--duration", type=float, help="seconds to run for, cycling through the packets")
+	parser.add_argument("--rate", type=float, help="packets/sec to parse at, over all jobs (default: as fast as possible)")
+	parser.add_argument("--mix", help='message type weights for synthetic packets, e.g. "IDLE=3,ATTITUDE=1"')
+	parser.add_argument("--corrupt", type=float, default=0.0, help="fraction of packets to corrupt")
+	parser.add_argument("--corrupt-bytes", type=int, default=DEFAULT_CORRUPT_BYTES, help="bytes replaced in each corrupted packet")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="parser processes")
+	parser.add_argument("--correct", action="store_true", help="parse with Reed-Solomon correction")
+	parser.add_argument("--validate", action="store_true", help="parse with validation")
+	parser.add_argument("-o", "--output", help="file to write the report to as JSON")
+	args = parser.parse_args()
+
+	if args.files:
+		packets = recorded_packets(args.files, args.count, args.corrupt, args.corrupt_bytes, args.seed)
+	else:
+		mix = parse_mix(args.mix) if args.mix else None
+		packets = synthetic_packets(args.count or DEFAULT_COUNT, mix, args.corrupt, args.corrupt_bytes, args.seed)
+	parse_args = {'correct': args.correct, 'validate': args.validate}
+
+	if args.jobs > 1:
+		# each process gets every jobs-th packet and its share of the rate
+		rate = args.rate / args.jobs if args.rate else None
+		tasks = [(packets[i::args.jobs], rate, args.duration, parse_args) for i in range(args.jobs)]
+		pool = multiprocessing.Pool(args.jobs)
+		try:
+			results = pool.map(_run_worker, tasks)
+		finally:
+			pool.close()
+			pool.join()
+		latencies = array('d')
+		errors = {}
+		for lat, elapsed, errs in results:
+			latencies.frombytes(lat)
+			for err, n in errs.items():
+				errors[err] = errors.get(err, 0) + n
+		elapsed = max(r[1] for r in results)
+	else:
+		latencies, elapsed, errors = run_load(packets, args.rate, args.duration, parse_args)
+
+	result = report(latencies, elapsed, errors, args.jobs)
+	print(json.dumps(result, indent=2))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+	main()
@@ -1,4 +1,6 @@
 var constants = require("./constants.json");
+// offsets, widths and conversions of every field, shared with packetparse.py
+var layout = require("./layout.json");
 
 PARSE_ERROR = {
 	WRONG_SIZE: "wrong size packet",
@@ -12,11 +14,6 @@ INVALID_STR = "[invalid]"
 
 // constant helpers
 DATA_SECTION_START_BYTE = constants["DATA_SECTION_START_BYTE"]
-IDLE_BATCHES_PER_PACKET	= constants["IDLE_BATCHES_PER_PACKET"]
-ATTITUDE_BATCHES_PER_PACKET	=	constants["ATTITUDE_BATCHES_PER_PACKET"]
-FLASHBURST_BATCHES_PER_PACKET =	constants["FLASHBURST_BATCHES_PER_PACKET"]
-FLASHCMP_BATCHES_PER_PACKET	=	constants["FLASHCMP_BATCHES_PER_PACKET"]
-LOWPOWER_BATCHES_PER_PACKET	=	constants["LOWPOWER_BATCHES_PER_PACKET"]
 ERROR_TIME_BUCKET_SIZE = constants["ERROR_TIME_BUCKET_SIZE"]
 Ms_and_Bs = constants["Ms_and_Bs"]
 
@@ -125,6 +122,35 @@ function lfbosns_mV_to_mA(mV) {
 function led_sns_mV_to_mA(mV) {
 	return 1.0*Math.round(mV / .03)
 }
+function panelref_mV_to_mV(mV) {
+	return Math.trunc((mV-130)*5580/1000)
+}
+function l_ref_mV_to_mV(mV) {
+	return Math.trunc((mV-50)*2717/1000)
+}
+function rad_temp_raw_to_C(raw) {
+	return Math.trunc(raw/10)
+}
+function imu_temp_raw_to_C(raw) {
+	return raw / 333.87 + 21
+}
+
+// the conversions layout.json names
+CONVERSIONS = {
+	mag_raw_to_mG: mag_raw_to_mG,
+	acc_raw_to_g: acc_raw_to_g,
+	gyro_raw_to_dps: gyro_raw_to_dps,
+	ir_raw_to_C: ir_raw_to_C,
+	ad590_mV_to_C: ad590_mV_to_C,
+	l_sns_mV_to_mA: l_sns_mV_to_mA,
+	lfbsns_mV_to_mA: lfbsns_mV_to_mA,
+	lfbosns_mV_to_mA: lfbosns_mV_to_mA,
+	led_sns_mV_to_mA: led_sns_mV_to_mA,
+	panelref_mV_to_mV: panelref_mV_to_mV,
+	l_ref_mV_to_mV: l_ref_mV_to_mV,
+	rad_temp_raw_to_C: rad_temp_raw_to_C,
+	imu_temp_raw_to_C: imu_temp_raw_to_C
+}
 
 function get_sat_state(val) {
 	ret = [
@@ -143,14 +169,13 @@ function get_sat_state(val) {
 	}
 }
 
+MESSAGE_TYPE_NAMES = []
+for (var name in layout["message_types"]) {
+	MESSAGE_TYPE_NAMES[layout["message_types"][name]["id"]] = name
+}
+
 function get_message_type(val) {
-	ret = [
-		'IDLE',
-		'ATTITUDE',
-		'FLASH BURST',
-		'FLASH CMP',
-		'LOW POWER'
-	][val];
+	ret = MESSAGE_TYPE_NAMES[val];
 
 	if (ret === undefined) {
 	    return INVALID_STR
@@ -190,319 +215,93 @@ function parse_preamble(ps) {
 	return [preamble, errs]
 }
 
-function parse_current_info(ps) {
-	current_info = {}
-	current_info['time_to_flash'] = parseInt(ps.slice(26,28), 16)
-	current_info['boot_count'] = parseInt(ps.slice(28,30), 16)
-	current_info['L1_REF'] = untruncate(parseInt(ps.slice(30,32), 16), "S_LREF")
-	current_info['L2_REF'] = untruncate(parseInt(ps.slice(32,34), 16), "S_LREF")
-	current_info['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(34,36)), "S_L_SNS"))
-	current_info['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(36,38)), "S_L_SNS"))
-	current_info['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(38,40)), "S_L_TEMP"))
-	current_info['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(40,42)), "S_L_TEMP"))
-	current_info['PANELREF'] = Math.trunc((untruncate(parseInt(ps.slice(42,44), 16), "S_PANELREF")-130)*5580/1000)
-	current_info['L_REF'] = Math.trunc((untruncate(parseInt(ps.slice(44,46), 16), "S_LREF")-50)*2717/1000)
-
-	bat_digsigs_1 = parseInt(ps.slice(46,48), 16)
-	bat_digsigs_2 = parseInt(ps.slice(48,50), 16)
-	parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, current_info)
-
-	current_info['LF1REF'] = untruncate(parseInt(ps.slice(50,52), 16), "S_LF_VOLT")
-	current_info['LF2REF'] = untruncate(parseInt(ps.slice(52,54), 16), "S_LF_VOLT")
-	current_info['LF3REF'] = untruncate(parseInt(ps.slice(54,56), 16), "S_LF_VOLT")
-	current_info['LF4REF'] = untruncate(parseInt(ps.slice(56,58), 16), "S_LF_VOLT")
-
-	return current_info
-}
-
-function parse_attitude_data(ps) {
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for (var i = 0; i < ATTITUDE_BATCHES_PER_PACKET; i++) {
-		cur = {}
-		cur['IR_FLASH_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start,start+4)+'0000'))
-		cur['IR_SIDE1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+4,start+8)+'0000'))
-		cur['IR_SIDE2_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+8,start+12)+'0000'))
-		cur['IR_RBF_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+12,start+16)+'0000'))
-		cur['IR_ACCESS_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+16,start+20)+'0000'))
-		cur['IR_TOP1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+20,start+24)+'0000'))
-
-		pd_1 = parseInt(ps.slice(start+24,start+26), 16)
-		pd_2 = parseInt(ps.slice(start+26,start+28), 16)
-
-		cur['PD_FLASH'] = (pd_1 >> 6) & (0x03)
-		cur['PD_SIDE1'] = (pd_1 >> 4) & (0x03)
-		cur['PD_SIDE2'] = (pd_1 >> 2) & (0x03)
-		cur['PD_ACCESS'] = (pd_1 >> 0) & (0x03)
-		cur['PD_TOP1'] = (pd_2 >> 6) & (0x03)
-		cur['PD_TOP2'] = (pd_2 >> 4) & (0x03)
-
-		cur['accelerometer1X'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+28,start+30), 16), "S_ACCEL"))*-1
-		cur['accelerometer1Z'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+30,start+32), 16), "S_ACCEL"))*-1
-		cur['accelerometer1Y'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+32,start+34), 16), "S_ACCEL"))
-
-		cur['accelerometer2X'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+34,start+36), 16), "S_ACCEL"))*-1
-		cur['accelerometer2Z'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+36,start+38), 16), "S_ACCEL"))*-1
-		cur['accelerometer2Y'] = acc_raw_to_g(untruncate(parseInt(ps.slice(start+38,start+40), 16), "S_ACCEL"))
-
-		cur['gyroscopeX'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+40,start+42), 16), "S_GYRO"))*-1
-		cur['gyroscopeZ'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+42,start+44), 16), "S_GYRO"))*-1
-		cur['gyroscopeY'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+44,start+46), 16), "S_GYRO"))
-
-		cur['magnetometer1Z'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+46,start+48), 16), "S_MAG"))
-		cur['magnetometer1X'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+48,start+50), 16), "S_MAG"))*-1
-		cur['magnetometer1Y'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+50,start+52), 16), "S_MAG"))*-1
-
-		cur['magnetometer2Z'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+52,start+54), 16), "S_MAG"))
-		cur['magnetometer2X'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+54,start+56), 16), "S_MAG"))*-1
-		cur['magnetometer2Y'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+56,start+58), 16), "S_MAG"))*-1
-
-		cur['timestamp'] = hex_to_int_le(ps.slice(start+58,start+66))
-		cur['data_hash'] = ps.slice(start,start+66)
-
-		data.push(cur)
-		start += 66
-	}
-	return data
+// section decoders, driven by layout.json (offsets there are in bytes, ps is hex)
+function layout_count(count) {
+	return typeof count == "string" ? constants[count] : count
 }
 
-function parse_idle_data(ps) {
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for (var i = 0; i < IDLE_BATCHES_PER_PACKET; i++) {
-		cur = {}
-		event_history = parseInt(ps.slice(start,start+2), 16)
-		parse_event_history(event_history, cur)
-
-		cur['L1_REF'] = untruncate(parseInt(ps.slice(start+2,start+4), 16), "S_LREF")
-		cur['L2_REF'] = untruncate(parseInt(ps.slice(start+4,start+6), 16), "S_LREF")
-		cur['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_L_SNS"))
-		cur['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+8,start+10)), "S_L_SNS"))
-		cur['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+10,start+12)), "S_L_TEMP"))
-		cur['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+12,start+14)), "S_L_TEMP"))
-		cur['PANELREF'] = Math.trunc((untruncate(parseInt(ps.slice(start+14,start+16), 16), "S_PANELREF")-130)*5580/1000)
-		cur['L_REF'] = Math.trunc((untruncate(parseInt(ps.slice(start+16,start+18), 16), "S_LREF")-50)*2717/1000)
-
-		bat_digsigs_1 = parseInt(ps.slice(start+18,start+20), 16)
-		bat_digsigs_2 = parseInt(ps.slice(start+20,start+22), 16)
-		parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, cur)
-
-		cur['RAD_TEMP'] = Math.trunc(untruncate(parseInt(ps.slice(start+22,start+24), 16), "S_RAD_TEMP")/10)
-		cur['IMU_TEMP'] = (untruncate(parseInt(ps.slice(start+24,start+26), 16), "S_IMU_TEMP")) / 333.87 + 21
-
-		cur['IR_FLASH_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+26,start+28), 16), "S_IR_AMB"))
-		cur['IR_SIDE1_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+28,start+30), 16), "S_IR_AMB"))
-		cur['IR_SIDE2_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+30,start+32), 16), "S_IR_AMB"))
-		cur['IR_RBF_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+32,start+34), 16), "S_IR_AMB"))
-		cur['IR_ACCESS_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+34,start+36), 16), "S_IR_AMB"))
-		cur['IR_TOP1_AMB'] = ir_raw_to_C(untruncate(parseInt(ps.slice(start+36,start+38), 16), "S_IR_AMB"))
-
-		cur['timestamp'] = hex_to_int_le(ps.slice(start+38,start+46))
-		cur['data_hash'] = ps.slice(start,start+46)
-
-		data.push(cur)
-		start += 46
+function parse_field(ps, start, field) {
+	var pos = start + 2*field['offset']
+	var width = field['width'] || 1
+	var val = width == 1 ? parseInt(ps.slice(pos,pos+2), 16) : hex_to_int_le(ps.slice(pos,pos+2*width))
+	if (field['signed'] && val >= Math.pow(2, 8*width-1)) {
+		val -= Math.pow(2, 8*width)
 	}
-	return data
-}
-
-function parse_flash_burst_data(ps) {
-	data = {}
-	burst = []
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i] = {};
+	if (field['signal'] !== undefined) {
+		val = untruncate(val, field['signal'])
 	}
-	start = DATA_SECTION_START_BYTE
-	data['data_hash'] = ps.slice(start,start+302)
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['LED1TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LED_TEMP_FLASH"))
-		burst[i]['LED2TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LED_TEMP_FLASH"))
-		burst[i]['LED3TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+4,start+6)), "S_LED_TEMP_FLASH"))
-		burst[i]['LED4TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_LED_TEMP_FLASH"))
-		start += 8
+	if (field['conversion'] !== undefined) {
+		val = CONVERSIONS[field['conversion']](val)
 	}
-
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['LF1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LF_TEMP"))
-		burst[i]['LF3_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LF_TEMP"))
-		start += 4
-	}
-
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['LFB1SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LF_SNS_FLASH"))
-		burst[i]['LFB1OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LF_OSNS_FLASH"))
-		burst[i]['LFB2SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+4,start+6)), "S_LF_SNS_FLASH"))
-		burst[i]['LFB2OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_LF_OSNS_FLASH"))
-		start += 8
+	if (field['flip']) {
+		val = val*-1
 	}
-
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['LF1REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LF_VOLT")
-		burst[i]['LF2REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LF_VOLT")
-		burst[i]['LF3REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+4,start+6)), "S_LF_VOLT")
-		burst[i]['LF4REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_LF_VOLT")
-		start += 8
-	}
-
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['LED1SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LED_SNS"))
-		burst[i]['LED2SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LED_SNS"))
-		burst[i]['LED3SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+4,start+6)), "S_LED_SNS"))
-		burst[i]['LED4SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_LED_SNS"))
-		start += 8
-	}
-
-	for (var i = 0; i < FLASHBURST_BATCHES_PER_PACKET; i++) {
-		burst[i]['gyroscopeX'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start,start+2), 16), "S_GYRO"))*-1
-		burst[i]['gyroscopeZ'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+2,start+4), 16), "S_GYRO"))*-1
-		burst[i]['gyroscopeY'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+4,start+6), 16), "S_GYRO"))
-		start += 6
+	return val
+}
+
+function parse_bitfield(byte, bits, obj) {
+	for (var i = 0; i < bits.length; i++) {
+		var bit = bits[i]
+		if (bit['mask'] !== undefined) {
+			obj[bit['name']] = (byte >> bit['shift']) & bit['mask']
+		} else if (bit['invert']) {
+			obj[bit['name']] = !get_bit(byte, bit['bit'])
+		} else {
+			obj[bit['name']] = get_bit(byte, bit['bit'])
+		}
 	}
-	data['burst'] = burst
-	data['timestamp'] = hex_to_int_le(ps.slice(start,start+8))
-	return data
 }
 
-function parse_flash_cmp_data(ps) {
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for (var i = 0; i < FLASHCMP_BATCHES_PER_PACKET; i++) {
-		cur = {}
-		cur['LED1TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start,start+2)), "S_LED_TEMP_FLASH"))
-		cur['LED2TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+2,start+4)), "S_LED_TEMP_FLASH"))
-		cur['LED3TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+4,start+6)), "S_LED_TEMP_FLASH"))
-		cur['LED4TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_LED_TEMP_FLASH"))
-		cur['LF1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+8,start+10)), "S_LF_TEMP"))
-		cur['LF3_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+10,start+12)), "S_LF_TEMP"))
-
-		cur['LFB1SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+12,start+14)), "S_LF_SNS_FLASH"))
-		cur['LFB1OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+14,start+16)), "S_LF_OSNS_FLASH"))
-		cur['LFB2SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+16,start+18)), "S_LF_SNS_FLASH"))
-		cur['LFB2OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+18,start+20)), "S_LF_OSNS_FLASH"))
-
-		cur['LF1REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+20,start+22)), "S_LF_VOLT")
-		cur['LF2REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+22,start+24)), "S_LF_VOLT")
-		cur['LF3REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+24,start+26)), "S_LF_VOLT")
-		cur['LF4REF'] = untruncate(hex_string_byte_to_signed_int(ps.slice(start+26,start+28)), "S_LF_VOLT")
-
-		cur['LED1SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+28,start+30)), "S_LED_SNS"))
-		cur['LED2SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+30,start+32)), "S_LED_SNS"))
-		cur['LED3SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+32,start+34)), "S_LED_SNS"))
-		cur['LED4SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+34,start+36)), "S_LED_SNS"))
-
-		cur['magnetometer1Z'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+36,start+38), 16), "S_MAG"))
-		cur['magnetometer1X'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+38,start+40), 16), "S_MAG"))*-1
-		cur['magnetometer1Y'] = mag_raw_to_mG(untruncate(parseInt(ps.slice(start+40,start+42), 16), "S_MAG"))*-1
-
-		cur['timestamp'] = hex_to_int_le(ps.slice(start+42,start+50))
-		cur['data_hash'] = ps.slice(start,start+50)
-		data.push(cur)
-		start += 50
+function parse_fields(ps, start, fields, obj) {
+	for (var i = 0; i < fields.length; i++) {
+		var field = fields[i]
+		if (field['groups'] !== undefined) {
+			// records spread over groups of consecutive values, one value of each record per group
+			var records = []
+			for (var j = 0; j < layout_count(field['count']); j++) {
+				var cur = {}
+				for (var k = 0; k < field['groups'].length; k++) {
+					var group = field['groups'][k]
+					parse_fields(ps, start + 2*(group['offset'] + j*group['size']), group['fields'], cur)
+				}
+				records.push(cur)
+			}
+			obj[field['name']] = records
+		} else if (field['bitfield'] !== undefined) {
+			var pos = start + 2*field['offset']
+			parse_bitfield(parseInt(ps.slice(pos,pos+2), 16), layout['bitfields'][field['bitfield']], obj)
+		} else {
+			obj[field['name']] = parse_field(ps, start, field)
+		}
 	}
-	return data
+	return obj
 }
 
-function parse_low_power_data(ps) {
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for (var i = 0; i < LOWPOWER_BATCHES_PER_PACKET; i++) {
-		cur = {}
-		event_history = parseInt(ps.slice(start,start+2), 16)
-		parse_event_history(event_history, cur)
-
-		cur['L1_REF'] = untruncate(parseInt(ps.slice(start+2,start+4), 16), "S_LREF")
-		cur['L2_REF'] = untruncate(parseInt(ps.slice(start+4,start+6), 16), "S_LREF")
-		cur['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+6,start+8)), "S_L_SNS"))
-		cur['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps.slice(start+8,start+10)), "S_L_SNS"))
-		cur['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+10,start+12)), "S_L_TEMP"))
-		cur['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps.slice(start+12,start+14)), "S_L_TEMP"))
-		cur['PANELREF'] = Math.trunc((untruncate(parseInt(ps.slice(start+14,start+16), 16), "S_PANELREF")-130)*5580/1000)
-		cur['L_REF'] = Math.trunc((untruncate(parseInt(ps.slice(start+16,start+18), 16), "S_LREF")-50)*2717/1000)
-
-		bat_digsigs_1 = parseInt(ps.slice(start+18,start+20), 16)
-		bat_digsigs_2 = parseInt(ps.slice(start+20,start+22), 16)
-		parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, cur)
-
-		cur['IR_FLASH_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+22,start+26)+'0000'))
-		cur['IR_SIDE1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+26,start+30)+'0000'))
-		cur['IR_SIDE2_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+30,start+34)+'0000'))
-		cur['IR_RBF_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+34,start+38)+'0000'))
-		cur['IR_ACCESS_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+38,start+42)+'0000'))
-		cur['IR_TOP1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps.slice(start+42,start+46)+'0000'))
-
-		cur['gyroscopeX'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+46,start+48), 16), "S_GYRO"))*-1
-		cur['gyroscopeZ'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+48,start+50), 16), "S_GYRO"))*-1
-		cur['gyroscopeY'] = gyro_raw_to_dps(untruncate(parseInt(ps.slice(start+50,start+52), 16), "S_GYRO"))
-
-		cur['timestamp'] = hex_to_int_le(ps.slice(start+52,start+60))
-		cur['data_hash'] = ps.slice(start,start+60)
-
-		data.push(cur)
-		start += 60
+function parse_section(ps, section, start) {
+	var cur = {}
+	var data_hash = ps.slice(start,start+2*section['size'])
+	if (section['data_hash'] == 'first') {
+		cur['data_hash'] = data_hash
 	}
-	return data
+	parse_fields(ps, start, section['fields'], cur)
+	if (section['data_hash'] == 'last') {
+		cur['data_hash'] = data_hash
+	}
+	return cur
 }
 
-// common parsers
-function parse_event_history(event_history, obj) {
-	obj['ANTENNA_DEPLOYED'] = get_bit(event_history, 1)
-	obj['LION_1_CHARGED'] = get_bit(event_history, 2)
-	obj['LION_2_CHARGED'] = get_bit(event_history, 3)
-	obj['LIFEPO4_B1_CHARGED'] = get_bit(event_history, 4)
-	obj['LIFEPO4_B2_CHARGED'] = get_bit(event_history, 5)
-	obj['FIRST_FLASH'] = get_bit(event_history, 6)
-	obj['PROG_MEM_REWRITTEN'] = get_bit(event_history, 7)
-}
-
-function parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, obj) {
-	// invert some "that" are active LOW
-	obj['L1_RUN_CHG'] = get_bit(bat_digsigs_1, 0)
-	obj['L2_RUN_CHG'] = get_bit(bat_digsigs_1, 1)
-	obj['LF_B1_RUN_CHG'] = get_bit(bat_digsigs_1, 2)
-	obj['LF_B2_RUN_CHG'] = get_bit(bat_digsigs_1, 3)
-	obj['LF_B2_CHGN'] = !get_bit(bat_digsigs_1, 4)
-	obj['LF_B2_FAULTN'] = !get_bit(bat_digsigs_1, 5)
-	obj['LF_B1_FAULTN'] = !get_bit(bat_digsigs_1, 6)
-	obj['LF_B1_CHGN'] = !get_bit(bat_digsigs_1, 7)
-
-	obj['L2_ST'] = get_bit(bat_digsigs_2, 0)
-	obj['L1_ST'] = get_bit(bat_digsigs_2, 1)
-	obj['L1_DISG'] = !get_bit(bat_digsigs_2, 2)
-	obj['L2_DISG'] = !get_bit(bat_digsigs_2, 3)
-	obj['L1_CHGN'] = !get_bit(bat_digsigs_2, 4)
-	obj['L1_FAULTN'] = !get_bit(bat_digsigs_2, 5)
-	obj['L2_CHGN'] = !get_bit(bat_digsigs_2, 6)
-	obj['L2_FAULTN'] = !get_bit(bat_digsigs_2, 7)
+function parse_current_info(ps) {
+	return parse_fields(ps, 2*layout['current_info']['start'], layout['current_info']['fields'], {})
 }
 
 function getErrorStartByte(message_type) {
-	if (message_type == 'IDLE') {
-		return 190*2
-	} else if (message_type == 'ATTITUDE') {
-		return 194*2
-	} else if (message_type == 'FLASH BURST') {
-		return 180*2
-	} else if (message_type == 'FLASH CMP') {
-		return 179*2
-	} else if (message_type == 'LOW POWER') {
-		return 179*2
-	}
-	return -1
+	section = layout['message_types'][message_type]
+	return section === undefined ? -1 : section['errors']['start']*2
 }
 
 function getNumErrorsInPacket(message_type) {
-	if (message_type == 'IDLE') {
-		return 11
-	} else if (message_type == 'ATTITUDE') {
-		return 9
-	} else if (message_type == 'FLASH BURST') {
-		return 14
-	} else if (message_type == 'FLASH CMP') {
-		return 14
-	} else if (message_type == 'LOW POWER') {
-		return 14
-	}
-	return -1
+	section = layout['message_types'][message_type]
+	return section === undefined ? -1 : section['errors']['count']
 }
 
 function convert_error_timestamp(timestamp_data, packet_timestamp) {
@@ -546,20 +345,22 @@ function parse_errors(ps, message_type, packet_timestamp) {
 }
 
 function parse_data_section(message_type, ps) {
-  if (message_type == 'IDLE') {
-		return parse_idle_data(ps)
-	} else if (message_type == 'ATTITUDE') {
-		return parse_attitude_data(ps)
-	} else if (message_type == 'FLASH BURST') {
-		return parse_flash_burst_data(ps)
-	} else if (message_type == 'FLASH CMP') {
-		return parse_flash_cmp_data(ps)
-	} else if (message_type == 'LOW POWER') {
-		return parse_low_power_data(ps)
+	var section = layout['message_types'][message_type]
+	if (section === undefined) {
+		return undefined
+	}
+	var start = DATA_SECTION_START_BYTE
+	if (section['batches'] === undefined) {
+		return parse_section(ps, section, start)
+	}
+	var data = []
+	for (var i = 0; i < layout_count(section['batches']); i++) {
+		data.push(parse_section(ps, section, start))
+		start += 2*section['size']
 	}
+	return data
 }
 
-
 function parse_packet(ps) {
 	// with or without parity bytes
 	if (ps.length != 510 && ps.length != 446) {
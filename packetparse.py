@@ -1,18 +1,35 @@
 #!/usr/bin/python
 
-from struct import unpack
-from binascii import unhexlify
+from struct import unpack, Struct, error as struct_error
+from binascii import unhexlify, hexlify
 import json
 import re
 import sys
 import random
 import binascii
 import codecs
-
-if __name__ == "__main__" or sys.version_info[0] < 3:
+import argparse
+import multiprocessing
+import os
+import hashlib
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+# absolute imports when run as (or imported next to) a script, e.g. by bench.py or by
+# worker processes re-importing the script as __mp_main__
+if not __package__ or sys.version_info[0] < 3:
 	from constants import constants
+	from layout import layout
 else:
 	from .constants import constants
+	from .layout import layout
+
+if not __package__ or sys.version_info[0] < 3:
+	from reedsolomon import rs_correct
+else:
+	from .reedsolomon import rs_correct
 
 class PARSE_ERROR:
 	WRONG_SIZE = "wrong size packet"
@@ -20,6 +37,10 @@ class PARSE_ERROR:
 	INVALID_SAT_STATE = "invalid sat state"
 	INVALID_ECODE = "invalid error code(s)"
 	INVALID_ELOC = "invalid error location(s)"
+	UNCORRECTABLE = "uncorrectable reed-solomon errors"
+	NOT_HEX = "non-hex characters"
+	INVALID_CALLSIGN = "invalid callsign"
+	INVALID_INPUT = "not a string or bytes"
 
 INVALID_STR = "[invalid]"
 
@@ -66,7 +87,7 @@ def get_bit(byte, i):
 def hex_to_int_le(hexstr):
 	try:
 		return unpack('<i', unhexlify(hexstr))[0]
-	except TypeError:
+	except (TypeError, ValueError, struct_error):
 		return -1
 
 def int_to_hex(intval):
@@ -100,6 +121,16 @@ def lfbosns_mV_to_mA(mV):
 def led_sns_mV_to_mA(mV):
 	return round(mV / .03, 0)
 
+def panelref_mV_to_mV(mV):
+	return int((mV-130)*5580/1000)
+def l_ref_mV_to_mV(mV):
+	return int((mV-50)*2717/1000)
+
+def rad_temp_raw_to_C(raw):
+	return int(raw/10)
+def imu_temp_raw_to_C(raw):
+	return raw / 333.87 + 21
+
 def get_sat_state(val):
 	try:
 		return {
@@ -113,33 +144,82 @@ def get_sat_state(val):
 	except KeyError:
 		return INVALID_STR
 
+MESSAGE_TYPE_NAMES = dict((t['id'], name) for name, t in layout['message_types'].items())
+
 def get_message_type(val):
 	try:
-		return {
-			0:	'IDLE',
-			1:	'ATTITUDE',
-			2:	'FLASH BURST',
-			3:	'FLASH CMP',
-			4:	'LOW POWER'
-		}[val]
+		return MESSAGE_TYPE_NAMES[val]
 	except KeyError:
 		return INVALID_STR
 
+CALLSIGN = b"WL9XZE"
+_HEX_CHARS = b"0123456789abcdefABCDEF"
+# what parse_packet takes (text or its ascii bytes) and parse_packet_bytes takes
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+_TEXT_TYPES = _BYTES_TYPES + (type(u''),)
+
 def is_hex_str(ps):
 	""" Returns whether the packet is only hexedecimal data """
-	try:
-		int(ps, 16)
-		return True
-	except ValueError:
-		return False
-
-def parse_preamble(ps):
+	if type(ps) == memoryview:
+		ps = ps.tobytes()
+	elif not isinstance(ps, (bytes, bytearray)):
+		try:
+			ps = ps.encode('ascii')
+		except (UnicodeError, AttributeError):
+			return False
+	# deleting every hex digit leaves nothing
+	return len(ps) > 0 and not ps.translate(None, _HEX_CHARS)
+
+def validate_preamble(buf):
+	"""
+	Returns the PARSE_ERROR for the first problem with a raw packet's callsign, message
+	type or satellite state, or None; only looks at those bytes
+	"""
+	if bytes(buf[:6]) != CALLSIGN:
+		return PARSE_ERROR.INVALID_CALLSIGN
+	return _validate_op_states(bytearray(buf[10:11])[0])
+
+def _validate_op_states(msg_op_states):
+	if msg_op_states & 0x07 not in MESSAGE_TYPE_NAMES:
+		return PARSE_ERROR.INVALID_MSG_TYPE
+	if get_sat_state((msg_op_states >> 3) & 0x07) == INVALID_STR:
+		return PARSE_ERROR.INVALID_SAT_STATE
+	return None
+
+def validate_packet(ps):
+	"""
+	Cheaply checks a hex packet before decoding it: returns the PARSE_ERROR for the first
+	of its size, characters, callsign, message type or satellite state that is wrong, or
+	None if it can be parsed
+	"""
+	if not isinstance(ps, _TEXT_TYPES):
+		return PARSE_ERROR.INVALID_INPUT
+	if (len(ps) != 510 and len(ps) != 446):
+		return PARSE_ERROR.WRONG_SIZE
+	if not is_hex_str(ps):
+		return PARSE_ERROR.NOT_HEX
+	return validate_preamble(unhexlify(ps[:22]))
+
+def validate_packet_bytes(buf):
+	""" validate_packet for a raw packet """
+	if not isinstance(buf, _BYTES_TYPES):
+		return PARSE_ERROR.INVALID_INPUT
+	if (len(buf) != 255 and len(buf) != 223):
+		return PARSE_ERROR.WRONG_SIZE
+	return validate_preamble(buf)
+
+PREAMBLE_STRUCT = Struct('<6siBBB')
+DATA_START = DATA_SECTION_START_BYTE // 2
+
+def parse_preamble(ps, buf=None):
+	if buf is None:
+		buf = unhexlify(ps)
 	preamble = {}
 	errs = []
-	preamble['callsign'] = unhexlify(ps[0:12]).decode("ascii", errors="replace")
-	preamble['timestamp'] = hex_to_int_le(ps[12:20])
+	callsign, timestamp, msg_op_states, bytes_of_data, num_errors = PREAMBLE_STRUCT.unpack_from(buf, 0)
+	preamble['callsign'] = callsign.decode("ascii", errors="replace")
+	preamble['timestamp'] = timestamp
 
-	msg_op_states = int(ps[20:22],16)
 	preamble['message_type'] = get_message_type(msg_op_states & 0x07) #get_bit(msg_op_states, 7)+get_bit(msg_op_states, 6)+get_bit(msg_op_states, 5)
 	if preamble['message_type'] == INVALID_STR:
 		errs.append(PARSE_ERROR.INVALID_MSG_TYPE)
@@ -150,318 +230,46 @@ def parse_preamble(ps):
 	preamble['FLASH_KILLED'] = get_bit(msg_op_states, 6)
 	preamble['MRAM_CPY'] = get_bit(msg_op_states, 7)
 
-	preamble['bytes_of_data'] = int(ps[22:24], 16)
-	preamble['num_errors'] = int(ps[24:26], 16)
+	preamble['bytes_of_data'] = bytes_of_data
+	preamble['num_errors'] = num_errors
 
 	return preamble, errs
 
-def parse_current_info(ps):
-	current_info = {}
-	current_info['time_to_flash'] = int(ps[26:28], 16)
-	current_info['boot_count'] = int(ps[28:30], 16)
-	current_info['L1_REF'] = untruncate(int(ps[30:32], 16), "S_LREF")
-	current_info['L2_REF'] = untruncate(int(ps[32:34], 16), "S_LREF")
-	current_info['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[34:36]), "S_L_SNS"))
-	current_info['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[36:38]), "S_L_SNS"))
-	current_info['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[38:40]), "S_L_TEMP"))
-	current_info['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[40:42]), "S_L_TEMP"))
-	current_info['PANELREF'] = int((untruncate(int(ps[42:44], 16), "S_PANELREF")-130)*5580/1000)
-	current_info['L_REF'] = int((untruncate(int(ps[44:46], 16), "S_LREF")-50)*2717/1000)
-
-	bat_digsigs_1 = int(ps[46:48],16)
-	bat_digsigs_2 = int(ps[48:50],16)
-	parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, current_info)
-
-	current_info['LF1REF'] = untruncate(int(ps[50:52], 16), "S_LF_VOLT")
-	current_info['LF2REF'] = untruncate(int(ps[52:54], 16), "S_LF_VOLT")
-	current_info['LF3REF'] = untruncate(int(ps[54:56], 16), "S_LF_VOLT")
-	current_info['LF4REF'] = untruncate(int(ps[56:58], 16), "S_LF_VOLT")
-
-	return current_info
-
-def parse_attitude_data(ps):
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for i in range(0, ATTITUDE_BATCHES_PER_PACKET):
-		cur = {}
-		cur['IR_FLASH_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start:start+4]+'0000'))
-		cur['IR_SIDE1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+4:start+8]+'0000'))
-		cur['IR_SIDE2_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+8:start+12]+'0000'))
-		cur['IR_RBF_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+12:start+16]+'0000'))
-		cur['IR_ACCESS_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+16:start+20]+'0000'))
-		cur['IR_TOP1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+20:start+24]+'0000'))
-
-		pd_1 = int(ps[start+24:start+26],16)
-		pd_2 = int(ps[start+26:start+28],16)
-
-		cur['PD_FLASH'] = (pd_1 >> 6) & (0x03)
-		cur['PD_SIDE1'] = (pd_1 >> 4) & (0x03)
-		cur['PD_SIDE2'] = (pd_1 >> 2) & (0x03)
-		cur['PD_ACCESS'] = (pd_1 >> 0) & (0x03)
-		cur['PD_TOP1'] = (pd_2 >> 6) & (0x03)
-		cur['PD_TOP2'] = (pd_2 >> 4) & (0x03)
-
-		cur['accelerometer1X'] = acc_raw_to_g(untruncate(int(ps[start+28:start+30], 16), "S_ACCEL"))*-1
-		cur['accelerometer1Z'] = acc_raw_to_g(untruncate(int(ps[start+30:start+32], 16), "S_ACCEL"))*-1
-		cur['accelerometer1Y'] = acc_raw_to_g(untruncate(int(ps[start+32:start+34], 16), "S_ACCEL"))
-
-		cur['accelerometer2X'] = acc_raw_to_g(untruncate(int(ps[start+34:start+36], 16), "S_ACCEL"))*-1
-		cur['accelerometer2Z'] = acc_raw_to_g(untruncate(int(ps[start+36:start+38], 16), "S_ACCEL"))*-1
-		cur['accelerometer2Y'] = acc_raw_to_g(untruncate(int(ps[start+38:start+40], 16), "S_ACCEL"))
-
-		cur['gyroscopeX'] = gyro_raw_to_dps(untruncate(int(ps[start+40:start+42], 16), "S_GYRO"))*-1
-		cur['gyroscopeZ'] = gyro_raw_to_dps(untruncate(int(ps[start+42:start+44], 16), "S_GYRO"))*-1
-		cur['gyroscopeY'] = gyro_raw_to_dps(untruncate(int(ps[start+44:start+46], 16), "S_GYRO"))
-
-		cur['magnetometer1Z'] = mag_raw_to_mG(untruncate(int(ps[start+46:start+48], 16), "S_MAG"))
-		cur['magnetometer1X'] = mag_raw_to_mG(untruncate(int(ps[start+48:start+50], 16), "S_MAG"))*-1
-		cur['magnetometer1Y'] = mag_raw_to_mG(untruncate(int(ps[start+50:start+52], 16), "S_MAG"))*-1
-
-		cur['magnetometer2Z'] = mag_raw_to_mG(untruncate(int(ps[start+52:start+54], 16), "S_MAG"))
-		cur['magnetometer2X'] = mag_raw_to_mG(untruncate(int(ps[start+54:start+56], 16), "S_MAG"))*-1
-		cur['magnetometer2Y'] = mag_raw_to_mG(untruncate(int(ps[start+56:start+58], 16), "S_MAG"))*-1
-
-		cur['timestamp'] = hex_to_int_le(ps[start+58:start+66])
-		cur['data_hash'] = ps[start:start+66]
-
-		data.append(cur)
-		start += 66
-	return data
-
-def parse_idle_data(ps):
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for i in range(0, IDLE_BATCHES_PER_PACKET):
-		cur = {}
-		event_history = int(ps[start:start+2],16)
-		parse_event_history(event_history, cur)
-
-		cur['L1_REF'] = untruncate(int(ps[start+2:start+4], 16), "S_LREF")
-		cur['L2_REF'] = untruncate(int(ps[start+4:start+6], 16), "S_LREF")
-		cur['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_L_SNS"))
-		cur['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+8:start+10]), "S_L_SNS"))
-		cur['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+10:start+12]), "S_L_TEMP"))
-		cur['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+12:start+14]), "S_L_TEMP"))
-		cur['PANELREF'] = int((untruncate(int(ps[start+14:start+16], 16), "S_PANELREF")-130)*5580/1000)
-		cur['L_REF'] = int((untruncate(int(ps[start+16:start+18], 16), "S_LREF")-50)*2717/1000)
-
-		bat_digsigs_1 = int(ps[start+18:start+20],16)
-		bat_digsigs_2 = int(ps[start+20:start+22],16)
-		parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, cur)
-
-		cur['RAD_TEMP'] = int(untruncate(int(ps[start+22:start+24], 16), "S_RAD_TEMP")/10)
-		cur['IMU_TEMP'] = (untruncate(int(ps[start+24:start+26], 16), "S_IMU_TEMP")) / 333.87 + 21
-
-		cur['IR_FLASH_AMB'] = ir_raw_to_C(untruncate(int(ps[start+26:start+28], 16), "S_IR_AMB"))
-		cur['IR_SIDE1_AMB'] = ir_raw_to_C(untruncate(int(ps[start+28:start+30], 16), "S_IR_AMB"))
-		cur['IR_SIDE2_AMB'] = ir_raw_to_C(untruncate(int(ps[start+30:start+32], 16), "S_IR_AMB"))
-		cur['IR_RBF_AMB'] = ir_raw_to_C(untruncate(int(ps[start+32:start+34], 16), "S_IR_AMB"))
-		cur['IR_ACCESS_AMB'] = ir_raw_to_C(untruncate(int(ps[start+34:start+36], 16), "S_IR_AMB"))
-		cur['IR_TOP1_AMB'] = ir_raw_to_C(untruncate(int(ps[start+36:start+38], 16), "S_IR_AMB"))
-
-		cur['timestamp'] = hex_to_int_le(ps[start+38:start+46])
-		cur['data_hash'] = ps[start:start+46]
-
-		data.append(cur)
-		start += 46
-	return data
-
-def parse_flash_burst_data(ps):
-	data = {}
-	burst = [dict() for x in range(FLASHBURST_BATCHES_PER_PACKET)]
-	start = DATA_SECTION_START_BYTE
-	data['data_hash'] = ps[start:start+302]
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['LED1TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LED_TEMP_FLASH"))
-		burst[i]['LED2TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LED_TEMP_FLASH"))
-		burst[i]['LED3TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+4:start+6]), "S_LED_TEMP_FLASH"))
-		burst[i]['LED4TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_LED_TEMP_FLASH"))
-		start += 8
-
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['LF1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LF_TEMP"))
-		burst[i]['LF3_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LF_TEMP"))
-		start += 4
-
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['LFB1SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LF_SNS_FLASH"))
-		burst[i]['LFB1OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LF_OSNS_FLASH"))
-		burst[i]['LFB2SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+4:start+6]), "S_LF_SNS_FLASH"))
-		burst[i]['LFB2OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_LF_OSNS_FLASH"))
-		start += 8
-
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['LF1REF'] = untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LF_VOLT")
-		burst[i]['LF2REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LF_VOLT")
-		burst[i]['LF3REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+4:start+6]), "S_LF_VOLT")
-		burst[i]['LF4REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_LF_VOLT")
-		start += 8
-
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['LED1SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LED_SNS"))
-		burst[i]['LED2SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LED_SNS"))
-		burst[i]['LED3SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+4:start+6]), "S_LED_SNS"))
-		burst[i]['LED4SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_LED_SNS"))
-		start += 8
-
-	for i in range(0, FLASHBURST_BATCHES_PER_PACKET):
-		burst[i]['gyroscopeX'] = gyro_raw_to_dps(untruncate(int(ps[start:start+2], 16), "S_GYRO"))*-1
-		burst[i]['gyroscopeZ'] = gyro_raw_to_dps(untruncate(int(ps[start+2:start+4], 16), "S_GYRO"))*-1
-		burst[i]['gyroscopeY'] = gyro_raw_to_dps(untruncate(int(ps[start+4:start+6], 16), "S_GYRO"))
-		start += 6
-	data['burst'] = burst
-	data['timestamp'] = hex_to_int_le(ps[start:start+8])
-	return data
-
-def parse_flash_cmp_data(ps):
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for i in range(0, FLASHCMP_BATCHES_PER_PACKET):
-		cur = {}
-		cur['LED1TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start:start+2]), "S_LED_TEMP_FLASH"))
-		cur['LED2TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+2:start+4]), "S_LED_TEMP_FLASH"))
-		cur['LED3TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+4:start+6]), "S_LED_TEMP_FLASH"))
-		cur['LED4TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_LED_TEMP_FLASH"))
-		cur['LF1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+8:start+10]), "S_LF_TEMP"))
-		cur['LF3_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+10:start+12]), "S_LF_TEMP"))
-
-		cur['LFB1SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+12:start+14]), "S_LF_SNS_FLASH"))
-		cur['LFB1OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+14:start+16]), "S_LF_OSNS_FLASH"))
-		cur['LFB2SNS'] = lfbsns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+16:start+18]), "S_LF_SNS_FLASH"))
-		cur['LFB2OSNS'] = lfbosns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+18:start+20]), "S_LF_OSNS_FLASH"))
-
-		cur['LF1REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+20:start+22]), "S_LF_VOLT")
-		cur['LF2REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+22:start+24]), "S_LF_VOLT")
-		cur['LF3REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+24:start+26]), "S_LF_VOLT")
-		cur['LF4REF'] = untruncate(hex_string_byte_to_signed_int(ps[start+26:start+28]), "S_LF_VOLT")
-
-		cur['LED1SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+28:start+30]), "S_LED_SNS"))
-		cur['LED2SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+30:start+32]), "S_LED_SNS"))
-		cur['LED3SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+32:start+34]), "S_LED_SNS"))
-		cur['LED4SNS'] = led_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+34:start+36]), "S_LED_SNS"))
-
-		cur['magnetometer1Z'] = mag_raw_to_mG(untruncate(int(ps[start+36:start+38], 16), "S_MAG"))
-		cur['magnetometer1X'] = mag_raw_to_mG(untruncate(int(ps[start+38:start+40], 16), "S_MAG"))*-1
-		cur['magnetometer1Y'] = mag_raw_to_mG(untruncate(int(ps[start+40:start+42], 16), "S_MAG"))*-1
-
-		cur['timestamp'] = hex_to_int_le(ps[start+42:start+50])
-		cur['data_hash'] = ps[start:start+50]
-		data.append(cur)
-		start += 50
-	return data
-
-def parse_low_power_data(ps):
-	data = []
-	start = DATA_SECTION_START_BYTE
-	for i in range(0, LOWPOWER_BATCHES_PER_PACKET):
-		cur = {}
-		event_history = int(ps[start:start+2],16)
-		parse_event_history(event_history, cur)
-
-		cur['L1_REF'] = untruncate(int(ps[start+2:start+4], 16), "S_LREF")
-		cur['L2_REF'] = untruncate(int(ps[start+4:start+6], 16), "S_LREF")
-		cur['L1_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+6:start+8]), "S_L_SNS"))
-		cur['L2_SNS'] = l_sns_mV_to_mA(untruncate(hex_string_byte_to_signed_int(ps[start+8:start+10]), "S_L_SNS"))
-		cur['L1_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+10:start+12]), "S_L_TEMP"))
-		cur['L2_TEMP'] = ad590_mV_to_C(untruncate(hex_string_byte_to_signed_int(ps[start+12:start+14]), "S_L_TEMP"))
-		cur['PANELREF'] = int((untruncate(int(ps[start+14:start+16], 16), "S_PANELREF")-130)*5580/1000)
-		cur['L_REF'] = int((untruncate(int(ps[start+16:start+18], 16), "S_LREF")-50)*2717/1000)
-
-		bat_digsigs_1 = int(ps[start+18:start+20],16)
-		bat_digsigs_2 = int(ps[start+20:start+22],16)
-		parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, cur)
-
-		cur['IR_FLASH_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+22:start+26]+'0000'))
-		cur['IR_SIDE1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+26:start+30]+'0000'))
-		cur['IR_SIDE2_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+30:start+34]+'0000'))
-		cur['IR_RBF_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+34:start+38]+'0000'))
-		cur['IR_ACCESS_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+38:start+42]+'0000'))
-		cur['IR_TOP1_OBJ'] = ir_raw_to_C(hex_to_int_le(ps[start+42:start+46]+'0000'))
-
-		cur['gyroscopeX'] = gyro_raw_to_dps(untruncate(int(ps[start+46:start+48], 16), "S_GYRO"))*-1
-		cur['gyroscopeZ'] = gyro_raw_to_dps(untruncate(int(ps[start+48:start+50], 16), "S_GYRO"))*-1
-		cur['gyroscopeY'] = gyro_raw_to_dps(untruncate(int(ps[start+50:start+52], 16), "S_GYRO"))
-
-		cur['timestamp'] = hex_to_int_le(ps[start+52:start+60])
-		cur['data_hash'] = ps[start:start+60]
-
-		data.append(cur)
-		start += 60
-	return data
-
-# common parsers
-def parse_event_history(event_history, obj):
-	obj['ANTENNA_DEPLOYED'] = get_bit(event_history, 1)
-	obj['LION_1_CHARGED'] = get_bit(event_history, 2)
-	obj['LION_2_CHARGED'] = get_bit(event_history, 3)
-	obj['LIFEPO4_B1_CHARGED'] = get_bit(event_history, 4)
-	obj['LIFEPO4_B2_CHARGED'] = get_bit(event_history, 5)
-	obj['FIRST_FLASH'] = get_bit(event_history, 6)
-	obj['PROG_MEM_REWRITTEN'] = get_bit(event_history, 7)
-
-
-def parse_dig_sigs(bat_digsigs_1, bat_digsigs_2, obj):
-	# invert some "that" are active LOW
-	obj['L1_RUN_CHG'] = get_bit(bat_digsigs_1, 0)
-	obj['L2_RUN_CHG'] = get_bit(bat_digsigs_1, 1)
-	obj['LF_B1_RUN_CHG'] = get_bit(bat_digsigs_1, 2)
-	obj['LF_B2_RUN_CHG'] = get_bit(bat_digsigs_1, 3)
-	obj['LF_B2_CHGN'] = not get_bit(bat_digsigs_1, 4)
-	obj['LF_B2_FAULTN'] = not get_bit(bat_digsigs_1, 5)
-	obj['LF_B1_FAULTN'] = not get_bit(bat_digsigs_1, 6)
-	obj['LF_B1_CHGN'] = not get_bit(bat_digsigs_1, 7)
-
-	obj['L2_ST'] = get_bit(bat_digsigs_2, 0)
-	obj['L1_ST'] = get_bit(bat_digsigs_2, 1)
-	obj['L1_DISG'] = not get_bit(bat_digsigs_2, 2)
-	obj['L2_DISG'] = not get_bit(bat_digsigs_2, 3)
-	obj['L1_CHGN'] = not get_bit(bat_digsigs_2, 4)
-	obj['L1_FAULTN'] = not get_bit(bat_digsigs_2, 5)
-	obj['L2_CHGN'] = not get_bit(bat_digsigs_2, 6)
-	obj['L2_FAULTN'] = not get_bit(bat_digsigs_2, 7)
+ERROR_LAYOUTS = dict((name, t['errors']) for name, t in layout['message_types'].items())
+ERROR_STRUCTS = dict((e['count'], Struct('<%dB' % (3*e['count']))) for e in ERROR_LAYOUTS.values())
 
 def getErrorStartByte(message_type):
-	if (message_type == 'IDLE'):
-		return 190*2
-	elif (message_type == 'ATTITUDE'):
-		return 194*2
-	elif (message_type == 'FLASH BURST'):
-		return 180*2
-	elif (message_type == 'FLASH CMP'):
-		return 179*2
-	elif (message_type == 'LOW POWER'):
-		return 179*2
-	return -1
+	try:
+		return ERROR_LAYOUTS[message_type]['start']*2
+	except KeyError:
+		return -1
 
 def getNumErrorsInPacket(message_type):
-	if (message_type == 'IDLE'):
-		return 11
-	elif (message_type == 'ATTITUDE'):
-		return 9
-	elif (message_type == 'FLASH BURST'):
-		return 14
-	elif (message_type == 'FLASH CMP'):
-		return 14
-	elif (message_type == 'LOW POWER'):
-		return 14
-	return -1
+	try:
+		return ERROR_LAYOUTS[message_type]['count']
+	except KeyError:
+		return -1
 
 def convert_error_timestamp(timestamp_data, packet_timestamp):
 	# see https://github.com/BrownaSpaceEngineering/EQUiSatOS/blob/master/EQUiSatOS/EQUiSatOS/src/data_handling/package_transmission.c#L209
 	return packet_timestamp - ERROR_TIME_BUCKET_SIZE*timestamp_data
 
-def parse_errors(ps, message_type, packet_timestamp):
+def parse_errors(ps, message_type, packet_timestamp, buf=None):
+	if buf is None:
+		buf = unhexlify(ps)
 	errors = []
 	invalid_ecode = False
 	invalid_eloc = False
 	start = getErrorStartByte(message_type)
 	num_errors_in_packet = getNumErrorsInPacket(message_type)
+	v = ERROR_STRUCTS[num_errors_in_packet].unpack_from(buf, start // 2)
+	j = 0
 	for i in range(0, num_errors_in_packet):
 		cur = {}
-		cur['error_code'] = int(ps[start:start+2],16) & 0x7F
-		cur['priority_bit'] = get_bit(int(ps[start:start+2],16),7)
-		cur['error_location'] = int(ps[start+2:start+4],16)
-		cur['timestamp'] = convert_error_timestamp(int(ps[start+4:start+6],16), packet_timestamp)
+		cur['error_code'] = v[j] & 0x7F
+		cur['priority_bit'] = get_bit(v[j],7)
+		cur['error_location'] = v[j+1]
+		cur['timestamp'] = convert_error_timestamp(v[j+2], packet_timestamp)
 		cur['error_code_name'] = get_ECODE_name(cur['error_code'])
 		if cur['error_code_name'] == INVALID_STR:
 			invalid_ecode = True
@@ -472,6 +280,7 @@ def parse_errors(ps, message_type, packet_timestamp):
 		cur['data_hash'] = ps[start:start+4] + int_to_hex(cur['timestamp'])
 		errors.append(cur)
 		start += 6
+		j += 3
 
 	parse_errs = []
 	if invalid_eloc:
@@ -480,39 +289,548 @@ def parse_errors(ps, message_type, packet_timestamp):
 		parse_errs.append(PARSE_ERROR.INVALID_ECODE)
 	return errors, parse_errs
 
-def parse_data_section(message_type, ps):
-	if (message_type == 'IDLE'):
-		return parse_idle_data(ps)
-	elif (message_type == 'ATTITUDE'):
-		return parse_attitude_data(ps)
-	elif (message_type == 'FLASH BURST'):
-		return parse_flash_burst_data(ps)
-	elif (message_type == 'FLASH CMP'):
-		return parse_flash_cmp_data(ps)
-	elif (message_type == 'LOW POWER'):
-		return parse_low_power_data(ps)
-	return {}
-
-
-def parse_packet(ps):
-	# with or without parity bytes
-	if (len(ps) != 510 and len(ps) != 446):
-		return {}, [PARSE_ERROR.WRONG_SIZE]
+# layout compiler
+# each section of layout.json is turned into the source of a straight-line decoder (one
+# struct unpack per record and a dict literal of converted fields) which is compiled once
+# at import; nothing about the layout is looked up at parse time
+_WIDTH_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+def layout_count(val):
+	# counts may name an entry of constants.json so they stay shared with packetparse.js
+	if isinstance(val, int):
+		return val
+	return constants[val]
+
+def kept_within(keep, name):
+	# the paths of keep within a group, or None for all of them
+	if keep is None or name in keep:
+		return None
+	prefix = name + '.'
+	return set(path[len(prefix):] for path in keep if path.startswith(prefix))
+
+def field_kept(field, keep):
+	if keep is None:
+		return True
+	if 'bitfield' in field:
+		return any(bit['name'] in keep for bit in layout['bitfields'][field['bitfield']])
+	return field['name'] in keep
+
+def _collect_reads(fields, base, reads, keep=None):
+	for field in fields:
+		if 'groups' in field:
+			sub = kept_within(keep, field['name'])
+			if sub is not None and not sub:
+				continue
+			for i in range(layout_count(field['count'])):
+				for group in field['groups']:
+					_collect_reads(group['fields'], base + group['offset'] + i*group['size'], reads, sub)
+			continue
+		if not field_kept(field, keep):
+			continue
+		width = field.get('width', 1)
+		fmt = _WIDTH_FORMATS[width]
+		if field.get('signed'):
+			fmt = fmt.lower()
+		reads[base + field['offset']] = (fmt, width)
+
+def _field_expr(field, var):
+	expr = var
+	sig = field.get('signal')
+	if sig is not None:
+		# untruncate() with the line constants resolved ahead of time
+		expr = 'int(int((%s << 8) / %r) - %r)' % (expr, get_line_m_from_signal(sig), get_line_b_from_signal(sig))
+	conv = field.get('conversion')
+	if conv is not None:
+		if conv not in globals():
+			raise ValueError("unknown conversion in layout: " + conv)
+		expr = '%s(%s)' % (conv, expr)
+	if field.get('flip'):
+		expr = '%s*-1' % expr
+	return expr
+
+def field_converter(field):
+	""" Returns the conversion of a layout field as a function of its raw value """
+	return eval('lambda v: ' + _field_expr(field, 'v'), globals())
+
+def field_type(field):
+	""" Returns the type (bool, int or float) a layout field's values are converted to """
+	if 'signal' not in field and 'conversion' not in field and not field.get('flip'):
+		return int
+	convert = field_converter(field)
+	bits = 8*field.get('width', 1)
+	lo = -(1 << (bits - 1)) if field.get('signed') else 0
+	types = set(type(convert(v)) for v in range(lo, lo + (1 << bits), max(1, (1 << bits) >> 12)))
+	if len(types) != 1:
+		raise ValueError("field %s converts to more than one type" % field['name'])
+	return types.pop()
+
+# a converted 1-byte field only has 256 possible values, so the decoders look them up in a
+# table built from the field's conversion (so untruncate's int truncation carries over)
+_byte_tables = {}
+
+def _byte_table_name(field):
+	key = (field.get('signal'), field.get('conversion'), field.get('flip', False), field.get('signed', False))
+	if key not in _byte_tables:
+		convert = field_converter(field)
+		if key[3]:
+			# negative raw values index from the end of the table
+			table = [convert(v if v < 128 else v - 256) for v in range(256)]
+		else:
+			table = [convert(v) for v in range(256)]
+		_byte_tables[key] = ('_T%d' % len(_byte_tables), table)
+	return _byte_tables[key][0]
+
+def _bit_expr(bit, var):
+	if 'mask' in bit:
+		return '(%s >> %d) & %d' % (var, bit['shift'], bit['mask'])
+	expr = '%s & %d > 0' % (var, 1 << bit['bit'])
+	if bit.get('invert'):
+		expr = 'not ' + expr
+	return expr
+
+# read-only parse results, for ParseCache hits to share
+def _read_only_error(self, *args, **kwargs):
+	raise TypeError("parse results from a ParseCache are read-only (copy.deepcopy() one to modify it)")
+
+class _ReadOnlyDict(dict):
+	""" A dict that can't be modified; copying or pickling one gives a plain dict """
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only_error
+
+	def __reduce__(self):
+		return (dict, (dict(self),))
+
+class _ReadOnlyList(list):
+	""" A list that can't be modified; copying or pickling one gives a plain list """
+	__setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only_error
+	append = extend = insert = pop = remove = reverse = sort = clear = _read_only_error
+
+	def __reduce__(self):
+		return (list, (list(self),))
+
+_CONTAINERS = (dict, list)
+
+class CompactRecord(object):
+	"""
+	A decoded record with a slot per field instead of a dict, for keeping lots of parsed
+	data in memory. It reads like the dict (record[name], get(), keys(), items(), in, len)
+	and to_dict() gives the dict that parse_packet would have returned.
+	"""
+	__slots__ = ()
+	_fields = ()
+	_field_set = frozenset()
+
+	def __getitem__(self, key):
+		if key in self._field_set:
+			return getattr(self, key)
+		raise KeyError(key)
+
+	def get(self, key, default=None):
+		if key in self._field_set:
+			return getattr(self, key)
+		return default
+
+	def __contains__(self, key):
+		return key in self._field_set
+
+	def __iter__(self):
+		return iter(self._fields)
+
+	def __len__(self):
+		return len(self._fields)
+
+	def keys(self):
+		return list(self._fields)
+
+	def values(self):
+		return [getattr(self, key) for key in self._fields]
+
+	def items(self):
+		return [(key, getattr(self, key)) for key in self._fields]
+
+	def to_dict(self):
+		record = {}
+		for key in self._fields:
+			val = getattr(self, key)
+			if isinstance(val, list):
+				# groups (the bursts of a flash burst) are lists of records
+				val = [r.to_dict() for r in val]
+			record[key] = val
+		return record
+
+	def __eq__(self, other):
+		if isinstance(other, CompactRecord):
+			other = other.to_dict()
+		return self.to_dict() == other
+
+	def __ne__(self, other):
+		return not self == other
+
+	__hash__ = None
+
+	def __reduce__(self):
+		return (type(self), tuple(self.values()))
+
+	def __repr__(self):
+		return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % item for item in self.items()))
+
+# name -> CompactRecord subclass, for each compiled record layout
+_record_classes = {}
+
+def _record_class(name, keys):
+	cls = _record_classes.get(name)
+	if cls is not None:
+		if cls._fields != tuple(keys):
+			raise ValueError("record class %s compiled with different fields" % name)
+		return cls
+	src = 'def __init__(self, %s):\n' % ', '.join(keys) + ''.join('\tself.%s = %s\n' % (key, key) for key in keys)
+	namespace = {}
+	exec(compile(src, '<layout:%s>' % name, 'exec'), namespace)
+	cls = _record_classes[name] = type(name, (CompactRecord,), {
+		'__slots__': tuple(keys),
+		'_fields': tuple(keys),
+		'_field_set': frozenset(keys),
+		'__init__': namespace['__init__'],
+		'__module__': __name__,
+	})
+	# module level, so records can be pickled
+	globals()[name] = cls
+	# for ParseCache results; pickled and copied as the plain class
+	cls._read_only_class = type('ReadOnly' + name, (cls,), {
+		'__slots__': (),
+		'__setattr__': _read_only_error,
+		'__delattr__': _read_only_error,
+		'__reduce__': lambda self: (cls, tuple(self.values())),
+		'__module__': __name__,
+	})
+	return cls
+
+def _record_expr(items, class_name=None):
+	# the source of a dict of (key, expression) items, or of a record class built from them
+	if class_name is None:
+		return '{%s}' % ', '.join('%r: %s' % item for item in items)
+	cls = _record_class(class_name, [key for key, expr in items])
+	return '%s(%s)' % (cls.__name__, ', '.join(expr for key, expr in items))
+
+def _record_items(fields, base, index, keep=None, class_name=None):
+	items = []
+	for field in fields:
+		if 'groups' in field:
+			sub_keep = kept_within(keep, field['name'])
+			if sub_keep is not None and not sub_keep:
+				continue
+			sub_class = class_name and '%s_%s' % (class_name, field['name'])
+			records = []
+			for i in range(layout_count(field['count'])):
+				sub = []
+				for group in field['groups']:
+					sub += _record_items(group['fields'], base + group['offset'] + i*group['size'], index, sub_keep, sub_class)
+				records.append(_record_expr(sub, sub_class))
+			items.append((field['name'], '[%s]' % ', '.join(records)))
+			continue
+		if not field_kept(field, keep):
+			continue
+		var = 'v[%d]' % index[base + field['offset']]
+		if 'bitfield' in field:
+			for bit in layout['bitfields'][field['bitfield']]:
+				if keep is None or bit['name'] in keep:
+					items.append((bit['name'], _bit_expr(bit, var)))
+		elif field.get('width', 1) == 1 and ('signal' in field or 'conversion' in field or field.get('flip')):
+			items.append((field['name'], '%s[%s]' % (_byte_table_name(field), var)))
+		else:
+			items.append((field['name'], _field_expr(field, var)))
+	return items
+
+def _compile_section(name, section, start, batches=None, keep=None, class_name=None):
+	"""
+	Builds a parse_*(ps, buf=None) function for one section of layout.json; keep limits the
+	fields it decodes to a set of names (and "group.name" paths within groups), and with a
+	class_name it returns CompactRecords of that (generated) class instead of dicts
+	"""
+	reads = {}
+	_collect_reads(section['fields'], 0, reads, keep)
+	fmt = '<'
+	index = {}
+	pos = 0
+	for offset in sorted(reads):
+		if offset > pos:
+			fmt += '%dx' % (offset - pos)
+		index[offset] = len(index)
+		fmt += reads[offset][0]
+		pos = offset + reads[offset][1]
+
+	items = _record_items(section['fields'], 0, index, keep, class_name)
+	hashed = 'data_hash' in section and (keep is None or 'data_hash' in keep)
+	hash_item = ('data_hash', 'ps[h:h+%d]' % (2*section['size']))
+	if hashed and section.get('data_hash') == 'first':
+		items.insert(0, hash_item)
+	elif hashed:
+		items.append(hash_item)
+	record = _record_expr(items, class_name)
+
+	lines = ['def %s(ps, buf=None):' % name,
+		'\tif buf is None:',
+		'\t\tbuf = unhexlify(ps)']
+	if batches is None:
+		lines.append('\tv = _struct.unpack_from(buf, %d)' % start)
+		if hashed:
+			lines.append('\th = %d' % (2*start))
+		lines.append('\treturn %s' % record)
+	else:
+		lines += ['\tdata = []',
+			'\tfor start in %r:' % (tuple(start + i*section['size'] for i in range(batches)),),
+			'\t\tv = _struct.unpack_from(buf, start)']
+		if hashed:
+			lines.append('\t\th = start*2')
+		lines += ['\t\tdata.append(%s)' % record,
+			'\treturn data']
+
+	namespace = dict(globals())
+	namespace.update(_byte_tables.values())
+	namespace['_struct'] = Struct(fmt)
+	exec(compile('\n'.join(lines) + '\n', '<layout:%s>' % name, 'exec'), namespace)
+	return namespace[name]
+
+parse_current_info = _compile_section('parse_current_info', layout['current_info'], layout['current_info']['start'])
+
+# the data section decoders, and the same returning CompactRecords (IdleRecord, ...)
+DATA_PARSERS = {}
+COMPACT_DATA_PARSERS = {}
+for _name, _section in layout['message_types'].items():
+	_fn_name = 'parse_%s_data' % _name.lower().replace(' ', '_')
+	_batches = layout_count(_section['batches']) if 'batches' in _section else None
+	DATA_PARSERS[_name] = globals()[_fn_name] = _compile_section(_fn_name, _section, DATA_START, _batches)
+	_class_name = _name.title().replace(' ', '') + 'Record'
+	COMPACT_DATA_PARSERS[_name] = _compile_section(_fn_name + '_compact', _section, DATA_START, _batches, class_name=_class_name)
+
+# field projections
+PREAMBLE_FIELDS = ('callsign', 'timestamp', 'message_type', 'satellite_state', 'FLASH_KILLED', 'MRAM_CPY', 'bytes_of_data', 'num_errors')
+ERROR_FIELDS = ('error_code', 'priority_bit', 'error_location', 'timestamp', 'error_code_name', 'error_location_name', 'data_hash')
+
+def _layout_paths(fields, prefix=''):
+	paths = set()
+	for field in fields:
+		if 'groups' in field:
+			paths.add(prefix + field['name'])
+			for group in field['groups']:
+				paths |= _layout_paths(group['fields'], prefix + field['name'] + '.')
+		elif 'bitfield' in field:
+			paths.update(prefix + bit['name'] for bit in layout['bitfields'][field['bitfield']])
+		else:
+			paths.add(prefix + field['name'])
+	return paths
+
+def _section_paths(section):
+	paths = _layout_paths(section['fields'])
+	if 'data_hash' in section:
+		paths.add('data_hash')
+	return paths
+
+SECTION_PATHS = {
+	'preamble': set(PREAMBLE_FIELDS),
+	'current_info': _section_paths(layout['current_info']),
+	'data': set().union(*[_section_paths(t) for t in layout['message_types'].values()]),
+	'errors': set(ERROR_FIELDS),
+}
+
+_projections = {}
+
+def projection_sections(fields):
+	"""
+	Returns {section: None (all of it) or the set of paths kept within each of its records}
+	for a projection; raises ValueError for paths that aren't in the layout
+	"""
+	keep = {}
+	for path in fields:
+		section, _, rest = path.partition('.')
+		if section not in SECTION_PATHS or (rest and rest not in SECTION_PATHS[section]):
+			raise ValueError("unknown field in projection: " + path)
+		if not rest:
+			keep[section] = None
+		elif keep.get(section, ()) is not None:
+			keep.setdefault(section, set()).add(rest)
+	return keep
+
+def compile_projection(fields):
+	"""
+	Compiles (once per distinct projection) decoders for only the given sections
+	("data") and dotted field paths ("data.L1_TEMP", "preamble.timestamp",
+	"data.burst.LED1TEMP"); raises ValueError for paths that aren't in the layout
+	"""
+	key = frozenset(fields)
+	if key in _projections:
+		return _projections[key]
+	keep = projection_sections(key)
+	parsers = {}
+	if 'current_info' in keep:
+		info = layout['current_info']
+		parsers['current_info'] = _compile_section('parse_current_info', info, info['start'], keep=keep['current_info'])
+	if 'data' in keep:
+		parsers['data'] = {}
+		for name, section in layout['message_types'].items():
+			batches = layout_count(section['batches']) if 'batches' in section else None
+			parsers['data'][name] = _compile_section(DATA_PARSERS[name].__name__, section, DATA_START, batches, keep['data'])
+	projection = _projections[key] = (keep, parsers)
+	return projection
+
+def _project(record, keep):
+	if keep is None:
+		return record
+	return dict((k, v) for k, v in record.items() if k in keep)
+
+def _parse_projected(ps, buf, projection):
+	keep, parsers = projection
+	packet = {}
+	preamble, parse_errs = parse_preamble(ps, buf)
+	message_type = preamble['message_type']
+	if 'preamble' in keep:
+		packet['preamble'] = _project(preamble, keep['preamble'])
+	if 'current_info' in keep:
+		packet['current_info'] = parsers['current_info'](ps, buf)
+	if 'data' in keep:
+		packet['data'] = parsers['data'][message_type](ps, buf) if message_type != INVALID_STR else {}
+	errors = ()
+	if 'errors' in keep:
+		if message_type != INVALID_STR:
+			errors, error_err = parse_errors(ps, message_type, preamble['timestamp'], buf)
+			parse_errs = parse_errs + error_err
+			packet['errors'] = [_project(e, keep['errors']) for e in errors]
+		else:
+			packet['errors'] = {}
+	if _stats is not None:
+		_stats.record(preamble, errors, parse_errs, ())
+	return packet, parse_errs
 
-	# ensure that it is a string
-	if type(ps) == bytes:
-		ps = ps.decode('ascii')
+def parse_data_section(message_type, ps, buf=None, compact=False):
+	try:
+		parser = (COMPACT_DATA_PARSERS if compact else DATA_PARSERS)[message_type]
+	except KeyError:
+		return {}
+	return parser(ps, buf)
+
+# opt-in parse statistics; while they're off (_stats is None) the only cost is checking that
+_stats = None
+_clock = getattr(time, 'perf_counter', time.time)
+
+class ParseStats(object):
+	""" Cumulative counts and timings of everything parsed while stats are enabled """
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._clear()
+
+	def _clear(self):
+		self.packets = 0
+		self.stage_calls = {}
+		self.stage_seconds = {}
+		self.message_types = {}
+		self.satellite_states = {}
+		self.parse_errors = {}
+		self.invalid_ecodes = 0
+		self.invalid_elocs = 0
+
+	def reset(self):
+		with self._lock:
+			self._clear()
+
+	def record(self, preamble, errors, parse_errs, timings):
+		with self._lock:
+			if preamble is not None:
+				self.packets += 1
+				for counts, key in ((self.message_types, preamble['message_type']), (self.satellite_states, preamble['satellite_state'])):
+					counts[key] = counts.get(key, 0) + 1
+			for err in parse_errs:
+				self.parse_errors[err] = self.parse_errors.get(err, 0) + 1
+			for error in errors:
+				self.invalid_ecodes += error['error_code_name'] == INVALID_STR
+				self.invalid_elocs += error['error_location_name'] == INVALID_STR
+			for stage, seconds in timings:
+				self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+				self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+	def snapshot(self, reset=False):
+		""" A copy of the counts; with reset, they're cleared in the same step (so nothing recorded in between is lost) """
+		with self._lock:
+			snapshot = {
+				'packets': self.packets,
+				'stage_calls': dict(self.stage_calls),
+				'stage_seconds': dict(self.stage_seconds),
+				'message_types': dict(self.message_types),
+				'satellite_states': dict(self.satellite_states),
+				'parse_errors': dict(self.parse_errors),
+				'invalid_ecodes': self.invalid_ecodes,
+				'invalid_elocs': self.invalid_elocs,
+			}
+			if reset:
+				self._clear()
+			return snapshot
+
+def enable_stats():
+	""" Starts collecting parse statistics (see stats_snapshot) """
+	global _stats
+	if _stats is None:
+		_stats = ParseStats()
+
+def disable_stats():
+	global _stats
+	_stats = None
+
+def stats_snapshot(reset=False):
+	"""
+	Returns the statistics collected since they were enabled (or last reset) as a dict of
+	packets, stage_calls, stage_seconds (cumulative, per stage), message_types and
+	satellite_states (packet counts), parse_errors (count per PARSE_ERROR), invalid_ecodes
+	and invalid_elocs (counts of error entries); None if stats are disabled. Lazy packets
+	are counted by their preamble, and only stages of non-lazy parses are timed.
+	"""
+	stats = _stats
+	if stats is None:
+		return None
+	return stats.snapshot(reset)
+
+def reset_stats():
+	if _stats is not None:
+		_stats.reset()
+
+def _parse_timed(ps, buf, stats, compact=False):
+	# _parse with each stage timed
+	packet = {}
+	timings = []
+	t0 = _clock()
+	packet['preamble'], parse_errs = parse_preamble(ps, buf)
+	t1 = _clock()
+	packet['current_info'] = parse_current_info(ps, buf)
+	t2 = _clock()
+	timings += [('parse_preamble', t1 - t0), ('parse_current_info', t2 - t1)]
 
+	message_type = packet['preamble']['message_type']
+	if message_type != INVALID_STR:
+		data_parser = (COMPACT_DATA_PARSERS if compact else DATA_PARSERS)[message_type]
+		packet['data'] = data_parser(ps, buf)
+		t3 = _clock()
+		packet['errors'], error_err = parse_errors(ps, message_type, packet['preamble']['timestamp'], buf)
+		t4 = _clock()
+		parse_errs = parse_errs + error_err
+		timings += [(data_parser.__name__, t3 - t2), ('parse_errors', t4 - t3)]
+	else:
+		packet['data'] = {}
+		packet['errors'] = {}
+
+	stats.record(packet['preamble'], packet['errors'], parse_errs, timings)
+	return packet, parse_errs
+
+def _parse(ps, buf, compact=False):
+	stats = _stats
+	if stats is not None:
+		return _parse_timed(ps, buf, stats, compact)
 	packet = {}
 	parse_errs = []
-	packet['preamble'], preamble_err = parse_preamble(ps)
+	packet['preamble'], preamble_err = parse_preamble(ps, buf)
 	parse_errs = parse_errs + preamble_err
-	packet['current_info'] = parse_current_info(ps)
+	packet['current_info'] = parse_current_info(ps, buf)
 
 	message_type = packet['preamble']['message_type']
 	if message_type != INVALID_STR:
-		packet['data'] = parse_data_section(message_type, ps)
-		packet['errors'], error_err = parse_errors(ps, message_type, packet['preamble']['timestamp'])
+		packet['data'] = parse_data_section(message_type, ps, buf, compact)
+		packet['errors'], error_err = parse_errors(ps, message_type, packet['preamble']['timestamp'], buf)
 		parse_errs = parse_errs + error_err
 	else:
 		packet['data'] = {}
@@ -520,37 +838,797 @@ def parse_packet(ps):
 
 	return packet, parse_errs
 
-def find_packets(file):
-	with open(file, 'r') as f:
-		dump_str = f.read().replace('\n', '')
-		packets = re.findall("(574c39585a45.{498})", dump_str)
+class Packet(object):
+	"""
+	A packet that decodes its preamble right away and everything else on first access.
+	Holds on to the packet buffer, which must not be modified afterwards.
+	"""
+	__slots__ = ('_ps', 'buf', 'corrected_symbols', 'compact', 'preamble', '_preamble_errs', '_current_info', '_data', '_errors', '_error_errs')
+
+	def __init__(self, ps, buf, corrected_symbols=None, compact=False):
+		self._ps = ps
+		self.buf = buf
+		self.corrected_symbols = corrected_symbols
+		self.compact = compact
+		self.preamble, self._preamble_errs = parse_preamble(ps, buf)
+		if _stats is not None:
+			_stats.record(self.preamble, (), self._preamble_errs, ())
+		self._current_info = None
+		self._data = None
+		self._errors = None
+		self._error_errs = None
+
+	@property
+	def ps(self):
+		# the hex string is only needed for the data hashes, so raw packets hexlify lazily
+		if self._ps is None:
+			self._ps = hexlify(self.buf).decode('ascii')
+		return self._ps
+
+	@property
+	def message_type(self):
+		return self.preamble['message_type']
+
+	@property
+	def current_info(self):
+		if self._current_info is None:
+			self._current_info = parse_current_info(self.ps, self.buf)
+		return self._current_info
+
+	@property
+	def data(self):
+		if self._data is None:
+			if self.message_type != INVALID_STR:
+				self._data = parse_data_section(self.message_type, self.ps, self.buf, self.compact)
+			else:
+				self._data = {}
+		return self._data
+
+	@property
+	def errors(self):
+		if self._errors is None:
+			if self.message_type != INVALID_STR:
+				self._errors, self._error_errs = parse_errors(self.ps, self.message_type, self.preamble['timestamp'], self.buf)
+			else:
+				self._errors, self._error_errs = {}, []
+		return self._errors
+
+	@property
+	def parse_errors(self):
+		""" All of the packet's parse errors (this decodes the error section) """
+		self.errors
+		return self._preamble_errs + self._error_errs
+
+	def __getitem__(self, section):
+		if section not in ('preamble', 'current_info', 'data', 'errors'):
+			raise KeyError(section)
+		return getattr(self, section)
+
+	def to_dict(self):
+		""" Returns the packet in the same form as parse_packet(ps)[0] """
+		packet = {
+			'preamble': self.preamble,
+			'current_info': self.current_info,
+			'data': self.data,
+			'errors': self.errors,
+		}
+		if self.corrected_symbols is not None:
+			packet['corrected_symbols'] = self.corrected_symbols
+		return packet
+
+def _reject(err):
+	if _stats is not None:
+		_stats.record(None, (), [err], ())
+	return {}, [err]
+
+def _parse_buf(ps, buf, lazy, correct, validate, fields=None, compact=False):
+	# ps is None if the caller only has the raw bytes
+	num_corrected = None
+	if correct:
+		corrected, num_corrected = rs_correct(buf)
+		if num_corrected > 0:
+			buf = bytes(corrected)
+			ps = None
+	if validate:
+		# after correction, which can repair the message type and state bits
+		err = validate_preamble(buf)
+		if err is not None:
+			return _reject(err)
+	if lazy:
+		packet = Packet(ps, buf, num_corrected, compact)
+		parse_errs = list(packet._preamble_errs)
+	else:
+		if ps is None:
+			# the data hashes are still reported as hex
+			ps = hexlify(buf).decode('ascii')
+		if fields is None:
+			packet, parse_errs = _parse(ps, buf, compact)
+		else:
+			packet, parse_errs = _parse_projected(ps, buf, compile_projection(fields))
+		if num_corrected is not None:
+			packet['corrected_symbols'] = num_corrected
+	if num_corrected is not None and num_corrected < 0:
+		parse_errs.insert(0, PARSE_ERROR.UNCORRECTABLE)
+		if _stats is not None:
+			_stats.record(None, (), [PARSE_ERROR.UNCORRECTABLE], ())
+	return packet, parse_errs
+
+def parse_packet(ps, lazy=False, correct=False, validate=False, fields=None, compact=False):
+	"""
+	Parses a hex string packet, returning (packet, parse errors). With lazy=True the packet
+	is a Packet and only the preamble's parse errors are returned; see Packet.parse_errors.
+	With correct=True, packets with parity bytes are run through Reed-Solomon correction
+	first and get a 'corrected_symbols' count (-1 if there were too many errors to correct,
+	in which case the packet is parsed as received). With validate=True, packets that fail
+	validate_packet's checks are rejected (as ({}, [reason])) before anything is decoded.
+	fields is a projection (see compile_projection): only those sections and fields are
+	decoded and returned, and only the parse errors of the decoded sections are reported.
+	It can't be combined with lazy or compact. With compact=True the data section is made of
+	CompactRecords (IdleRecord, ...) rather than dicts, which take a fraction of the memory;
+	their to_dict() gives the usual dicts. Whatever the input, the result is (packet, parse errors);
+	input that isn't a packet at all is rejected with a parse error rather than raising.
+	"""
+	if fields is not None and (lazy or compact):
+		raise ValueError("a projection can't be used with lazy packets or compact records")
+	if not isinstance(ps, _TEXT_TYPES):
+		return _reject(PARSE_ERROR.INVALID_INPUT)
+	# with or without parity bytes
+	if (len(ps) != 510 and len(ps) != 446):
+		return _reject(PARSE_ERROR.WRONG_SIZE)
+	if validate and not is_hex_str(ps):
+		return _reject(PARSE_ERROR.NOT_HEX)
+
+	try:
+		# ensure that it is a string
+		if not isinstance(ps, type(u'')):
+			ps = bytes(ps).decode('ascii')
+		buf = unhexlify(ps)
+	except (ValueError, TypeError):
+		# binascii.Error and UnicodeDecodeError are ValueErrors
+		return _reject(PARSE_ERROR.NOT_HEX)
+	return _parse_buf(ps, buf, lazy, correct and len(buf) == 255, validate, fields, compact)
+
+def parse_packet_bytes(buf, lazy=False, correct=False, validate=False, fields=None, compact=False):
+	""" Parses a raw (not hex-encoded) packet; accepts bytes, bytearray or memoryview """
+	if fields is not None and (lazy or compact):
+		raise ValueError("a projection can't be used with lazy packets or compact records")
+	if not isinstance(buf, _BYTES_TYPES):
+		return _reject(PARSE_ERROR.INVALID_INPUT)
+	if type(buf) == memoryview and (buf.itemsize != 1 or not buf.contiguous):
+		# struct can only unpack from contiguous bytes
+		buf = buf.tobytes()
+	# with or without parity bytes
+	if (len(buf) != 255 and len(buf) != 223):
+		return _reject(PARSE_ERROR.WRONG_SIZE)
+	return _parse_buf(None, buf, lazy, correct and len(buf) == 255, validate, fields, compact)
+
+def _read_only_result(value):
+	""" A read-only copy of a (non-lazy) parse result, sharing its values but none of its containers """
+	cls = type(value)
+	if cls is dict:
+		return _ReadOnlyDict([(key, _read_only_result(val) if type(val) in _CONTAINERS or isinstance(val, CompactRecord) else val) for key, val in value.items()])
+	if cls is list:
+		return _ReadOnlyList([_read_only_result(val) if type(val) in _CONTAINERS or isinstance(val, CompactRecord) else val for val in value])
+	if isinstance(value, CompactRecord):
+		record = value._read_only_class.__new__(value._read_only_class)
+		for key in value._fields:
+			object.__setattr__(record, key, _read_only_result(getattr(value, key)))
+		return record
+	return value
+
+def _fresh_packet(packet):
+	# a lazy Packet over the same buffer that hasn't decoded anything past its preamble
+	fresh = Packet.__new__(Packet)
+	fresh._ps = packet._ps
+	fresh.buf = packet.buf
+	fresh.corrected_symbols = packet.corrected_symbols
+	fresh.compact = packet.compact
+	fresh.preamble = dict(packet.preamble)
+	fresh._preamble_errs = list(packet._preamble_errs)
+	fresh._current_info = fresh._data = fresh._errors = fresh._error_errs = None
+	return fresh
+
+class ParseCache(object):
+	"""
+	A bounded LRU cache of parse results, for when the same packet is received more than
+	once (e.g. by several ground stations). Results are keyed on a digest of the packet as
+	given. Results are shared between callers, so they're read-only: dicts and lists that
+	raise TypeError when modified (copy.deepcopy() gives a plain copy), and lazy Packets
+	that each caller decodes on its own. It can be shared between threads.
+	"""
+	def __init__(self, maxsize=1024):
+		self.maxsize = maxsize
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def _lookup(self, key, parse, *args):
+		with self._lock:
+			entry = self._entries.pop(key, None)
+			if entry is not None:
+				self.hits += 1
+				# back in at the most recently used end (OrderedDict.move_to_end is py3 only)
+				self._entries[key] = entry
+			else:
+				self.misses += 1
+		if entry is not None:
+			packet, parse_errs = entry
+			return _fresh_packet(packet) if type(packet) is Packet else packet, list(parse_errs)
+
+		# parsed outside the lock; threads missing on the same packet at once both parse it
+		packet, parse_errs = parse(*args)
+		if packet:
+			if type(packet) is Packet:
+				entry = (_fresh_packet(packet), tuple(parse_errs))
+			else:
+				packet = _read_only_result(packet)
+				entry = (packet, tuple(parse_errs))
+			with self._lock:
+				self._entries[key] = entry
+				if len(self._entries) > self.maxsize:
+					self._entries.popitem(last=False)
+					self.evictions += 1
+		return packet, parse_errs
+
+	def parse_packet(self, ps, lazy=False, correct=False, validate=False, compact=False):
+		""" Cached parse_packet(ps, lazy, correct, validate, compact=compact) """
+		if not isinstance(ps, _TEXT_TYPES):
+			return parse_packet(ps, lazy, correct, validate, compact=compact)
+		# surrogatepass: lone surrogates are only NOT_HEX to parse_packet, not an error here
+		raw = bytes(ps) if isinstance(ps, _BYTES_TYPES) else ps.encode('utf-8', 'surrogatepass')
+		return self._lookup((hashlib.sha1(raw).digest(), False, lazy, correct, validate, compact), parse_packet, ps, lazy, correct, validate, None, compact)
+
+	def parse_packet_bytes(self, buf, lazy=False, correct=False, validate=False, compact=False):
+		""" Cached parse_packet_bytes(buf, lazy, correct, validate, compact=compact) """
+		if type(buf) == memoryview:
+			buf = buf.tobytes()
+		elif not isinstance(buf, (bytes, bytearray)):
+			return parse_packet_bytes(buf, lazy, correct, validate, compact=compact)
+		return self._lookup((hashlib.sha1(buf).digest(), True, lazy, correct, validate, compact), parse_packet_bytes, buf, lazy, correct, validate, None, compact)
+
+	def stats(self):
+		with self._lock:
+			return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.hits = self.misses = self.evictions = 0
+
+SYNC_WORD = b"574c39585a45"
+PACKET_HEX_LEN = 510
+PREAMBLE_HEX_LEN = 22
+SCAN_CHUNK_SIZE = 1 << 20
+_TEXT_RUN = re.compile(b"[^\r\n]+")
+
+# approximate sync search: k bit errors in the callsign change at most k of the sync word's
+# hex digits, so splitting it into k+1 pieces leaves at least one intact to find exactly
+MAX_SYNC_ERRORS = len(SYNC_WORD) - 1
+_POPCOUNT = bytearray(bin(i).count('1') for i in range(256))
+_CALLSIGN_BYTES = bytearray(CALLSIGN)
+
+def _sync_pieces(max_errors):
+	n = len(SYNC_WORD)
+	bounds = [n*j // (max_errors + 1) for j in range(max_errors + 2)]
+	return [(SYNC_WORD[a:b], a) for a, b in zip(bounds, bounds[1:])]
+
+_SYNC_PIECES = [_sync_pieces(k) for k in range(MAX_SYNC_ERRORS + 1)]
+
+def sync_errors(word):
+	""" The number of bit errors in the callsign a 12 digit hex sync word encodes, or None if it isn't hex """
+	if len(word) != len(SYNC_WORD) or word.translate(None, _HEX_CHARS):
+		return None
+	return sum(_POPCOUNT[a ^ b] for a, b in zip(bytearray(unhexlify(word)), _CALLSIGN_BYTES))
+
+def find_sync(buf, start=0, max_errors=0):
+	"""
+	Returns the index of the first sync word in hex text buf at or after start with at
+	most max_errors bit errors, or -1. Only the positions where one of the sync word's
+	pieces is found exactly are checked.
+	"""
+	if not max_errors:
+		return buf.find(SYNC_WORD, start)
+	pieces = _SYNC_PIECES[max_errors]
+	last = len(buf) - len(SYNC_WORD)
+	# where the next match of each piece would put the sync word
+	found = []
+	for piece, at in pieces:
+		j = buf.find(piece, start + at)
+		found.append(j - at if j >= 0 else -1)
+	while True:
+		candidates = [i for i in found if 0 <= i <= last]
+		if not candidates:
+			return -1
+		i = min(candidates)
+		errors = sync_errors(buf[i:i + len(SYNC_WORD)])
+		if errors is not None and errors <= max_errors:
+			return i
+		for n, (piece, at) in enumerate(pieces):
+			if found[n] == i:
+				j = buf.find(piece, i + 1 + at)
+				found[n] = j - at if j >= 0 else -1
+
+def _is_preamble(ps):
+	# whether the hex preamble of a packet found by an inexact sync word is plausible
+	return is_hex_str(ps) and _validate_op_states(int(ps[20:22], 16)) is None
+
+class PacketScanner(object):
+	"""
+	Incremental sync word search over a hex dump fed to it in chunks, from byte offset
+	start of the file. Line breaks are ignored (packets may span lines and chunks). Between
+	feeds it only holds on to a partial packet (or the few bytes that could be the start of
+	a split sync word), and nothing else is searched twice. With an end, it stops (done)
+	at the first packet at or after byte end.
+
+	With max_sync_errors, packets whose sync word has up to that many bit errors are found
+	too (see find_sync), as long as their message type and satellite state are valid;
+	corrupted_syncs counts them. They're returned as they are, callsign and all.
+	"""
+	def __init__(self, start=0, end=None, max_sync_errors=0):
+		if not 0 <= max_sync_errors <= MAX_SYNC_ERRORS:
+			raise ValueError("max_sync_errors must be between 0 and %d" % MAX_SYNC_ERRORS)
+		self.buf = b""    # the dump with line breaks removed, from the first unconsumed byte
+		self.spans = []   # (index into buf, file offset) where each run of buf starts
+		self.file_pos = start
+		self.end = end
+		self.done = False
+		# whether buf starts with the sync word of a packet that isn't complete yet
+		self.synced = False
+		self.max_sync_errors = max_sync_errors
+		self.corrupted_syncs = 0
+
+	@property
+	def position(self):
+		""" The file offset of the first byte that isn't part of a packet found yet """
+		return _file_offset(self.spans, 0) if self.buf else self.file_pos
+
+	def feed(self, chunk):
+		""" Returns [(offset, packet)] for the packets completed by the next chunk of the file """
+		packets = []
+		if self.done:
+			return packets
+		spans = self.spans
+		runs = []
+		buf_len = len(self.buf)
+		for m in _TEXT_RUN.finditer(chunk):
+			spans.append((buf_len, self.file_pos + m.start()))
+			runs.append(m.group())
+			buf_len += m.end() - m.start()
+		buf = self.buf + b"".join(runs)
+		self.file_pos += len(chunk)
+
+		max_errors = self.max_sync_errors
+		search = 0
+		i = 0 if self.synced else find_sync(buf, 0, max_errors)
+		while True:
+			if i < 0:
+				# a sync word may still straddle the end of the chunk
+				keep = max(search, len(buf) - len(SYNC_WORD) + 1)
+				self.synced = False
+				break
+			offset = _file_offset(spans, i)
+			if self.end is not None and offset >= self.end:
+				self.done = True
+			if self.done or len(buf) - i < PACKET_HEX_LEN:
+				keep = i
+				self.synced = True
+				break
+			if max_errors and buf[i:i+len(SYNC_WORD)] != SYNC_WORD:
+				if not _is_preamble(buf[i:i+PREAMBLE_HEX_LEN]):
+					search = i + 1
+					i = find_sync(buf, search, max_errors)
+					continue
+				self.corrupted_syncs += 1
+			packets.append((offset, buf[i:i+PACKET_HEX_LEN].decode("ascii", errors="replace")))
+			search = i + PACKET_HEX_LEN
+			i = find_sync(buf, search, max_errors)
+
+		self.buf, self.spans = _drop_prefix(buf, spans, keep)
+		if self.end is not None and self.position >= self.end:
+			self.done = True
 		return packets
 
+	def state(self):
+		""" The scanner's state as JSON-serializable dict, for from_state() """
+		return {
+			'file_pos': self.file_pos,
+			'carry': self.buf.decode('latin-1'),
+			'spans': self.spans,
+			'synced': self.synced,
+			'max_sync_errors': self.max_sync_errors,
+		}
+
+	@classmethod
+	def from_state(cls, state):
+		scanner = cls(max_sync_errors=state.get('max_sync_errors', 0))
+		scanner.file_pos = state['file_pos']
+		scanner.buf = state['carry'].encode('latin-1')
+		scanner.spans = [tuple(span) for span in state['spans']]
+		scanner.synced = state['synced']
+		return scanner
+
+def iter_packets(file, chunk_size=SCAN_CHUNK_SIZE, start=0, end=None, max_sync_errors=0):
+	"""
+	Yields (offset, packet) for each packet in a hex dump as soon as it has been read;
+	offset is the byte offset of the packet's sync word in the file. Line breaks are
+	ignored (packets may span lines) and only one chunk is held in memory at a time.
+	Scanning starts at byte start, and stops at the first packet at or after byte end
+	(the last packet before end is still read to completion). With max_sync_errors,
+	packets with up to that many bit errors in their callsign are found too.
+	"""
+	scanner = PacketScanner(start, end, max_sync_errors)
+	with open(file, 'rb') as f:
+		f.seek(start)
+		while not scanner.done:
+			chunk = f.read(chunk_size)
+			if not chunk:
+				return
+			for packet in scanner.feed(chunk):
+				yield packet
+
+def _file_offset(spans, i):
+	j = bisect_right(spans, (i, float('inf'))) - 1
+	return spans[j][1] + i - spans[j][0]
+
+def _drop_prefix(buf, spans, n):
+	# discards buf[:n], rebasing spans onto what is left
+	j = max(bisect_right(spans, (n, float('inf'))) - 1, 0)
+	spans = [(max(idx - n, 0), off + max(n - idx, 0)) for idx, off in spans[j:]]
+	return buf[n:], spans
+
+def find_packets(file, max_sync_errors=0):
+	return [packet for offset, packet in iter_packets(file, max_sync_errors=max_sync_errors)]
+
+# following dump files as they're written
+DEFAULT_POLL_INTERVAL = 0.005
+DEFAULT_CHECKPOINT_INTERVAL = 1.0
+
+_replace = getattr(os, 'replace', os.rename)
+
+class DumpFollower(object):
+	"""
+	Follows a hex dump that is being appended to (like tail -F): each poll() reads only
+	the bytes added since the last one and returns the packets they complete. With a
+	checkpoint path, the file's identity, read offset and any partial packet are saved
+	there (by save_checkpoint(), or checkpoint() at most every checkpoint_interval seconds)
+	and picked up again by the next DumpFollower of that path, so that a restart neither
+	rescans nor skips anything. Save after the packets have been handled, and a crash only
+	means some are returned again.
+
+	If the file is replaced (rotated: a new file at the path), the rest of the old one is
+	read first and the new one is followed from its start; if it shrinks (truncated in
+	place), it's followed from its start again. rotations and truncations count both.
+	max_sync_errors is passed on to the PacketScanner.
+	"""
+	def __init__(self, path, checkpoint=None, chunk_size=SCAN_CHUNK_SIZE, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, max_sync_errors=0):
+		self.path = path
+		self.checkpoint_path = checkpoint
+		self.chunk_size = chunk_size
+		self.checkpoint_interval = checkpoint_interval
+		self.max_sync_errors = max_sync_errors
+		self.file = None
+		self.identity = None
+		self.scanner = self._new_scanner()
+		self.rotations = 0
+		self.truncations = 0
+		self._saved = _clock()
+		if checkpoint is not None and os.path.exists(checkpoint):
+			with open(checkpoint) as f:
+				state = json.load(f)
+			if state['path'] == path:
+				self.identity = tuple(state['identity'])
+				self.scanner = PacketScanner.from_state(state)
+				self.scanner.max_sync_errors = max_sync_errors
+
+	def _new_scanner(self):
+		return PacketScanner(max_sync_errors=self.max_sync_errors)
+
+	def _open(self):
+		# opens the file at path (if there is one), resuming where its scanner left off
+		try:
+			f = open(self.path, 'rb')
+		except (IOError, OSError):
+			return False
+		st = os.fstat(f.fileno())
+		identity = (st.st_dev, st.st_ino)
+		if self.identity is not None and identity != self.identity:
+			# rotated while nothing was following it
+			self.rotations += 1
+			self.scanner = self._new_scanner()
+		elif st.st_size < self.scanner.file_pos:
+			self.truncations += 1
+			self.scanner = self._new_scanner()
+		self.identity = identity
+		self.file = f
+		f.seek(self.scanner.file_pos)
+		return True
+
+	def _read(self):
+		packets = []
+		while True:
+			chunk = self.file.read(self.chunk_size)
+			if not chunk:
+				return packets
+			packets += self.scanner.feed(chunk)
+
+	def poll(self):
+		""" Returns [(offset, packet)] for the packets completed since the last poll """
+		if self.file is None and not self._open():
+			return []
+		if os.fstat(self.file.fileno()).st_size < self.scanner.file_pos:
+			self.truncations += 1
+			self.scanner = self._new_scanner()
+			self.file.seek(0)
+		packets = self._read()
+		try:
+			st = os.stat(self.path)
+		except (IOError, OSError):
+			# moved away and not replaced yet; keep reading the old file until it is
+			return packets
+		if (st.st_dev, st.st_ino) != self.identity:
+			# anything written to the old file before it was rotated has now been read
+			self.rotations += 1
+			self.file.close()
+			self.file = None
+			self.identity = None
+			self.scanner = self._new_scanner()
+			if self._open():
+				packets += self._read()
+		return packets
+
+	def follow(self, poll_interval=DEFAULT_POLL_INTERVAL):
+		""" Yields (offset, packet) as packets are appended, forever, checkpointing as it goes """
+		while True:
+			packets = self.poll()
+			for packet in packets:
+				yield packet
+			self.checkpoint()
+			if not packets:
+				time.sleep(poll_interval)
+
+	def save_checkpoint(self):
+		if self.checkpoint_path is None or self.identity is None:
+			return
+		state = self.scanner.state()
+		state['path'] = self.path
+		state['identity'] = self.identity
+		tmp = self.checkpoint_path + '.tmp'
+		with open(tmp, 'w') as f:
+			json.dump(state, f)
+		_replace(tmp, self.checkpoint_path)
+		self._saved = _clock()
+
+	def checkpoint(self):
+		""" Saves the checkpoint if checkpoint_interval has passed since the last save """
+		if _clock() - self._saved >= self.checkpoint_interval:
+			self.save_checkpoint()
+
+	def close(self):
+		self.save_checkpoint()
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+DEFAULT_SPLIT_SIZE = 64 << 20
+
+def _serialize():
+	# serialize imports this module, so it's imported when first needed
+	if not __package__ or sys.version_info[0] < 3:
+		import serialize
+	else:
+		from . import serialize
+	return serialize
+
+# splitting files into ranges
+# a range's scan can't tell whether its start is in the middle of a packet the previous
+# range took, so where it starts taking packets is decided by following the scans from
+# every place such a packet could have ended until they agree on a packet; the previous
+# range scans on to that same packet, so together the ranges find what one scan would
+RESYNC_CHUNK_SIZE = 1 << 12
+_NO_PACKET = float('inf')
+
+def _syncs_before(path, start, max_sync_errors=0):
+	# file offsets of the sync words starting in the PACKET_HEX_LEN characters before start
+	with open(path, 'rb') as f:
+		window = start
+		count = 0
+		while window > 0 and count < PACKET_HEX_LEN:
+			n = min(window, RESYNC_CHUNK_SIZE)
+			window -= n
+			f.seek(window)
+			chunk = f.read(n)
+			count += len(chunk) - chunk.count(b"\n") - chunk.count(b"\r")
+		# and a little after, for a sync word straddling start
+		f.seek(window)
+		text = f.read(start - window + RESYNC_CHUNK_SIZE)
+	spans = []
+	runs = []
+	buf_len = 0
+	for m in _TEXT_RUN.finditer(text):
+		spans.append((buf_len, window + m.start()))
+		runs.append(m.group())
+		buf_len += m.end() - m.start()
+	buf = b"".join(runs)
+	offsets = []
+	i = find_sync(buf, 0, max_sync_errors)
+	while i >= 0:
+		offset = _file_offset(spans, i)
+		if offset >= start:
+			break
+		offsets.append(offset)
+		i = find_sync(buf, i + 1, max_sync_errors)
+	return offsets
+
+def _next_offset(packets, start):
+	for offset, ps in packets:
+		if offset >= start:
+			return offset
+	return _NO_PACKET
+
+def resync_point(path, start, end=None, max_sync_errors=0):
+	"""
+	The offset of the first packet at or after byte start of a dump that a scan starting
+	at start is sure to share with a scan of the whole file, whatever packet that scan
+	was in the middle of at start; the file's size if both find no more packets, or None
+	if it isn't settled before byte end.
+	"""
+	if start == 0:
+		return 0
+	scans = [iter_packets(path, RESYNC_CHUNK_SIZE, q, max_sync_errors=max_sync_errors) for q in [start] + _syncs_before(path, start, max_sync_errors)]
+	offsets = [_next_offset(scan, start) for scan in scans]
+	while True:
+		lo, hi = min(offsets), max(offsets)
+		if lo == hi:
+			return lo if lo != _NO_PACKET else os.path.getsize(path)
+		if end is not None and hi >= end:
+			return None
+		offsets = [_next_offset(scan, start) if offset < hi else offset for scan, offset in zip(scans, offsets)]
+
+def iter_file_range(path, start, split_size, max_sync_errors=0):
+	"""
+	Yields (offset, packet) like iter_packets for one of the split_size byte ranges a
+	dump is split into (start is a multiple of split_size), so that the ranges, scanned
+	on their own, together yield each packet a scan of the whole file would, once.
+	"""
+	size = os.path.getsize(path)
+	first = resync_point(path, start, min(start + split_size, size), max_sync_errors)
+	if first is None:
+		return
+	# the packets up to the next range's resync point (or the one after, if it has none)
+	stop = None
+	boundary = start + split_size
+	while stop is None and boundary < size:
+		stop = resync_point(path, boundary, min(boundary + split_size, size), max_sync_errors)
+		boundary += split_size
+	for offset, ps in iter_packets(path, start=start, end=stop, max_sync_errors=max_sync_errors):
+		if offset >= first:
+			yield offset, ps
+
+def _parse_file_range(task):
+	# runs in the worker processes; results go back as already serialized lines
+	path, start, split_size, correct, max_sync_errors = task
+	dumps_record = _serialize().dumps_record
+	lines = []
+	num_errs = 0
+	for offset, ps in iter_file_range(path, start, split_size, max_sync_errors):
+		packet, errs = parse_packet(ps, correct=correct)
+		if errs:
+			num_errs += 1
+		lines.append(dumps_record(OrderedDict([("file", path), ("offset", offset), ("packet", packet), ("parse_errors", errs)])))
+	return lines, num_errs
+
+def _file_ranges(path, split_size):
+	# large files are split into byte ranges that are scanned independently (iter_file_range)
+	return [(path, start, split_size) for start in range(0, os.path.getsize(path), split_size) or [0]]
+
+def parse_files(paths, jobs=1, split_size=DEFAULT_SPLIT_SIZE, out=None, correct=False, max_sync_errors=0):
+	"""
+	Writes every packet found in the dump files to out (default stdout) as JSON Lines, in
+	file order, spreading the files (and ranges of large files) over jobs processes.
+	correct is passed on to parse_packet and max_sync_errors to iter_packets. Returns
+	{path: [packets, packets with parse errors]}.
+	"""
+	out = out or sys.stdout
+	tasks = [r + (correct, max_sync_errors) for path in paths for r in _file_ranges(path, split_size)]
+	counts = OrderedDict((path, [0, 0]) for path in paths)
+	pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+	try:
+		# imap keeps the results in task order
+		results = pool.imap(_parse_file_range, tasks) if pool else map(_parse_file_range, tasks)
+		for task, (lines, num_errs) in zip(tasks, results):
+			for line in lines:
+				out.write(line + "\n")
+			counts[task[0]][0] += len(lines)
+			counts[task[0]][1] += num_errs
+	finally:
+		if pool:
+			pool.close()
+			pool.join()
+	return counts
+
+def follow_files(paths, checkpoint_dir=None, out=None, correct=False, poll_interval=DEFAULT_POLL_INTERVAL, max_sync_errors=0):
+	"""
+	Writes the packets appended to the dump files to out (default stdout) as JSON Lines
+	(like parse_files) as they arrive, until interrupted. With a checkpoint_dir, where each
+	file was read up to is saved there once its packets have been written, and resumed from.
+	"""
+	out = out or sys.stdout
+	dumps_record = _serialize().dumps_record
+	followers = []
+	for path in paths:
+		checkpoint = None
+		if checkpoint_dir is not None:
+			checkpoint = os.path.join(checkpoint_dir, os.path.basename(path) + '.checkpoint')
+		followers.append(DumpFollower(path, checkpoint, max_sync_errors=max_sync_errors))
+	try:
+		while True:
+			idle = True
+			for follower in followers:
+				packets = follower.poll()
+				for offset, ps in packets:
+					packet, errs = parse_packet(ps, correct=correct)
+					out.write(dumps_record(OrderedDict([("file", follower.path), ("offset", offset), ("packet", packet), ("parse_errors", errs)])) + "\n")
+				if packets:
+					idle = False
+					out.flush()
+				follower.checkpoint()
+			if idle:
+				time.sleep(poll_interval)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		for follower in followers:
+			follower.close()
+
+# sample packets, one or more of each message type
+SAMPLE_PACKETS = OrderedDict([
+	("attitude", "574c39585a457d6e000021a5092702dfde585104042754e0f1aeb1b1b2e339ba39bf39af39a839173a5609823f80823f817f7f80777879777879e46a0000dd39bd39cb39af39b7390b3a5609823f81823f807f7f8077787977787970660000d439bb39c639a139ac39033a5609823f80823f807f7f80777879777879fc610000cf39b439bf399b39a639ff395609823f81823f807f7f80777879777879885d0000d539ac39ac399b39a939fb395609823f80823f807f7f8077787977787914590000a732529b2a569c2a5608150008155a9c295a9b305e9b305ea23e5e0000b8bf966e88d0864f8bc4b68a23f6a54b585f5f843d9dded0c2e252bdbe1ebd85"),
+	("idle", "574c39585a455136000020a10b1302dee4515d04042854f0b2afb3aeb13edfe3515f04042854f0b28f5a5757585657588d3400003ee2df5d5104042854f0e18f5a575758565758453100003edfe3515c04042854f0b28f5a575758565758fd2d00003ee1e4515f04042854f0b28f5a575758565758b52a00003ee3e05e5104042855f0e18f5a5757585657586d2700003edfe3515c04042854f0b28f5a575758565758252400003edfe337600404274ef0b28f5a575758565758dd20000008152a9c292a9b302e9b302ea23e2ec63e2ec63e2ea23e2e9b29019b291a9b2a0230f07b4a31312c9cf5121ed6feccc6d0181e9ebe63eba5e6b3d895eeb9f5c2f1"),
+	("fb1", "574c39585a454100000022970e3b02e2e05c5104042855f0e1b1b4b1b404040404040404040404040404040404040404040304040404040404040404040404040404040404040403060303d039c846d139c945d139c945d139c9450306030303060303b1b4b1b4a2a2a2a2a2a1a0a2a1a29ea1a2a29ea1afb3b3b2b1b3b0b30202020044634e3f47564e3f5b58493f42534e3c02020200020202007f7f807f7f807f7f807f7f807f7f807f7f807f7f80400000009b30009b3000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e00c63e00a23e009b30009b300000c51d74120214a6769f810b5aa75f29027a5b147de21add293392058b7ef1cc0d"),
+	("fb2", "574c39585a454100000022970e3b02e2e05c5104042855f0e1b1b4b1b404040404040404040404040404040404040404040404040404040404040404040404040404040404040403060303d039c846d139c945d139c945d039c9450306030303060303b1b3b1b4a2a2a3a0a2a1a1a1a1a0a1a19fa19ea1b0b3afb2b2b3aeb4000000005365493f445b473f42564937425d493f00000000000000007f7f807f7f807f7f807f7f807f7f807f7f807f7f8043000000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e000086738d6760a85099c7a5b6e5b992a95cc963c77022f07115f2c0e14e89cc0d1a"),
+	("fc1", "574c39585a45d903000023960e2702e1e05a5104042855f0e1b1b3afb339483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c7030000a23e039b30039b3003a23e03c63e03c63e03a23e039b30039b3003a23e03c63e03c63e03a23e039b30030000152fafcdb4ee495ef2969c2216be05da81ca5049c402dbbcd21726b2101c06a4"),
+	("fc2", "574c39585a458971000023960e2702e1dd605104042854f0e1adb1b0b23d483b300404a92ca238a3a3a2a43d483b30777879877000003a483b300404a82da336a3a3a1a43a483b30777879c76c00003844392d0404a92ca334a3a3a2a33844392d777879076900003947392d0404aa2ba335a2a3a1a43947392d777879476500003341362a0404aa2ba632a2a3a0a33341362a777879876100003541372b0404aa2ba532a3a3a0a33541372b777879c75d0000a23e60c63e60c63e60a23e609b291c9b294c9b2aff9c2a0c9c291ca732549b2a589c2a5808150108155c00002f20f771dba3610d533bf1305a4f516b748f0bcbb7a94be21c791449407d0df8"),
+	("lp1", "574c39585a45660000002c960e13018f38585904040057faffe7e7e7e71e9037585904040057f2f69a399a3987399b39a6398a397f7f80650000001ea327585904040058f2f69d399d398d39a039a8398c397f7f80510000001eb617585904040058f2f69839983989399a39a8398c397f7f803f0000001eb617585904040058f2f69e399e398c399739ab3989397f7f803e0000001eb716585904040058f2f6983998398c399839a8398c397f7f803d000000b44b00b34b00c64000a24000a240000815000815009b1aff9b2bff9b2aff9b1a000e02009b2b009b2a0000000000000000000000000000000000000000000000000000000000000000000000"),
+	("lp2", "574c39585a45f60b00002c960eff01b7c5585904040057e8ffe7e747471eb8c5585904040057e8f6a839a839a439ac39b739a4397f7f80f50b00001ec1c5585804040058e8f6a839a839a339a939ba39a4397f7f80e10b00001eb8c5585904040057e8f6a839a839a439ac39b739a4397f7f80f50b00001ec1c5585804040058e8f6a839a839a339a939ba39a4397f7f80e10b00001ecbc5585804040057e8f6a439a439a339a839ba39a0397f7f80cd0b00009b30079b31079c3107254607a73307a72907364e08b44c08ab34083b4b080815089b1aff9b2bff9b2aff00000000000000000000000000000000000000000000000000000000000000000000"),
+	("test", "574c39585a45671600002c9618ff04e1e25d5803032856f0e2c6b2a0b20ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600009c30009b2a009b2f009c2e009b2a009c30009b2f009c2e00573b00323d00323d06573b07b54a090e050000003f73fed7e2e664ec3eea86bc64849d141afd525558ca00a32d87879a23043592"),
+])
+
 def gen_random_buf():
 	return binascii.hexlify(bytearray([random.randint(0, 255) for i in range(255)]))
 
 def main():
-	attitude = "574c39585a457d6e000021a5092702dfde585104042754e0f1aeb1b1b2e339ba39bf39af39a839173a5609823f80823f817f7f80777879777879e46a0000dd39bd39cb39af39b7390b3a5609823f81823f807f7f8077787977787970660000d439bb39c639a139ac39033a5609823f80823f807f7f80777879777879fc610000cf39b439bf399b39a639ff395609823f81823f807f7f80777879777879885d0000d539ac39ac399b39a939fb395609823f80823f807f7f8077787977787914590000a732529b2a569c2a5608150008155a9c295a9b305e9b305ea23e5e0000b8bf966e88d0864f8bc4b68a23f6a54b585f5f843d9dded0c2e252bdbe1ebd85"
-	idle = "574c39585a455136000020a10b1302dee4515d04042854f0b2afb3aeb13edfe3515f04042854f0b28f5a5757585657588d3400003ee2df5d5104042854f0e18f5a575758565758453100003edfe3515c04042854f0b28f5a575758565758fd2d00003ee1e4515f04042854f0b28f5a575758565758b52a00003ee3e05e5104042855f0e18f5a5757585657586d2700003edfe3515c04042854f0b28f5a575758565758252400003edfe337600404274ef0b28f5a575758565758dd20000008152a9c292a9b302e9b302ea23e2ec63e2ec63e2ea23e2e9b29019b291a9b2a0230f07b4a31312c9cf5121ed6feccc6d0181e9ebe63eba5e6b3d895eeb9f5c2f1"
-	fb1 = "574c39585a454100000022970e3b02e2e05c5104042855f0e1b1b4b1b404040404040404040404040404040404040404040304040404040404040404040404040404040404040403060303d039c846d139c945d139c945d139c9450306030303060303b1b4b1b4a2a2a2a2a2a1a0a2a1a29ea1a2a29ea1afb3b3b2b1b3b0b30202020044634e3f47564e3f5b58493f42534e3c02020200020202007f7f807f7f807f7f807f7f807f7f807f7f807f7f80400000009b30009b3000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e00c63e00a23e009b30009b300000c51d74120214a6769f810b5aa75f29027a5b147de21add293392058b7ef1cc0d"
-	fb2 = "574c39585a454100000022970e3b02e2e05c5104042855f0e1b1b4b1b404040404040404040404040404040404040404040404040404040404040404040404040404040404040403060303d039c846d139c945d139c945d039c9450306030303060303b1b3b1b4a2a2a3a0a2a1a1a1a1a0a1a19fa19ea1b0b3afb2b2b3aeb4000000005365493f445b473f42564937425d493f00000000000000007f7f807f7f807f7f807f7f807f7f807f7f807f7f8043000000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e00c63e00a23e009b30009b3000a23e00c63e000086738d6760a85099c7a5b6e5b992a95cc963c77022f07115f2c0e14e89cc0d1a"
-	fc1 = "574c39585a45d903000023960e2702e1e05a5104042855f0e1b1b3afb339483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c703000039483b300404a72ea138a3a4a3a439483b30777879c7030000a23e039b30039b3003a23e03c63e03c63e03a23e039b30039b3003a23e03c63e03c63e03a23e039b30030000152fafcdb4ee495ef2969c2216be05da81ca5049c402dbbcd21726b2101c06a4"
-	fc2 = "574c39585a458971000023960e2702e1dd605104042854f0e1adb1b0b23d483b300404a92ca238a3a3a2a43d483b30777879877000003a483b300404a82da336a3a3a1a43a483b30777879c76c00003844392d0404a92ca334a3a3a2a33844392d777879076900003947392d0404aa2ba335a2a3a1a43947392d777879476500003341362a0404aa2ba632a2a3a0a33341362a777879876100003541372b0404aa2ba532a3a3a0a33541372b777879c75d0000a23e60c63e60c63e60a23e609b291c9b294c9b2aff9c2a0c9c291ca732549b2a589c2a5808150108155c00002f20f771dba3610d533bf1305a4f516b748f0bcbb7a94be21c791449407d0df8"
-	lp1 = "574c39585a45660000002c960e13018f38585904040057faffe7e7e7e71e9037585904040057f2f69a399a3987399b39a6398a397f7f80650000001ea327585904040058f2f69d399d398d39a039a8398c397f7f80510000001eb617585904040058f2f69839983989399a39a8398c397f7f803f0000001eb617585904040058f2f69e399e398c399739ab3989397f7f803e0000001eb716585904040058f2f6983998398c399839a8398c397f7f803d000000b44b00b34b00c64000a24000a240000815000815009b1aff9b2bff9b2aff9b1a000e02009b2b009b2a0000000000000000000000000000000000000000000000000000000000000000000000"
-	lp2 = "574c39585a45f60b00002c960eff01b7c5585904040057e8ffe7e747471eb8c5585904040057e8f6a839a839a439ac39b739a4397f7f80f50b00001ec1c5585804040058e8f6a839a839a339a939ba39a4397f7f80e10b00001eb8c5585904040057e8f6a839a839a439ac39b739a4397f7f80f50b00001ec1c5585804040058e8f6a839a839a339a939ba39a4397f7f80e10b00001ecbc5585804040057e8f6a439a439a339a839ba39a0397f7f80cd0b00009b30079b31079c3107254607a73307a72907364e08b44c08ab34083b4b080815089b1aff9b2bff9b2aff00000000000000000000000000000000000000000000000000000000000000000000"
-	test = "574c39585a45671600002c9618ff04e1e25d5803032856f0e2c6b2a0b20ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600000ee3e35d5804042856f0e200000000c339b8390000b5397f7f80661600009c30009b2a009b2f009c2e009b2a009c30009b2f009c2e00573b00323d00323d06573b07b54a090e050000003f73fed7e2e664ec3eea86bc64849d141afd525558ca00a32d87879a23043592"
-	packets = [attitude, idle, fb1, fb2, fc1, fc2, lp1, lp2, test]
-
-	if (len(sys.argv) < 2):
-		for pkt in packets:
-			print(json.dumps(parse_packet(pkt)[0]))
+	parser = argparse.ArgumentParser(description="Parses EQUiSat packets; prints the sample packets if no files are given")
+	parser.add_argument("files", nargs="*", help="hex dump files to parse as JSON Lines")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes")
+	parser.add_argument("--split-size", type=int, default=DEFAULT_SPLIT_SIZE, help="bytes of a file given to each worker")
+	parser.add_argument("--correct", action="store_true", help="apply Reed-Solomon correction before parsing")
+	parser.add_argument("--sync-errors", type=int, default=0, help="also find packets with up to this many bit errors in their callsign (at most %d)" % MAX_SYNC_ERRORS)
+	parser.add_argument("-f", "--follow", action="store_true", help="keep parsing packets as they're appended to the files (until interrupted)")
+	parser.add_argument("--checkpoint-dir", help="directory to save (and resume from) each followed file's position in, as <file name>.checkpoint")
+	args = parser.parse_args()
+	if not 0 <= args.sync_errors <= MAX_SYNC_ERRORS:
+		parser.error("--sync-errors must be between 0 and %d" % MAX_SYNC_ERRORS)
+
+	if not args.files:
+		dumps_packet = _serialize().dumps_packet
+		for pkt in SAMPLE_PACKETS.values():
+			print(dumps_packet(parse_packet(pkt, correct=args.correct)[0]))
 		# for i in range(10000):
 		# 	print(parse_packet(gen_random_buf()))
+	elif args.follow:
+		follow_files(args.files, args.checkpoint_dir, correct=args.correct, max_sync_errors=args.sync_errors)
 	else:
-		for x in sys.argv[1:]:
-			packets = find_packets(x)
-			for packet in packets:
-				print(parse_packet(packet))
+		counts = parse_files(args.files, args.jobs, args.split_size, correct=args.correct, max_sync_errors=args.sync_errors)
+		for path, (num_packets, num_errs) in counts.items():
+			sys.stderr.write("%s: %d packets, %d with parse errors\n" % (path, num_packets, num_errs))
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,210 @@
+#!/usr/bin/python
+# Reed-Solomon error correction for full (255 byte, with parity) packets
+#
+# The satellite protects everything after the callsign with 32 parity bytes: an RS(255,223)
+# code over GF(2^8) (primitive polynomial 0x11d, generator roots alpha^1..alpha^32) shortened
+# to the 249 bytes from the end of the callsign to the end of the packet.
+
+from binascii import hexlify, unhexlify
+
+PRIM = 0x11d
+NPAR = 32
+FCR = 1
+RS_DATA_START = 6  # the callsign isn't covered by the parity
+RS_PACKET_SIZE = 255
+RS_CODEWORD_SIZE = RS_PACKET_SIZE - RS_DATA_START
+
+GF_EXP = [0] * 512
+GF_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+	GF_EXP[_i] = _x
+	GF_LOG[_x] = _i
+	_x <<= 1
+	if _x & 0x100:
+		_x ^= PRIM
+for _i in range(255, 512):
+	GF_EXP[_i] = GF_EXP[_i - 255]
+
+def gf_mul(a, b):
+	if a == 0 or b == 0:
+		return 0
+	return GF_EXP[GF_LOG[a] + GF_LOG[b]]
+
+def gf_div(a, b):
+	if a == 0:
+		return 0
+	return GF_EXP[(GF_LOG[a] - GF_LOG[b]) % 255]
+
+def _generator_poly():
+	# highest degree first
+	g = [1]
+	for j in range(FCR, FCR + NPAR):
+		root = GF_EXP[j]
+		g = [c ^ gf_mul(prev, root) for c, prev in zip(g + [0], [0] + g)]
+	return g
+
+GENERATOR = _generator_poly()
+# the parity register is kept as one 256-bit int (highest degree in the top byte); this is
+# what a feedback byte f XORs into it after the shift: f times the generator's coefficients
+_FEEDBACK = [int(hexlify(bytearray(gf_mul(f, c) for c in GENERATOR[1:])), 16) for f in range(256)]
+_REGISTER_MASK = (1 << (8*NPAR)) - 1
+
+def _remainder(codeword):
+	# the received parity XOR the parity the data should have (so 0 for a codeword), as an int
+	state = 0
+	for b in bytearray(codeword[:-NPAR]):
+		state = ((state << 8) & _REGISTER_MASK) ^ _FEEDBACK[b ^ (state >> (8*NPAR - 8))]
+	return state ^ int(hexlify(codeword[-NPAR:]), 16)
+
+def _syndromes(remainder):
+	# the remainder agrees with the received codeword at the generator's roots
+	coeffs = bytearray(unhexlify('%0*x' % (2*NPAR, remainder)))
+	synd = []
+	for j in range(FCR, FCR + NPAR):
+		s = 0
+		for c in coeffs:
+			s = gf_mul(s, GF_EXP[j]) ^ c
+		synd.append(s)
+	return synd
+
+def _error_locator(synd):
+	# Berlekamp-Massey; polynomials are lowest degree first
+	loc = [1]
+	prev = [1]
+	L = 0
+	shift = 1
+	last_delta = 1
+	for n in range(NPAR):
+		delta = synd[n]
+		for i in range(1, L + 1):
+			delta ^= gf_mul(loc[i], synd[n - i])
+		if delta == 0:
+			shift += 1
+			continue
+		scale = gf_div(delta, last_delta)
+		update = [0] * shift + [gf_mul(scale, c) for c in prev]
+		new_loc = [a ^ b for a, b in zip(loc + [0] * (len(update) - len(loc)), update + [0] * (len(loc) - len(update)))]
+		if 2*L <= n:
+			prev = loc
+			L = n + 1 - L
+			last_delta = delta
+			shift = 1
+		else:
+			shift += 1
+		loc = new_loc
+	return loc[:L + 1], L
+
+def _poly_eval(poly, x):
+	# lowest degree first
+	y = 0
+	for c in reversed(poly):
+		y = gf_mul(y, x) ^ c
+	return y
+
+def rs_correct(packet):
+	"""
+	Corrects a raw 255 byte packet. Returns (corrected copy of the packet, number of
+	corrected bytes), with -1 as the count (and the packet unchanged) if it has more
+	errors than the code can correct.
+	"""
+	packet = bytearray(packet)
+	codeword = packet[RS_DATA_START:]
+	remainder = _remainder(codeword)
+	if remainder == 0:
+		return packet, 0
+
+	synd = _syndromes(remainder)
+	loc, num_errors = _error_locator(synd)
+	if num_errors == 0 or 2*num_errors > NPAR:
+		return packet, -1
+
+	# Chien search over the degrees of the (shortened) codeword's positions, in the log domain
+	loc_logs = [(i, GF_LOG[c]) for i, c in enumerate(loc) if c]
+	positions = []
+	for degree in range(RS_CODEWORD_SIZE):
+		y = 0
+		for i, log_c in loc_logs:
+			y ^= GF_EXP[(log_c - i*degree) % 255]
+		if y == 0:
+			positions.append(degree)
+	if len(positions) != num_errors:
+		return packet, -1
+
+	# Forney: omega = S(x) * loc(x) mod x^NPAR
+	omega = [0] * NPAR
+	for i, s in enumerate(synd):
+		for j, l in enumerate(loc):
+			if i + j < NPAR:
+				omega[i + j] ^= gf_mul(s, l)
+	loc_deriv = [loc[i] if i % 2 else 0 for i in range(1, len(loc))]
+	for degree in positions:
+		x_inv = GF_EXP[(255 - degree) % 255]
+		magnitude = gf_div(_poly_eval(omega, x_inv), _poly_eval(loc_deriv, x_inv))
+		# X^(1 - FCR) is 1 for FCR = 1
+		codeword[RS_CODEWORD_SIZE - 1 - degree] ^= magnitude
+
+	# don't trust a correction that didn't produce a codeword
+	if _remainder(codeword) != 0:
+		return packet, -1
+	packet[RS_DATA_START:] = codeword
+	return packet, num_errors
+
+def rs_encode(packet):
+	""" Returns a copy of a 255 (or 223) byte packet with its last 32 bytes set to the parity of the rest """
+	packet = bytearray(packet[:RS_PACKET_SIZE - NPAR]) + bytearray(NPAR)
+	parity = _remainder(packet[RS_DATA_START:])
+	packet[-NPAR:] = unhexlify('%0*x' % (2*NPAR, parity))
+	return packet
+
+# batch parity check
+# the remainder is linear in the codeword: the XOR of what each byte alone would leave, so
+# with a table of those for every position and byte value (as 64-bit words) the remainders
+# of a whole batch are one gather and one XOR reduction; needs numpy, imported on first use
+BATCH_CHUNK_SIZE = 1024
+_remainder_table = None
+
+def _batch_remainder_table():
+	global _remainder_table
+	if _remainder_table is None:
+		import numpy as np
+		table = np.zeros((RS_CODEWORD_SIZE, 256, NPAR // 8), dtype=np.uint64)
+		values = np.arange(256)
+		for pos in range(RS_CODEWORD_SIZE):
+			for bit in range(8):
+				codeword = bytearray(RS_CODEWORD_SIZE)
+				codeword[pos] = 1 << bit
+				words = np.frombuffer(unhexlify('%0*x' % (2*NPAR, _remainder(codeword))), dtype='>u8')
+				table[pos, values & (1 << bit) != 0] ^= words
+		_remainder_table = table
+	return _remainder_table
+
+def rs_dirty_packets(packets):
+	"""
+	Indices of the packets (raw 255 byte packets, or an (N, 255) uint8 array) whose parity
+	doesn't check out, found for the whole batch at once with numpy
+	"""
+	import numpy as np
+	table = _batch_remainder_table()
+	if isinstance(packets, np.ndarray):
+		arr = packets.reshape(-1, RS_PACKET_SIZE).astype(np.uint8, copy=False)
+	else:
+		arr = np.frombuffer(b''.join(bytes(p) for p in packets), dtype=np.uint8).reshape(-1, RS_PACKET_SIZE)
+	positions = np.arange(RS_CODEWORD_SIZE)
+	dirty = []
+	for start in range(0, len(arr), BATCH_CHUNK_SIZE):
+		codewords = arr[start:start + BATCH_CHUNK_SIZE, RS_DATA_START:]
+		remainders = np.bitwise_xor.reduce(table[positions, codewords], axis=1)
+		dirty.extend((start + np.flatnonzero(remainders.any(axis=1))).tolist())
+	return dirty
+
+def rs_correct_batch(packets):
+	"""
+	rs_correct over many raw 255 byte packets (or an (N, 255) uint8 array): the parity of
+	the whole batch is checked at once (rs_dirty_packets), and only the packets with errors
+	go through rs_correct. Needs numpy.
+	"""
+	results = [(bytearray(p), 0) for p in packets]
+	for i in rs_dirty_packets(packets):
+		results[i] = rs_correct(results[i][0])
+	return results
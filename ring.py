@@ -0,0 +1,501 @@
+#!/usr/bin/python
+# shared memory pipeline: decoder processes write each parsed packet into a ring buffer in
+# shared memory as a fixed-layout binary record (one layout per message type, generated
+# from layout.json like the decoders), and the consumer reads each record's values out of
+# the shared memory with one unpack_from, so nothing is pickled between decoding and
+# storage; the values are only made into dicts for the sections that are asked for
+#
+#   python ring.py -j 4 dump1.txt dump2.txt > packets.jsonl
+#
+# Requires python 3.8+.
+
+import argparse
+import multiprocessing
+import sys
+import time
+from binascii import hexlify, unhexlify
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from struct import Struct
+
+if not __package__:
+	import packetparse as pp
+	from serialize import dumps_record
+else:
+	from . import packetparse as pp
+	from .serialize import dumps_record
+
+DEFAULT_SLOTS = 1024
+POLL_INTERVAL = 0.0005
+
+# ring header: head (records written), tail (records consumed by the committing reader),
+# number of slots, slot size, and whether the producer is done (WRITER_DONE) or gave up
+# after an error (WRITER_FAILED)
+RING_HEADER = Struct('@QQIIB')
+# the slots start 8-byte aligned after it
+RING_HEADER_SIZE = (RING_HEADER.size + 7) & ~7
+# the counters the producer and readers share are read and written in native byte order,
+# which struct does with one (aligned, so untorn) 8-byte load or store; little-endian
+# formats are done a byte at a time, and a reader could see half of an update
+_U64 = Struct('@Q')
+HEAD_OFFSET = 0
+TAIL_OFFSET = 8
+CLOSED_OFFSET = 24
+WRITER_DONE = 1
+WRITER_FAILED = 2
+
+# slot header: sequence number + 1 (0 while the slot is empty or being written), parse
+# error bits, corrected symbols (NO_CORRECTION if not corrected), kind, source, offset
+SLOT_HEADER = Struct('<QHbBIQ')
+NO_CORRECTION = -128
+KIND_REJECTED = 0
+KIND_INVALID = 1
+
+# parse errors are sent as bits, and listed again in the order parse_packet reports them
+PARSE_ERROR_ORDER = [pp.PARSE_ERROR.UNCORRECTABLE, pp.PARSE_ERROR.WRONG_SIZE, pp.PARSE_ERROR.INVALID_INPUT,
+	pp.PARSE_ERROR.NOT_HEX, pp.PARSE_ERROR.INVALID_CALLSIGN, pp.PARSE_ERROR.INVALID_MSG_TYPE,
+	pp.PARSE_ERROR.INVALID_SAT_STATE, pp.PARSE_ERROR.INVALID_ELOC, pp.PARSE_ERROR.INVALID_ECODE]
+_ERROR_BITS = dict((err, 1 << i) for i, err in enumerate(PARSE_ERROR_ORDER))
+_ERROR_LISTS = {}
+
+def error_bits(parse_errs):
+	bits = 0
+	for err in parse_errs:
+		bits |= _ERROR_BITS[err]
+	return bits
+
+def error_list(bits):
+	if bits not in _ERROR_LISTS:
+		_ERROR_LISTS[bits] = [err for err in PARSE_ERROR_ORDER if bits & _ERROR_BITS[err]]
+	return list(_ERROR_LISTS[bits])
+
+# slot layouts
+# every value is packed with the struct code of the type its conversion returns, so records
+# come back out exactly as parse_packet returned them
+
+_STRUCT_CODES = {bool: '?', int: 'q', float: 'd'}
+
+def _dict_src(items):
+	return '{%s}' % ', '.join('%r: %s' % item for item in items)
+
+def _record_plan(fields, var, path, codes, args, index):
+	# returns the (key, decode expression) items of a record, appending the struct code and
+	# pack expression of each value to codes and args, and its index in the values to index
+	# under its path (like store.py's column names: "data.burst.3.LED1TEMP")
+	items = []
+	for field in fields:
+		if 'groups' in field:
+			records = []
+			for i in range(pp.layout_count(field['count'])):
+				sub = []
+				for group in field['groups']:
+					sub += _record_plan(group['fields'], '%s[%r][%d]' % (var, field['name'], i), '%s%s.%d.' % (path, field['name'], i), codes, args, index)
+				records.append(_dict_src(sub))
+			items.append((field['name'], '[%s]' % ', '.join(records)))
+			continue
+		if 'bitfield' in field:
+			values = [(bit['name'], 'q' if 'mask' in bit else '?') for bit in pp.layout['bitfields'][field['bitfield']]]
+		else:
+			values = [(field['name'], _STRUCT_CODES[pp.field_type(field)])]
+		for key, code in values:
+			items.append((key, 'v[%d]' % len(args)))
+			index[path + key] = len(args)
+			codes.append(code)
+			args.append('%s[%r]' % (var, key))
+	return items
+
+def _section_plan(section, var, path, codes, args, index):
+	items = _record_plan(section['fields'], var, path, codes, args, index)
+	if 'data_hash' in section:
+		# the hash is the hex of the record's bytes, which take half the space
+		item = ('data_hash', "_hex(v[%d]).decode('ascii')" % len(args))
+		index[path + 'data_hash'] = len(args)
+		codes.append('%ds' % section['size'])
+		args.append("_unhex(%s['data_hash'])" % var)
+		if section['data_hash'] == 'first':
+			items.insert(0, item)
+		else:
+			items.append(item)
+	return _dict_src(items)
+
+def _errors_plan(count, codes, args, index):
+	records = []
+	for i in range(count):
+		var = 'e[%d]' % i
+		j = len(args)
+		codes += ['B', '?', 'B', 'q']
+		for k, key in enumerate(('error_code', 'priority_bit', 'error_location', 'timestamp')):
+			index['errors.%d.%s' % (i, key)] = j + k
+			args.append('%s[%r]' % (var, key))
+		records.append(_dict_src([
+			('error_code', 'v[%d]' % j),
+			('priority_bit', 'v[%d]' % (j + 1)),
+			('error_location', 'v[%d]' % (j + 2)),
+			('timestamp', 'v[%d]' % (j + 3)),
+			('error_code_name', '_ecode(v[%d])' % j),
+			('error_location_name', '_eloc(v[%d])' % (j + 2)),
+			# the hex of the error's first two bytes and its full timestamp, as in parse_errors
+			('data_hash', "'%%02x%%02x%%s' %% (v[%d] | v[%d] << 7, v[%d], _int_to_hex(v[%d]))" % (j, j + 1, j + 2, j + 3)),
+		]))
+	return '[%s]' % ', '.join(records)
+
+# a slot's values are its header's, then the preamble bytes, then the sections'
+PREAMBLE_VALUE = len(SLOT_HEADER.format) - 1
+SECTIONS = ('preamble', 'current_info', 'data', 'errors')
+
+class _Slot(object):
+	""" How one kind of slot is packed and unpacked """
+	def __init__(self, struct, pack, sections, index):
+		self.struct = struct
+		self.pack = pack
+		# section -> function of the slot's values that returns the section as parse_packet does
+		self.sections = sections
+		# field path ("current_info.L1_REF", "data.3.L1_TEMP", "errors.0.error_code") -> value index
+		self.index = index
+		self.hashes = frozenset(i for path, i in index.items() if path.endswith('data_hash'))
+
+def _compile_slot(kind, message_type=None):
+	"""
+	Returns the _Slot of one kind of slot: its pack(mem, offset, header, packet) writes a
+	Packet, and its sections build each section out of the values unpacked from a slot
+	"""
+	codes = list(SLOT_HEADER.format[1:])
+	args = ['h[%d]' % i for i in range(len(codes))]
+	index = {}
+	sections = []
+	if kind != KIND_REJECTED:
+		codes.append('13s')
+		args.append('bytes(p.buf[:13])')
+		sections.append(('preamble', '_preamble(None, v[%d])[0]' % PREAMBLE_VALUE))
+		sections.append(('current_info', _section_plan(pp.layout['current_info'], 'c', 'current_info.', codes, args, index)))
+		if message_type is None:
+			sections += [('data', '{}'), ('errors', '{}')]
+		else:
+			section = pp.layout['message_types'][message_type]
+			if 'batches' in section:
+				records = [_section_plan(section, 'd[%d]' % i, 'data.%d.' % i, codes, args, index) for i in range(pp.layout_count(section['batches']))]
+				data = '[%s]' % ', '.join(records)
+			else:
+				data = _section_plan(section, 'd', 'data.', codes, args, index)
+			sections.append(('data', data))
+			sections.append(('errors', _errors_plan(section['errors']['count'], codes, args, index)))
+	struct = Struct('<' + ''.join(codes))
+
+	name = 'kind%d' % kind
+	lines = ['def pack_%s(mem, off, h, p):' % name]
+	if kind != KIND_REJECTED:
+		lines.append('\tc = p.current_info')
+		if message_type is not None:
+			lines += ['\td = p.data', '\te = p.errors']
+	lines.append('\t_struct.pack_into(mem, off, %s)' % ', '.join(args))
+	for section, src in sections:
+		lines += ['def %s_%s(v):' % (section, name), '\treturn %s' % src]
+	namespace = {
+		'_struct': struct,
+		'_hex': hexlify,
+		'_unhex': unhexlify,
+		'_preamble': pp.parse_preamble,
+		'_ecode': pp.get_ECODE_name,
+		'_eloc': pp.get_ELOC_name,
+		'_int_to_hex': pp.int_to_hex,
+	}
+	exec(compile('\n'.join(lines) + '\n', '<ring:%s>' % (message_type or name), 'exec'), namespace)
+	return _Slot(struct, namespace['pack_' + name], dict((section, namespace['%s_%s' % (section, name)]) for section, src in sections), index)
+
+MESSAGE_TYPES = list(pp.layout['message_types'])
+KINDS = dict((message_type, i + 2) for i, message_type in enumerate(MESSAGE_TYPES))
+SLOTS = [_compile_slot(KIND_REJECTED), _compile_slot(KIND_INVALID)] + [_compile_slot(KINDS[t], t) for t in MESSAGE_TYPES]
+# rounded up to keep the slots 8-byte aligned
+SLOT_SIZE = (max(slot.struct.size for slot in SLOTS) + 7) & ~7
+
+class Ring(object):
+	"""
+	A ring buffer of parsed packets in shared memory, written by one process and read by
+	RingReaders in others. Ring(slots=n) creates one; Ring(name) attaches to an existing one.
+	The producer waits for the committing reader when the ring is full (unless told not to,
+	in which case readers that fall a whole ring behind lose records, and count them).
+	"""
+	def __init__(self, name=None, slots=DEFAULT_SLOTS):
+		self.owner = name is None
+		if self.owner:
+			self.shm = shared_memory.SharedMemory(create=True, size=RING_HEADER_SIZE + slots*SLOT_SIZE)
+			RING_HEADER.pack_into(self.shm.buf, 0, 0, 0, slots, SLOT_SIZE, 0)
+		else:
+			self.shm = shared_memory.SharedMemory(name=name)
+		self.name = self.shm.name
+		self.buf = self.shm.buf
+		head, tail, self.slots, slot_size, closed = RING_HEADER.unpack_from(self.buf, 0)
+		if slot_size != SLOT_SIZE:
+			raise ValueError("ring %s was created with a different layout" % name)
+
+	@property
+	def head(self):
+		return _U64.unpack_from(self.buf, HEAD_OFFSET)[0]
+
+	@property
+	def tail(self):
+		return _U64.unpack_from(self.buf, TAIL_OFFSET)[0]
+
+	@tail.setter
+	def tail(self, seq):
+		_U64.pack_into(self.buf, TAIL_OFFSET, seq)
+
+	@property
+	def closed(self):
+		return self.buf[CLOSED_OFFSET] != 0
+
+	@property
+	def failed(self):
+		""" Whether the producer closed the ring because of an error """
+		return self.buf[CLOSED_OFFSET] == WRITER_FAILED
+
+	def slot_offset(self, seq):
+		return RING_HEADER_SIZE + (seq % self.slots)*SLOT_SIZE
+
+	def slot_seq(self, seq):
+		""" The sequence number + 1 of the record in seq's slot, 0 while it's being written """
+		return _U64.unpack_from(self.buf, self.slot_offset(seq))[0]
+
+	def write(self, packet, parse_errs, source=0, offset=0, block=True):
+		"""
+		Writes a parse result, where packet is a Packet (from parse_packet(..., lazy=True))
+		or the {} of a rejected packet. Returns the record's sequence number.
+		"""
+		seq = self.head
+		if block:
+			while seq - self.tail >= self.slots:
+				time.sleep(POLL_INTERVAL)
+		if packet:
+			kind = KINDS.get(packet.message_type, KIND_INVALID)
+			# the lazily decoded error section has parse errors of its own
+			parse_errs = list(parse_errs) + packet.parse_errors
+			corrected = packet.corrected_symbols
+		else:
+			kind = KIND_REJECTED
+			corrected = None
+		header = (0, error_bits(parse_errs), NO_CORRECTION if corrected is None else corrected, kind, source, offset)
+		off = self.slot_offset(seq)
+		# a reader that sees 0 (or another sequence number) after decoding a slot knows it
+		# was overwritten while it read
+		_U64.pack_into(self.buf, off, 0)
+		SLOTS[kind].pack(self.buf, off, header, packet)
+		_U64.pack_into(self.buf, off, seq + 1)
+		_U64.pack_into(self.buf, HEAD_OFFSET, seq + 1)
+		return seq
+
+	def put(self, ps, correct=False, validate=False, source=0, offset=0, block=True):
+		""" Parses a hex packet straight into the ring; returns its sequence number """
+		packet, parse_errs = pp.parse_packet(ps, lazy=True, correct=correct, validate=validate)
+		return self.write(packet, parse_errs, source, offset, block)
+
+	def close_writer(self, failed=False):
+		""" Tells the readers that no more records are coming (with failed, because of an error) """
+		self.buf[CLOSED_OFFSET] = WRITER_FAILED if failed else WRITER_DONE
+
+	def close(self):
+		""" Detaches from the shared memory (and frees it, in the process that created it) """
+		self.buf = None
+		self.shm.close()
+		if self.owner:
+			self.shm.unlink()
+
+class SlotRecord(object):
+	"""
+	A record read from a ring: the slot's values, copied out of the shared memory with one
+	unpack_from (the slot may be reused as soon as the reader commits it). Single fields
+	are read with value("data.L1_TEMP") straight from the values, the sections like a lazy
+	Packet's (record.data, record["errors"]) are built on first access, and to_dict() gives
+	the packet as parse_packet returned it. Records of rejected packets are false, like {}.
+	"""
+	__slots__ = ('kind', 'values', 'corrected_symbols', '_sections')
+
+	def __init__(self, kind, values, corrected_symbols=None):
+		self.kind = kind
+		self.values = values
+		self.corrected_symbols = corrected_symbols
+		self._sections = {}
+
+	def __bool__(self):
+		return self.kind != KIND_REJECTED
+
+	@property
+	def message_type(self):
+		return self.preamble['message_type'] if self.kind != KIND_REJECTED else None
+
+	def fields(self):
+		""" The field paths value() takes for this record """
+		return list(SLOTS[self.kind].index)
+
+	def value(self, path):
+		""" One field by its path, e.g. "current_info.L1_REF", "data.3.L1_TEMP" (batches) or "errors.0.error_code" """
+		slot = SLOTS[self.kind]
+		i = slot.index[path]
+		if i in slot.hashes:
+			return hexlify(self.values[i]).decode('ascii')
+		return self.values[i]
+
+	def __getitem__(self, section):
+		if section not in SECTIONS or self.kind == KIND_REJECTED:
+			raise KeyError(section)
+		if section not in self._sections:
+			self._sections[section] = SLOTS[self.kind].sections[section](self.values)
+		return self._sections[section]
+
+	preamble = property(lambda self: self['preamble'])
+	current_info = property(lambda self: self['current_info'])
+	data = property(lambda self: self['data'])
+	errors = property(lambda self: self['errors'])
+
+	def to_dict(self):
+		""" Returns the packet in the same form as parse_packet(ps)[0] """
+		if self.kind == KIND_REJECTED:
+			return {}
+		packet = dict((section, self[section]) for section in SECTIONS)
+		if self.corrected_symbols is not None:
+			packet['corrected_symbols'] = self.corrected_symbols
+		return packet
+
+def decode_slot(mem, off):
+	"""
+	Reads the record at off in mem; returns (SlotRecord, parse errors, source, offset)
+	"""
+	seq, bits, corrected, kind, source, offset = SLOT_HEADER.unpack_from(mem, off)
+	record = SlotRecord(kind, SLOTS[kind].struct.unpack_from(mem, off), None if corrected == NO_CORRECTION else corrected)
+	return record, error_list(bits), source, offset
+
+class RingReader(object):
+	"""
+	Reads the records of a Ring in order, as SlotRecords. The committing reader
+	(there should be one) frees the slots it has read for the producer; other readers only
+	watch, and count the records they lost to being overrun in lost.
+	"""
+	def __init__(self, ring, commit=True):
+		self.ring = ring
+		self.commit = commit
+		self.seq = ring.tail if commit else ring.head
+		self.lost = 0
+
+	def poll(self, max_records=None):
+		""" Returns [(seq, SlotRecord, parse errors, source, offset)] for the records written since the last poll """
+		ring = self.ring
+		head = max(ring.head, self.seq)
+		if max_records is not None:
+			head = min(head, self.seq + max_records)
+		if head - self.seq > ring.slots:
+			skipped = head - ring.slots - self.seq
+			self.lost += skipped
+			self.seq += skipped
+		records = []
+		for seq in range(self.seq, head):
+			off = ring.slot_offset(seq)
+			if _U64.unpack_from(ring.buf, off)[0] != seq + 1:
+				self.lost += 1
+				continue
+			packet, parse_errs, source, offset = decode_slot(ring.buf, off)
+			if _U64.unpack_from(ring.buf, off)[0] != seq + 1:
+				self.lost += 1
+				continue
+			records.append((seq, packet, parse_errs, source, offset))
+		self.seq = head
+		if self.commit:
+			ring.tail = head
+		return records
+
+	@property
+	def done(self):
+		""" Whether the producer has closed the ring and everything has been read """
+		return self.ring.closed and self.seq >= self.ring.head
+
+def _ring_worker(name, tasks, correct, max_sync_errors=0):
+	# runs in the decoder processes; tasks are (source, path, start, split_size) until a None
+	ring = Ring(name)
+	try:
+		for task in iter(tasks.get, None):
+			source, path, start, split_size = task
+			for offset, ps in pp.iter_file_range(path, start, split_size, max_sync_errors):
+				ring.put(ps, correct, source=source, offset=offset)
+	except BaseException:
+		# so the consumer raises instead of taking what was written for everything
+		ring.close_writer(failed=True)
+		raise
+	else:
+		ring.close_writer()
+	finally:
+		ring.close()
+
+def parse_files_shared(paths, jobs=1, split_size=pp.DEFAULT_SPLIT_SIZE, correct=False, slots=DEFAULT_SLOTS, max_sync_errors=0):
+	"""
+	Yields (path, offset, SlotRecord, parse errors) for every packet in the dump files,
+	parsed by jobs processes that each write into their own Ring. Packets of a file range come in
+	order, but ranges and files are interleaved. correct is passed on to parse_packet and
+	max_sync_errors to iter_packets. Raises RuntimeError if a decoder process fails.
+	"""
+	ranges = [r for path in paths for r in pp._file_ranges(path, split_size)]
+	tasks = multiprocessing.Queue()
+	for source, task in enumerate(ranges):
+		tasks.put((source,) + task)
+	rings = [Ring(slots=slots) for _ in range(jobs)]
+	processes = []
+	try:
+		for ring in rings:
+			tasks.put(None)
+			process = multiprocessing.Process(target=_ring_worker, args=(ring.name, tasks, correct, max_sync_errors))
+			process.daemon = True
+			process.start()
+			processes.append(process)
+		readers = [RingReader(ring) for ring in rings]
+		workers = list(processes)
+		while readers:
+			idle = True
+			for reader, worker in list(zip(readers, workers)):
+				records = reader.poll()
+				for seq, packet, parse_errs, source, offset in records:
+					yield ranges[source][0], offset, packet, parse_errs
+				if records:
+					idle = False
+				elif reader.done:
+					if reader.ring.failed:
+						raise RuntimeError("decoder process failed")
+					readers.remove(reader)
+					workers.remove(worker)
+				elif worker.exitcode is not None and not reader.ring.closed:
+					raise RuntimeError("decoder process exited with code %d" % worker.exitcode)
+			if idle:
+				time.sleep(POLL_INTERVAL)
+	finally:
+		for process in processes:
+			if process.is_alive():
+				process.terminate()
+			process.join()
+		for ring in rings:
+			ring.close()
+
+def main():
+	parser = argparse.ArgumentParser(description="Parses hex dumps in decoder processes that hand the results over in shared memory")
+	parser.add_argument("files", nargs="+", help="hex dump files to parse as JSON Lines")
+	parser.add_argument("-j", "--jobs", type=int, default=multiprocessing.cpu_count(), help="decoder processes")
+	parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="packets each ring buffer holds")
+	parser.add_argument("--split-size", type=int, default=pp.DEFAULT_SPLIT_SIZE, help="bytes of a file given to a decoder at a time")
+	parser.add_argument("--correct", action="store_true", help="apply Reed-Solomon correction before parsing")
+	parser.add_argument("--sync-errors", type=int, default=0, help="also find packets with up to this many bit errors in their callsign (at most %d)" % pp.MAX_SYNC_ERRORS)
+	parser.add_argument("-q", "--quiet", action="store_true", help="only report counts and throughput")
+	args = parser.parse_args()
+	if not 0 <= args.sync_errors <= pp.MAX_SYNC_ERRORS:
+		parser.error("--sync-errors must be between 0 and %d" % pp.MAX_SYNC_ERRORS)
+
+	counts = OrderedDict((path, [0, 0]) for path in args.files)
+	start = time.time()
+	for path, offset, packet, parse_errs in parse_files_shared(args.files, args.jobs, args.split_size, args.correct, args.slots, args.sync_errors):
+		counts[path][0] += 1
+		if parse_errs:
+			counts[path][1] += 1
+		if not args.quiet:
+			sys.stdout.write(dumps_record(OrderedDict([("file", path), ("offset", offset), ("packet", packet.to_dict()), ("parse_errors", parse_errs)])) + "\n")
+	elapsed = time.time() - start
+	for path, (num_packets, num_errs) in counts.items():
+		sys.stderr.write("%s: %d packets, %d with parse errors\n" % (path, num_packets, num_errs))
+	total = sum(c[0] for c in counts.values())
+	sys.stderr.write("%d packets in %.2fs (%.0f/sec)\n" % (total, elapsed, total / elapsed if elapsed else 0.0))
+
+if __name__ == "__main__":
+	main()
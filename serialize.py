@@ -0,0 +1,209 @@
+#!/usr/bin/python
+# JSON Lines output of parsed packets
+#
+# dumps_packet(packet) gives exactly json.dumps(packet) for the output of parse_packet, but
+# each section is written by one string format generated from layout.json (the key
+# fragments are prebuilt and values are formatted by type) instead of walking the dicts.
+
+import json
+import sys
+from json.encoder import encode_basestring_ascii
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+BUFFER_SIZE = 1 << 16
+
+_BOOLS = ('false', 'true')
+
+PREAMBLE_KINDS = [('callsign', 'str'), ('timestamp', 'num'), ('message_type', 'str'), ('satellite_state', 'str'),
+	('FLASH_KILLED', 'bool'), ('MRAM_CPY', 'bool'), ('bytes_of_data', 'num'), ('num_errors', 'num')]
+ERROR_KINDS = [('error_code', 'num'), ('priority_bit', 'bool'), ('error_location', 'num'), ('timestamp', 'num'),
+	('error_code_name', 'str'), ('error_location_name', 'str'), ('data_hash', 'str')]
+
+# float formatting is the slow part of json.dumps, so the text of each value of a converted
+# field is looked up: in a table of every value for 1-byte fields, and in a table filled in
+# as values are seen (they repeat a lot) for wider ones
+_repr_tables = []
+_repr_table_index = {}
+
+class _ReprCache(dict):
+	def __missing__(self, val):
+		text = self[val] = repr(val)
+		return text
+
+def _repr_table(field, convert):
+	if field.get('width', 1) == 1:
+		raw = range(-128, 128) if field.get('signed') else range(256)
+		values = [convert(v) for v in raw]
+		# 1 and 1.0 would share an entry
+		if len(set(type(v) for v in values)) == 1:
+			return dict((v, repr(v)) for v in values)
+	elif all(type(convert(v)) == float for v in (0, 1, 0x7FFF, 0x8000, 0xFFFF)):
+		return _ReprCache()
+	return None
+
+def _field_kind(field):
+	if 'signal' in field or 'conversion' in field or field.get('flip'):
+		convert = pp.field_converter(field)
+		if isinstance(convert(0), bool):
+			return 'bool'
+		key = (field.get('width', 1), field.get('signal'), field.get('conversion'), field.get('flip', False), field.get('signed', False))
+		if key not in _repr_table_index:
+			table = _repr_table(field, convert)
+			_repr_table_index[key] = len(_repr_tables) if table is not None else None
+			if table is not None:
+				_repr_tables.append(table)
+		if _repr_table_index[key] is not None:
+			return _repr_table_index[key]
+	return 'num'
+
+def _record_kinds(fields):
+	# (key, kind) in the order the compiled decoders build each record, with a list of
+	# records for the kind of groups
+	kinds = []
+	for field in fields:
+		if 'groups' in field:
+			entry = []
+			for group in field['groups']:
+				entry += _record_kinds(group['fields'])
+			kinds.append((field['name'], [entry]*pp.layout_count(field['count'])))
+		elif 'bitfield' in field:
+			for bit in pp.layout['bitfields'][field['bitfield']]:
+				kinds.append((bit['name'], 'num' if 'mask' in bit else 'bool'))
+		else:
+			kinds.append((field['name'], _field_kind(field)))
+	return kinds
+
+def _section_kinds(section):
+	kinds = _record_kinds(section['fields'])
+	if section.get('data_hash') == 'first':
+		kinds.insert(0, ('data_hash', 'str'))
+	elif 'data_hash' in section:
+		kinds.append(('data_hash', 'str'))
+	return kinds
+
+def _format(kinds, var, args):
+	# returns the format string of a record, appending the expression of each value to args
+	items = []
+	for key, kind in kinds:
+		frag = json.dumps(key).replace('%', '%%') + ': '
+		val = '%s[%r]' % (var, key)
+		if isinstance(kind, list):
+			items.append(frag + '[' + ', '.join(_format(sub, '%s[%d]' % (val, i), args) for i, sub in enumerate(kind)) + ']')
+		elif isinstance(kind, int):
+			items.append(frag + '%s')
+			args.append('_R%d[%s]' % (kind, val))
+		elif kind == 'num':
+			items.append(frag + '%r')
+			args.append(val)
+		elif kind == 'bool':
+			items.append(frag + '%s')
+			args.append('_BOOLS[%s]' % val)
+		else:
+			items.append(frag + '%s')
+			args.append('_str(%s)' % val)
+	return '{' + ', '.join(items) + '}'
+
+def _compile_encoder(name, kinds, many=False):
+	args = []
+	fmt = _format(kinds, 'r', args)
+	expr = '%r %% (%s,)' % (fmt, ', '.join(args))
+	if many:
+		body = "return '[' + ', '.join([%s for r in records]) + ']'" % expr
+		src = 'def %s(records):\n\t%s\n' % (name, body)
+	else:
+		src = 'def %s(r):\n\treturn %s\n' % (name, expr)
+	namespace = dict(('_R%d' % i, table) for i, table in enumerate(_repr_tables))
+	namespace.update(_BOOLS=_BOOLS, _str=encode_basestring_ascii)
+	exec(compile(src, '<serialize:%s>' % name, 'exec'), namespace)
+	return namespace[name]
+
+def _build_encoders():
+	common = {
+		'preamble': _compile_encoder('encode_preamble', PREAMBLE_KINDS),
+		'current_info': _compile_encoder('encode_current_info', _section_kinds(pp.layout['current_info'])),
+	}
+	encoders = {pp.INVALID_STR: common}
+	errors = _compile_encoder('encode_errors', ERROR_KINDS, many=True)
+	for name, section in pp.layout['message_types'].items():
+		fn_name = 'encode_%s_data' % name.lower().replace(' ', '_')
+		encoders[name] = dict(common, errors=errors, data=_compile_encoder(fn_name, _section_kinds(section), many='batches' in section))
+	return encoders
+
+SECTION_ENCODERS = _build_encoders()
+_KEYS = dict((key, json.dumps(key) + ': ') for key in ('preamble', 'current_info', 'data', 'errors'))
+
+def dumps_packet(packet):
+	"""
+	json.dumps(packet) for a packet returned by parse_packet, lazy Packets (and ring
+	SlotRecords) included (anything else is passed to json.dumps)
+	"""
+	if not isinstance(packet, dict) and hasattr(packet, 'to_dict'):
+		packet = packet.to_dict()
+	try:
+		encoders = SECTION_ENCODERS[packet['preamble']['message_type']]
+		items = []
+		for key, val in packet.items():
+			encoder = encoders.get(key)
+			if encoder is None:
+				# the empty sections of invalid packets, corrected_symbols, ...
+				items.append(json.dumps(key) + ': ' + json.dumps(val))
+			else:
+				items.append(_KEYS[key] + encoder(val))
+	except (KeyError, TypeError, IndexError):
+		return json.dumps(packet)
+	out = '{' + ', '.join(items) + '}'
+	# json writes non-finite floats as NaN/Infinity rather than repr's nan/inf
+	if ': nan' in out or ': inf' in out or ': -inf' in out:
+		return json.dumps(packet)
+	return out
+
+def dumps_record(record):
+	""" json.dumps(record), with any 'packet' value written by dumps_packet """
+	items = []
+	for key, val in record.items():
+		items.append(json.dumps(key) + ': ' + (dumps_packet(val) if key == 'packet' else json.dumps(val)))
+	return '{' + ', '.join(items) + '}'
+
+class JsonLinesWriter(object):
+	"""
+	Buffers JSON lines and writes them to out (a text file, default stdout) about every
+	buffer_size characters, and on flush()/close()
+	"""
+	def __init__(self, out=None, buffer_size=BUFFER_SIZE):
+		self.out = out or sys.stdout
+		self.buffer_size = buffer_size
+		self._lines = []
+		self._size = 0
+
+	def write_line(self, line):
+		self._lines.append(line)
+		self._size += len(line) + 1
+		if self._size >= self.buffer_size:
+			self.flush()
+
+	def write_packet(self, packet):
+		self.write_line(dumps_packet(packet))
+
+	def write_record(self, record):
+		self.write_line(dumps_record(record))
+
+	def flush(self):
+		if self._lines:
+			self._lines.append('')
+			self.out.write('\n'.join(self._lines))
+			self._lines = []
+			self._size = 0
+		self.out.flush()
+
+	def close(self):
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
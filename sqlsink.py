@@ -0,0 +1,263 @@
+#!/usr/bin/python
+# SQLite sink for parsed packets: a table per message type (columns generated from
+# layout.json) and an errors table, each keyed on data_hash so that ingesting the same
+# packets again (retransmissions, overlapping backfills) inserts nothing twice
+#
+#   python sqlsink.py telemetry.db dump1.txt dump2.txt
+#
+# Nested records (FLASH BURST's burst) are flattened to columns like "burst.3.LED1TEMP",
+# as in store.py.
+
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+ERRORS_TABLE = 'errors'
+_SQL_TYPES = {bool: 'INTEGER', int: 'INTEGER', float: 'REAL', str: 'TEXT'}
+
+def table_name(message_type):
+	return message_type.lower().replace(' ', '_')
+
+def _record_columns(fields, prefix, var, columns):
+	# appends (column, SQL type, expression of the value in record var) for each field
+	for field in fields:
+		if 'groups' in field:
+			for i in range(pp.layout_count(field['count'])):
+				for group in field['groups']:
+					_record_columns(group['fields'], '%s%s.%d.' % (prefix, field['name'], i), '%s[%r][%d]' % (var, field['name'], i), columns)
+		elif 'bitfield' in field:
+			for bit in pp.layout['bitfields'][field['bitfield']]:
+				columns.append((prefix + bit['name'], 'INTEGER', '%s[%r]' % (var, bit['name'])))
+		else:
+			columns.append((prefix + field['name'], _SQL_TYPES[pp.field_type(field)], '%s[%r]' % (var, field['name'])))
+	return columns
+
+def _section_columns(section):
+	columns = _record_columns(section['fields'], '', 'r', [])
+	hash_column = ('data_hash', 'TEXT', "r['data_hash']")
+	if section.get('data_hash') == 'first':
+		columns.insert(0, hash_column)
+	else:
+		columns.append(hash_column)
+	return columns
+
+ERROR_COLUMNS = [('data_hash', 'TEXT', "r['data_hash']"), ('message_type', 'TEXT', 't')] + [
+	(key, 'TEXT' if key.endswith('_name') else 'INTEGER', 'r[%r]' % key) for key in pp.ERROR_FIELDS if key != 'data_hash']
+
+class _Table(object):
+	def __init__(self, name, columns):
+		self.name = name
+		self.columns = [column for column, sql_type, expr in columns]
+		self.create = ['CREATE TABLE IF NOT EXISTS %s (%s)' % (name, ', '.join(
+			'"%s" %s%s' % (column, sql_type, ' PRIMARY KEY' if column == 'data_hash' else '') for column, sql_type, expr in columns)),
+			'CREATE INDEX IF NOT EXISTS %s_timestamp ON %s (timestamp)' % (name, name)]
+		self.insert = 'INSERT OR IGNORE INTO %s (%s) VALUES (%s)' % (name, ', '.join('"%s"' % c for c in self.columns), ', '.join('?'*len(columns)))
+		# the row of a record (and, for errors, the message type t), as a tuple in column order
+		self.row = eval('lambda r, t=None: (%s,)' % ', '.join(expr for column, sql_type, expr in columns))
+
+TABLES = dict((message_type, _Table(table_name(message_type), _section_columns(section)))
+	for message_type, section in pp.layout['message_types'].items())
+TABLES[ERRORS_TABLE] = _Table(ERRORS_TABLE, ERROR_COLUMNS)
+
+class SqliteSink(object):
+	"""
+	Writes the data and error records of parsed packets to an SQLite database in WAL mode.
+	Rows are queued and written with executemany, batch_size rows to a transaction, by a
+	background thread every flush_interval seconds (or as soon as batch_size rows are
+	queued), or by the caller on flush() with background=False. Records already in the
+	database (by data_hash) are ignored. Errors in the flush thread are raised by the next
+	call that queues rows, flush() or close().
+	"""
+	def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL, background=True):
+		self.path = path
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		# table -> [rows] waiting to be written
+		self._pending = {}
+		self._num_pending = 0
+		self._lock = threading.Condition()
+		# flush() waits for the flush thread to finish the round it asked for
+		self._requested = 0
+		self._finished = 0
+		self._error = None
+		self._closed = False
+		self.rows_written = 0
+		self.rows_ignored = 0
+		self.transactions = 0
+		self.write_seconds = 0.0
+		self._started = time.time()
+		self._conn = None
+		if background:
+			self._thread = threading.Thread(target=self._run, name='sqlsink-flush')
+			self._thread.daemon = True
+			self._thread.start()
+		else:
+			self._thread = None
+			self._connect()
+
+	def _connect(self):
+		# in the thread that writes (sqlite3 connections are tied to the thread they're made in)
+		conn = sqlite3.connect(self.path)
+		conn.execute('PRAGMA journal_mode=WAL')
+		# in WAL mode a commit is durable once the WAL is checkpointed; NORMAL skips the fsync per commit
+		conn.execute('PRAGMA synchronous=NORMAL')
+		for table in TABLES.values():
+			for statement in table.create:
+				conn.execute(statement)
+		conn.commit()
+		self._conn = conn
+
+	def _check(self):
+		if self._error is not None:
+			error, self._error = self._error, None
+			raise error
+
+	def _queue(self, table, rows):
+		self._check()
+		with self._lock:
+			self._pending.setdefault(table, []).extend(rows)
+			self._num_pending += len(rows)
+			if self._thread is not None and self._num_pending >= self.batch_size:
+				self._lock.notify_all()
+		if self._thread is None and self._num_pending >= self.batch_size:
+			self._write()
+
+	def append(self, message_type, records):
+		""" Queues data section records (as returned by the parse_*_data functions) """
+		if isinstance(records, dict) or isinstance(records, pp.CompactRecord):
+			records = [records]
+		row = TABLES[message_type].row
+		self._queue(TABLES[message_type], [row(r) for r in records])
+
+	def add_errors(self, message_type, errors):
+		""" Queues the records of parse_errors() """
+		row = TABLES[ERRORS_TABLE].row
+		self._queue(TABLES[ERRORS_TABLE], [row(e, message_type) for e in errors])
+
+	def add_packet(self, packet):
+		""" Queues the data and error records of a parse_packet() result (or Packet); invalid packets are skipped """
+		if not packet:
+			return
+		message_type = packet['preamble']['message_type']
+		if message_type == pp.INVALID_STR:
+			return
+		self.append(message_type, packet['data'])
+		if packet['errors']:
+			self.add_errors(message_type, packet['errors'])
+
+	def _write(self):
+		with self._lock:
+			pending, self._pending = self._pending, {}
+			self._num_pending = 0
+		start = time.time()
+		for table, rows in pending.items():
+			for i in range(0, len(rows), self.batch_size):
+				batch = rows[i:i + self.batch_size]
+				before = self._conn.total_changes
+				with self._conn:
+					self._conn.executemany(table.insert, batch)
+				written = self._conn.total_changes - before
+				self.rows_written += written
+				self.rows_ignored += len(batch) - written
+				self.transactions += 1
+		self.write_seconds += time.time() - start
+
+	def _run(self):
+		try:
+			self._connect()
+		except Exception as e:
+			self._error = e
+		with self._lock:
+			while True:
+				# until there's a full batch, a flush() or close(), or the interval is up
+				if self._num_pending < self.batch_size and self._requested == self._finished and not self._closed:
+					self._lock.wait(self.flush_interval)
+				requested = self._requested
+				if self._num_pending and self._conn is not None and self._error is None:
+					self._lock.release()
+					try:
+						self._write()
+					except Exception as e:
+						self._error = e
+					finally:
+						self._lock.acquire()
+				self._finished = requested
+				self._lock.notify_all()
+				if self._closed:
+					break
+		if self._conn is not None:
+			self._conn.close()
+
+	def flush(self):
+		""" Writes everything queued so far, waiting until it's committed """
+		if self._thread is None:
+			self._write()
+		else:
+			with self._lock:
+				self._requested += 1
+				requested = self._requested
+				self._lock.notify_all()
+				while self._finished < requested and self._thread.is_alive():
+					self._lock.wait(self.flush_interval)
+		self._check()
+
+	def close(self):
+		if self._closed:
+			return
+		self.flush()
+		self._closed = True
+		if self._thread is None:
+			self._conn.close()
+		else:
+			with self._lock:
+				self._lock.notify_all()
+			self._thread.join()
+		self._check()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def stats(self):
+		""" Rows written and ignored (already in the database), and rows/sec of writing and overall """
+		elapsed = time.time() - self._started
+		return {
+			'rows_written': self.rows_written,
+			'rows_ignored': self.rows_ignored,
+			'rows_pending': self._num_pending,
+			'transactions': self.transactions,
+			'write_rows_per_sec': (self.rows_written + self.rows_ignored) / self.write_seconds if self.write_seconds else 0.0,
+			'rows_per_sec': (self.rows_written + self.rows_ignored) / elapsed if elapsed else 0.0,
+		}
+
+def main():
+	parser = argparse.ArgumentParser(description="Parses hex dumps into an SQLite database (packets already in it are skipped)")
+	parser.add_argument("database", help="SQLite database file (created if missing)")
+	parser.add_argument("files", nargs="+", help="hex dump files")
+	parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+	parser.add_argument("--correct", action="store_true", help="apply Reed-Solomon correction before parsing")
+	args = parser.parse_args()
+
+	with SqliteSink(args.database, args.batch_size) as sink:
+		for path in args.files:
+			for offset, ps in pp.iter_packets(path):
+				sink.add_packet(pp.parse_packet(ps, correct=args.correct)[0])
+		sink.flush()
+		stats = sink.stats()
+	sys.stderr.write("%(rows_written)d rows written, %(rows_ignored)d already there, %(transactions)d transactions, "
+		"%(write_rows_per_sec).0f rows/sec writing, %(rows_per_sec).0f rows/sec overall\n" % stats)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,257 @@
+#!/usr/bin/python
+# on-disk columnar store of parsed data section records, for time range queries
+#
+# store/
+#   <message type>/           e.g. "attitude", "flash_burst"
+#     schema.json             [[column, struct code, width], ...]
+#     index.json              the blocks: row ranges, each sorted by timestamp, with sparse
+#                             timestamp marks every INDEX_STRIDE rows
+#     <column>.col            the column's values, little-endian, fixed width
+#
+# Nested records (FLASH BURST's burst) are flattened to columns like "burst.3.LED1TEMP".
+
+import heapq
+import json
+import os
+import sys
+from bisect import bisect_left, bisect_right
+from struct import Struct
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+INDEX_STRIDE = 256
+BLOCK_ROWS = 4096
+
+_replace = getattr(os, 'replace', os.rename)
+
+def _partition_name(message_type):
+	return message_type.lower().replace(' ', '_')
+
+def _flatten(record, prefix, row):
+	for key, val in record.items():
+		if isinstance(val, list):
+			for i, sub in enumerate(val):
+				_flatten(sub, '%s%s.%d.' % (prefix, key, i), row)
+		else:
+			row[prefix + key] = val
+	return row
+
+def _column_code(val):
+	if isinstance(val, bool):
+		return '?', 1
+	if isinstance(val, int):
+		return 'q', 8
+	if isinstance(val, float):
+		return 'd', 8
+	return 's', len(val)
+
+def _write_json(path, obj):
+	tmp = path + '.tmp'
+	with open(tmp, 'w') as f:
+		json.dump(obj, f)
+	_replace(tmp, path)
+
+class _Partition(object):
+	def __init__(self, path):
+		self.path = path
+		self.schema = None
+		self.blocks = []
+		self.pending = []
+		if os.path.exists(os.path.join(path, 'schema.json')):
+			with open(os.path.join(path, 'schema.json')) as f:
+				self.schema = [tuple(col) for col in json.load(f)]
+			with open(os.path.join(path, 'index.json')) as f:
+				self.blocks = json.load(f)
+
+	@property
+	def num_rows(self):
+		if not self.blocks:
+			return 0
+		return self.blocks[-1]['start'] + self.blocks[-1]['count']
+
+	def _column_path(self, name):
+		return os.path.join(self.path, name + '.col')
+
+	def _create(self, row):
+		if not os.path.isdir(self.path):
+			os.makedirs(self.path)
+		self.schema = [(name,) + _column_code(row[name]) for name in sorted(row)]
+		_write_json(os.path.join(self.path, 'schema.json'), self.schema)
+
+	def flush(self):
+		if not self.pending:
+			return
+		rows = sorted(self.pending, key=lambda row: row['timestamp'])
+		self.pending = []
+		if self.schema is None:
+			self._create(rows[0])
+		start = self.num_rows
+		for name, code, width in self.schema:
+			vals = [row[name] for row in rows]
+			if code == 's':
+				data = b''.join(v.encode('ascii').ljust(width, b'\0')[:width] for v in vals)
+			else:
+				data = Struct('<%d%s' % (len(vals), code)).pack(*vals)
+			with open(self._column_path(name), 'ab') as f:
+				# drops anything left by a flush that was interrupted
+				f.truncate(start*width)
+				f.write(data)
+		timestamps = [row['timestamp'] for row in rows]
+		self.blocks.append({
+			'start': start,
+			'count': len(rows),
+			'min': timestamps[0],
+			'max': timestamps[-1],
+			'marks': timestamps[::INDEX_STRIDE],
+		})
+		# the index is only updated once the columns are written, so a crash mid-flush
+		# leaves trailing column data that nothing points to (and the next flush drops)
+		_write_json(os.path.join(self.path, 'index.json'), self.blocks)
+
+	def read(self, name, start, count):
+		code, width = [(c, w) for n, c, w in self.schema if n == name][0]
+		with open(self._column_path(name), 'rb') as f:
+			f.seek(start*width)
+			data = f.read(count*width)
+		if code == 's':
+			return [data[i:i + width].rstrip(b'\0').decode('ascii') for i in range(0, len(data), width)]
+		return list(Struct('<%d%s' % (count, code)).unpack(data))
+
+	def row_ranges(self, t1, t2):
+		# the (start, count) row ranges that can hold timestamps in [t1, t2]
+		ranges = []
+		for block in self.blocks:
+			if (t1 is not None and block['max'] < t1) or (t2 is not None and block['min'] > t2):
+				continue
+			marks = block['marks']
+			lo = 0
+			if t1 is not None:
+				lo = max(bisect_left(marks, t1) - 1, 0)*INDEX_STRIDE
+			hi = block['count']
+			if t2 is not None:
+				hi = min(bisect_right(marks, t2)*INDEX_STRIDE, hi)
+			ranges.append((block['start'] + lo, hi - lo))
+		return ranges
+
+class TelemetryStore(object):
+	"""
+	A directory of per message type column files that parsed packets are appended to.
+	Rows are buffered and written as a block (sorted by timestamp) every BLOCK_ROWS rows
+	and on flush()/close(). Only one process should write to a store at a time.
+	"""
+	def __init__(self, path):
+		self.path = path
+		self._partitions = {}
+		if not os.path.isdir(path):
+			os.makedirs(path)
+
+	def _partition(self, message_type):
+		name = _partition_name(message_type)
+		if name not in self._partitions:
+			self._partitions[name] = _Partition(os.path.join(self.path, name))
+		return self._partitions[name]
+
+	def append(self, message_type, records):
+		""" Appends data section records (as returned by the parse_*_data functions) """
+		if isinstance(records, (dict, pp.CompactRecord)):
+			records = [records]
+		part = self._partition(message_type)
+		for record in records:
+			part.pending.append(_flatten(record, '', {}))
+		if len(part.pending) >= BLOCK_ROWS:
+			part.flush()
+
+	def add_packet(self, packet):
+		""" Appends the data section of a parse_packet result; invalid packets are skipped """
+		message_type = packet.get('preamble', {}).get('message_type', pp.INVALID_STR)
+		if message_type == pp.INVALID_STR:
+			return
+		self.append(message_type, packet['data'])
+
+	def flush(self):
+		for part in self._partitions.values():
+			part.flush()
+
+	def close(self):
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def columns(self, message_type):
+		""" Returns the names of the columns stored for message_type """
+		part = self._partition(message_type)
+		if part.schema is None:
+			return sorted(part.pending[0]) if part.pending else []
+		return [name for name, code, width in part.schema]
+
+	def query(self, message_type, fields, t1=None, t2=None):
+		"""
+		Returns {field: [values]} (always including 'timestamp') for the rows of message_type
+		with t1 <= timestamp <= t2 (either bound may be None), sorted by timestamp. Only the
+		requested columns and the blocks overlapping the range are read. Rows with the same
+		timestamp keep the order they were written in; rows that haven't been written yet
+		come after them, as if they were the next block.
+		"""
+		part = self._partition(message_type)
+		fields = ['timestamp'] + [f for f in fields if f != 'timestamp']
+		# each block (and the pending rows) gives a run sorted by timestamp, merged below
+		runs = []
+		for start, count in part.row_ranges(t1, t2) if part.schema is not None else []:
+			timestamps = part.read('timestamp', start, count)
+			keep = [i for i, t in enumerate(timestamps) if (t1 is None or t >= t1) and (t2 is None or t <= t2)]
+			if not keep:
+				continue
+			# keep is contiguous since each block is sorted
+			lo, hi = keep[0], keep[-1] + 1
+			run = {'timestamp': timestamps[lo:hi]}
+			for f in fields[1:]:
+				run[f] = part.read(f, start + lo, hi - lo)
+			runs.append(run)
+		rows = [row for row in part.pending if (t1 is None or row['timestamp'] >= t1) and (t2 is None or row['timestamp'] <= t2)]
+		if rows:
+			rows.sort(key=lambda row: row['timestamp'])
+			runs.append(dict((f, [row[f] for row in rows]) for f in fields))
+		if len(runs) == 1:
+			return runs[0]
+		result = dict((f, []) for f in fields)
+		# (timestamp, run, row) keys, so ties keep block order
+		keys = [[(t, r, i) for i, t in enumerate(run['timestamp'])] for r, run in enumerate(runs)]
+		order = [(r, i) for t, r, i in heapq.merge(*keys)]
+		for f in fields:
+			result[f] = [runs[r][f][i] for r, i in order]
+		return result
+
+	def compact(self, message_type):
+		"""
+		Rewrites message_type's partition as a single block sorted by timestamp. The
+		partition shouldn't be read (or the process killed) while this runs.
+		"""
+		part = self._partition(message_type)
+		part.flush()
+		if len(part.blocks) < 2:
+			return
+		count = part.num_rows
+		order = sorted(range(count), key=part.read('timestamp', 0, count).__getitem__)
+		for name, code, width in part.schema:
+			with open(part._column_path(name), 'rb') as f:
+				data = f.read(count*width)
+			with open(part._column_path(name) + '.tmp', 'wb') as f:
+				f.write(b''.join(data[i*width:(i + 1)*width] for i in order))
+		for name, code, width in part.schema:
+			_replace(part._column_path(name) + '.tmp', part._column_path(name))
+		timestamps = part.read('timestamp', 0, count)
+		part.blocks = [{
+			'start': 0,
+			'count': count,
+			'min': timestamps[0],
+			'max': timestamps[-1],
+			'marks': timestamps[::INDEX_STRIDE],
+		}]
+		_write_json(os.path.join(part.path, 'index.json'), part.blocks)
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# tests of packetparse.py's dump scanning; run with python -m pytest
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+SAMPLES = pp.SAMPLE_PACKETS
+
+class DumpTestCase(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def write_dump(self, text, name="dump.txt"):
+		path = os.path.join(self.dir, name)
+		with open(path, "w") as f:
+			f.write(text)
+		return path
+
+def parsed(path, **kwargs):
+	out = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+	pp.parse_files([path], out=out, **kwargs)
+	return [json.loads(line) for line in out.getvalue().splitlines()]
+
+class SplitRangesTest(DumpTestCase):
+	def test_range_starting_inside_a_packet(self):
+		# the attitude packet's sync word is inside the truncated idle packet a scan of
+		# the whole file takes, but a range starting at 200 would find it
+		path = self.write_dump(SAMPLES["idle"][:300] + "\n" + SAMPLES["attitude"] + "\n" + SAMPLES["fc1"])
+		whole = parsed(path, split_size=1 << 20)
+		self.assertEqual([(r["offset"], r["packet"]["preamble"]["message_type"]) for r in whole], [(0, "IDLE"), (812, "FLASH CMP")])
+		for split_size in (200, 301, 512, 700):
+			self.assertEqual(parsed(path, split_size=split_size), whole)
+
+	def test_split_output_matches_serial(self):
+		packets = list(SAMPLES.values())
+		text = ""
+		for i, ps in enumerate(packets*3):
+			# packets broken over lines, truncated packets and stray sync words
+			if i % 4 == 1:
+				ps = ps[:250] + "\r\n" + ps[250:]
+			elif i % 4 == 2:
+				ps = ps[:i*20] + "\n"
+			elif i % 4 == 3:
+				ps = ps[:100] + pp.SYNC_WORD.decode("ascii") + ps[100:]
+			text += ps + ("\n" if i % 2 else "")
+		path = self.write_dump(text)
+		for max_sync_errors in (0, 2):
+			whole = parsed(path, max_sync_errors=max_sync_errors)
+			for split_size in (97, 255, 510, 1000, 4096):
+				self.assertEqual(parsed(path, split_size=split_size, max_sync_errors=max_sync_errors), whole)
+			self.assertEqual(parsed(path, jobs=2, split_size=1000, max_sync_errors=max_sync_errors), whole)
+
+class DumpFollowerTest(DumpTestCase):
+	def test_resumes_from_checkpoint(self):
+		path = self.write_dump(SAMPLES["attitude"] + "\n" + SAMPLES["idle"][:300])
+		checkpoint = os.path.join(self.dir, "follow.json")
+		with pp.DumpFollower(path, checkpoint) as follower:
+			self.assertEqual(follower.poll(), [(0, SAMPLES["attitude"])])
+		# the rest of the idle packet and another one arrive while nothing is following
+		with open(path, "a") as f:
+			f.write(SAMPLES["idle"][300:] + "\n" + SAMPLES["fc1"])
+		with pp.DumpFollower(path, checkpoint) as follower:
+			self.assertEqual(follower.scanner.file_pos, 511 + 300)
+			self.assertEqual(follower.poll(), [(511, SAMPLES["idle"]), (1022, SAMPLES["fc1"])])
+			self.assertEqual(follower.poll(), [])
+		with pp.DumpFollower(path, checkpoint) as follower:
+			self.assertEqual(follower.poll(), [])
+
+class SyncErrorsTest(DumpTestCase):
+	def test_corrupted_callsign(self):
+		# one bit off in the sync word's first character ("5" is 0101, "4" is 0100)
+		corrupted = "4" + SAMPLES["attitude"][1:]
+		path = self.write_dump(SAMPLES["idle"] + "\n" + corrupted + "\n" + SAMPLES["fc1"] + "\n")
+		self.assertEqual(pp.find_packets(path), [SAMPLES["idle"], SAMPLES["fc1"]])
+		self.assertEqual(pp.find_packets(path, max_sync_errors=1), [SAMPLES["idle"], corrupted, SAMPLES["fc1"]])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# tests of sqlsink.py's SqliteSink; run with python -m pytest
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+	import sqlsink
+else:
+	from . import packetparse as pp
+	from . import sqlsink
+
+def sample_packets():
+	return [pp.parse_packet(ps)[0] for ps in pp.SAMPLE_PACKETS.values()]
+
+class SqliteSinkTest(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "telemetry.db")
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def ingest(self, **kwargs):
+		with sqlsink.SqliteSink(self.path, **kwargs) as sink:
+			for packet in sample_packets():
+				sink.add_packet(packet)
+			sink.flush()
+			return sink.stats()
+
+	def count_rows(self):
+		conn = sqlite3.connect(self.path)
+		try:
+			return sum(conn.execute("SELECT COUNT(*) FROM %s" % table.name).fetchone()[0] for table in sqlsink.TABLES.values())
+		finally:
+			conn.close()
+
+	def test_reingest_is_idempotent(self):
+		for background in (True, False):
+			first = self.ingest(background=background)
+			self.assertGreater(first["rows_written"], 0)
+			rows = self.count_rows()
+			self.assertEqual(rows, first["rows_written"])
+			second = self.ingest(background=background)
+			self.assertEqual(second["rows_written"], 0)
+			self.assertEqual(second["rows_ignored"], first["rows_written"] + first["rows_ignored"])
+			self.assertEqual(self.count_rows(), rows)
+			os.remove(self.path)
+
+	def test_flush_thread_error_is_raised_by_flush(self):
+		packet = pp.parse_packet(pp.SAMPLE_PACKETS["attitude"])[0]
+		record = dict(packet["data"][0])
+		# sqlite can't bind this, so the flush thread's executemany fails
+		record["IR_FLASH_OBJ"] = object()
+		sink = sqlsink.SqliteSink(self.path)
+		try:
+			sink.append("ATTITUDE", [record])
+			self.assertRaises(sqlite3.Error, sink.flush)
+			# raised once; the sink can still be flushed and closed
+			sink.flush()
+		finally:
+			sink.close()
+
+	def test_connect_error_is_raised_by_flush(self):
+		sink = sqlsink.SqliteSink(self.dir)
+		sink.append("ATTITUDE", pp.parse_packet(pp.SAMPLE_PACKETS["attitude"])[0]["data"])
+		self.assertRaises(sqlite3.Error, sink.flush)
+		sink.close()
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+# tests of store.py's TelemetryStore; run with python -m pytest
+
+import shutil
+import sys
+import tempfile
+import unittest
+
+if not __package__ or sys.version_info[0] < 3:
+	import store
+else:
+	from . import store
+
+class QueryTest(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.store = store.TelemetryStore(self.dir)
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def append(self, timestamps, tag):
+		self.store.append("ATTITUDE", [{"timestamp": t, "tag": tag} for t in timestamps])
+
+	def test_overlapping_blocks_are_merged(self):
+		# two written blocks and the pending rows, all overlapping
+		self.append([50, 10, 30, 70], "a")
+		self.store.flush()
+		self.append([60, 20, 40], "b")
+		self.store.flush()
+		self.append([35, 5], "c")
+		result = self.store.query("ATTITUDE", ["tag"])
+		self.assertEqual(result["timestamp"], [5, 10, 20, 30, 35, 40, 50, 60, 70])
+		self.assertEqual(result["tag"], ["c", "a", "b", "a", "c", "b", "a", "b", "a"])
+		result = self.store.query("ATTITUDE", ["tag"], 20, 50)
+		self.assertEqual(result["timestamp"], [20, 30, 35, 40, 50])
+		self.assertEqual(result["tag"], ["b", "a", "c", "b", "a"])
+		# compacting doesn't change the answer
+		self.store.compact("ATTITUDE")
+		self.assertEqual(self.store.query("ATTITUDE", ["tag"], 20, 50), result)
+
+	def test_equal_timestamps_keep_block_order(self):
+		self.append([1, 2], "a")
+		self.store.flush()
+		self.append([2, 1], "b")
+		self.store.flush()
+		self.append([2], "c")
+		result = self.store.query("ATTITUDE", ["tag"])
+		self.assertEqual(result["timestamp"], [1, 1, 2, 2, 2])
+		self.assertEqual(result["tag"], ["a", "b", "a", "b", "c"])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# incremental merging of the (overlapping) batches of consecutive packets into time series
+
+import sys
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+if not __package__ or sys.version_info[0] < 3:
+	import packetparse as pp
+else:
+	from . import packetparse as pp
+
+# records a TimelineMerger keeps for poll() by default
+DEFAULT_MAX_PENDING = 1 << 16
+# records per sublist of a Timeline; sublists are split in two when they reach twice this
+SUBLIST_SIZE = 512
+
+class Timeline(object):
+	"""
+	The data section records of one message type, sorted by timestamp, without repeats.
+	Kept as a sorted list of short sublists, so an insert anywhere costs O(log n) compares
+	and moves at most 2*SUBLIST_SIZE entries.
+	"""
+	def __init__(self):
+		# sorted (timestamp, data_hash) of each record in sublists, the records in the same
+		# sublists, and the last key of each sublist
+		self._keys = []
+		self._records = []
+		self._maxes = []
+		self._len = 0
+		self._hashes = set()
+
+	def add(self, record):
+		""" Inserts a record unless one with the same data_hash is already in; returns True if inserted """
+		data_hash = record['data_hash']
+		if data_hash in self._hashes:
+			return False
+		self._hashes.add(data_hash)
+		self._len += 1
+		key = (record['timestamp'], data_hash)
+		if not self._maxes:
+			self._keys.append([key])
+			self._records.append([record])
+			self._maxes.append(key)
+			return True
+		# usually the newest batches, so usually an append to the last sublist
+		s = bisect_left(self._maxes, key)
+		if s == len(self._maxes):
+			s -= 1
+			self._keys[s].append(key)
+			self._records[s].append(record)
+			self._maxes[s] = key
+		else:
+			i = bisect_left(self._keys[s], key)
+			self._keys[s].insert(i, key)
+			self._records[s].insert(i, record)
+		if len(self._keys[s]) >= 2*SUBLIST_SIZE:
+			self._split(s)
+		return True
+
+	def _split(self, s):
+		keys, records = self._keys[s], self._records[s]
+		self._keys[s:s + 1] = [keys[:SUBLIST_SIZE], keys[SUBLIST_SIZE:]]
+		self._records[s:s + 1] = [records[:SUBLIST_SIZE], records[SUBLIST_SIZE:]]
+		self._maxes[s:s + 1] = [keys[SUBLIST_SIZE - 1], keys[-1]]
+
+	def _position(self, key, bisect):
+		""" (sublist, index in it) where bisect would put key in the flattened keys """
+		s = bisect(self._maxes, key)
+		if s == len(self._maxes):
+			return s, 0
+		return s, bisect(self._keys[s], key)
+
+	def range(self, t1=None, t2=None):
+		""" The records with t1 <= timestamp <= t2 (either bound may be None), in order """
+		lo = (0, 0) if t1 is None else self._position((t1,), bisect_left)
+		# (t2 + 1,) sorts after every key with timestamp t2
+		hi = (len(self._maxes), 0) if t2 is None else self._position((t2 + 1,), bisect_right)
+		if lo >= hi:
+			return []
+		if lo[0] == hi[0]:
+			return self._records[lo[0]][lo[1]:hi[1]]
+		out = self._records[lo[0]][lo[1]:]
+		for records in self._records[lo[0] + 1:hi[0]]:
+			out.extend(records)
+		if hi[0] < len(self._maxes):
+			out.extend(self._records[hi[0]][:hi[1]])
+		return out
+
+	def __len__(self):
+		return self._len
+
+	def __iter__(self):
+		for records in self._records:
+			for record in records:
+				yield record
+
+	def __contains__(self, data_hash):
+		return data_hash in self._hashes
+
+class TimelineMerger(object):
+	"""
+	Merges the batches of parsed packets, added one packet at a time, into a Timeline per
+	message type. Consumers keep a cursor (an int, starting at 0) and poll() for the records
+	added since they last did, in the order they were added. Only the last max_pending
+	records (None for all of them) are kept for poll(); a consumer whose cursor is behind
+	oldest_cursor has missed the records in between.
+	"""
+	def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+		self.timelines = {}
+		# (message type, record) in the order records were added, for poll(), and the
+		# cursor of the first of them
+		self._added = deque(maxlen=max_pending)
+		self._base = 0
+
+	def timeline(self, message_type):
+		if message_type not in self.timelines:
+			self.timelines[message_type] = Timeline()
+		return self.timelines[message_type]
+
+	def add_records(self, message_type, records):
+		""" Adds data section records; returns the number that were new """
+		if isinstance(records, (dict, pp.CompactRecord)):
+			records = [records]
+		timeline = self.timeline(message_type)
+		added = 0
+		for record in records:
+			if timeline.add(record):
+				if len(self._added) == self._added.maxlen:
+					self._base += 1
+				self._added.append((message_type, record))
+				added += 1
+		return added
+
+	def add_packet(self, packet):
+		""" Adds the data section of a parse_packet() result (or Packet); returns the number of new records """
+		message_type = packet['preamble']['message_type']
+		if message_type == pp.INVALID_STR:
+			return 0
+		return self.add_records(message_type, packet['data'])
+
+	@property
+	def cursor(self):
+		""" The cursor just past the last record added """
+		return self._base + len(self._added)
+
+	@property
+	def oldest_cursor(self):
+		""" The cursor of the oldest record poll() can still return """
+		return self._base
+
+	def poll(self, cursor=0):
+		""" Returns ([(message type, record) added at or after cursor, as far back as oldest_cursor], new cursor) """
+		added = self._added
+		# indexed from the end, which is where a deque is cheap to index
+		return [added[i] for i in range(max(cursor - self._base, 0) - len(added), 0)], self.cursor